@@ -1,29 +1,47 @@
+from app.agent.config.pipeline_config_loader import PipelineConfig
 from app.agent.core.base_agent import BaseAgent
 from app.agent.schemas.state import State
 from app.agent.schemas.types import AcceptedType, Action
 from app.agent.utils.disaster import get_disaster_by_id, haversine_distance
 from app.agent.utils.location import get_location
 from app.agent.utils.request import analyse_image, parse_text, stt
-from app.agent.utils.volunteer import get_all_volunteer_ids_by_disaster, get_all_volunteers_by_disaster
-from app.agent.utils.resource import get_resources_by_ids_and_type
+from app.agent.utils.volunteer import (
+    get_all_volunteer_ids_by_disaster, get_all_volunteers_by_disaster, hold_volunteer, is_volunteer_held,
+)
+from app.agent.utils.resource import get_resources_by_ids_and_type, reserve_resource
 from app.agent.schemas.resource import Resource
 from app.agent.schemas.task import ResourceAllocation, TaskAllocation, VolunteerAllocation
 from app.agent.utils.admin import get_admin_ids
+from app.agent.utils.allocation import allocation_holder, new_allocation_id, save_allocation
 
 from app.utils.logger import get_logger
 logger = get_logger(__name__)
 
 
 class AgentAllocation(BaseAgent):
+    """
+    Proposes the nearest stock and volunteers for each task. Everything
+    proposed is reserved (stock through crud.resource reservations,
+    volunteers through Redis holds) for `hold_s`, so parallel runs see the
+    reduced capacity and propose something else. Each task's proposal is
+    saved under its allocation_id, which holds its reservations: accepting
+    it commits them, rejecting it releases them; unsettled ones expire.
+    A `preview` run (the admin suggest view) only reads: it skips held
+    volunteers but reserves, holds and saves nothing.
+    """
+
     def handle(self, state: State) -> State:
         logger.info('Inside allocation agent')
-        logger.debug(f'Processing disaster ID: {state.disaster.disaster_id}')
+        logger.debug("Processing disaster ID: %s", state.disaster.disaster_id)
+
+        hold_s = PipelineConfig().get('task_allocation')['hold_s']
+        preview = state.preview
 
         volunteer_ids = get_all_volunteer_ids_by_disaster(state.disaster.disaster_id)
-        logger.debug(f'Retrieved volunteer IDs: {volunteer_ids}')
+        logger.debug("Retrieved volunteer IDs: %s", volunteer_ids)
 
         admin_ids = get_admin_ids()
-        logger.debug(f"Retrieved admin IDs: {admin_ids}")
+        logger.debug("Retrieved admin IDs: %s", admin_ids)
 
         resource_provider_ids = admin_ids + volunteer_ids
         
@@ -31,6 +49,7 @@ class AgentAllocation(BaseAgent):
         assigned_volunteer_ids = set()
 
         for task in state.tasks:
+            allocation_id = None if preview else new_allocation_id()
 
             resource_allocations = []
             volunteer_allocations = []
@@ -41,19 +60,19 @@ class AgentAllocation(BaseAgent):
                 for req in task.resource_requirements
             }
             manpower_requirements = task.manpower_requirement
-            logger.debug(f"Resource Requirements: {resource_requirements}")
-            logger.debug(f"Manpower Requirement: {manpower_requirements}")
+            logger.debug("Resource Requirements: %s", resource_requirements)
+            logger.debug("Manpower Requirement: %s", manpower_requirements)
 
             # -------- RESOURCE ALLOCATION --------
             for resource_type, quantity_required in resource_requirements.items():
-                logger.debug(f"Allocating Resource Type: {resource_type} (Quantity Required: {quantity_required})")
+                logger.debug("Allocating Resource Type: %s (Quantity Required: %s)", resource_type, quantity_required)
 
                 available_resources = [
                     resource for resource in get_resources_by_ids_and_type(resource_provider_ids, resource_type)
                     if resource.status == 'active' and resource.quantity > 0
                 ]
-                logger.debug(f"Available resources found: {len(available_resources)}")
-                logger.debug(f"Available resources found: {available_resources}")
+                logger.debug("Available resources found: %s", len(available_resources))
+                logger.debug("Available resources found: %s", available_resources)
 
                 sorted_resources = sorted(
                     available_resources,
@@ -74,7 +93,17 @@ class AgentAllocation(BaseAgent):
                         resource.quantity, quantity_required - allocated_quantity
                     )
                     if allocatable_quantity > 0:
+                        reservation_id = None
+                        if not preview:
+                            reservation_id = reserve_resource(
+                                resource, allocatable_quantity, allocation_holder(allocation_id), hold_s
+                            )
+                            if reservation_id is None:
+                                # taken by a parallel run since it was listed
+                                continue
+
                         partial_resource = Resource(
+                            resource_id=resource.resource_id,
                             donor_id=resource.donor_id,
                             donor_type=resource.donor_type,
                             resource_type=resource.resource_type,
@@ -85,27 +114,28 @@ class AgentAllocation(BaseAgent):
 
                         allocation = ResourceAllocation(
                             resource=partial_resource,
-                            accepted=AcceptedType.PENDING
+                            accepted=AcceptedType.PENDING,
+                            reservation_id=reservation_id
                         )
                         resource_allocations.append(allocation)
                         allocated_quantity += allocatable_quantity
 
                         # logger.debug(f"Allocated {allocatable_quantity} units from resource ID: {resource.id}")
 
-                logger.debug(f"Total allocated quantity for {resource_type}: {allocated_quantity}")
-                logger.debug(f"Resource Allocations: {resource_allocations}")
+                logger.debug("Total allocated quantity for %s: %s", resource_type, allocated_quantity)
+                logger.debug("Resource Allocations: %s", resource_allocations)
 
             # -------- VOLUNTEER (MANPOWER) ALLOCATION --------
-            logger.debug(f"Allocating volunteers for manpower requirement: {manpower_requirements}")
+            logger.debug("Allocating volunteers for manpower requirement: %s", manpower_requirements)
 
             all_volunteers = get_all_volunteers_by_disaster(state.disaster.disaster_id)
-            logger.debug(f"All volunteers found: {len(all_volunteers)}")
+            logger.debug("All volunteers found: %s", len(all_volunteers))
 
             available_volunteers = [
                 v for v in all_volunteers
                 if v.id in volunteer_ids and v.status == 'active' and v.id not in assigned_volunteer_ids
             ]
-            logger.debug(f"Available volunteers after filtering: {len(available_volunteers)}")
+            logger.debug("Available volunteers after filtering: %s", len(available_volunteers))
 
             sorted_volunteers = sorted(
                 available_volunteers,
@@ -117,24 +147,39 @@ class AgentAllocation(BaseAgent):
                 )
             )
 
-            for volunteer in sorted_volunteers[:manpower_requirements]:
+            for volunteer in sorted_volunteers:
+                if manpower_requirements is not None and len(volunteer_allocations) >= manpower_requirements:
+                    break
+                if preview:
+                    free, hold_id = not is_volunteer_held(volunteer.id), None
+                else:
+                    free, hold_id = hold_volunteer(volunteer.id, hold_s)
+                if not free:
+                    logger.debug("Volunteer %s is held by a parallel run", volunteer.id)
+                    continue
+
                 allocation = VolunteerAllocation(
                     volunteer=volunteer,
-                    accepted=AcceptedType.PENDING
+                    accepted=AcceptedType.PENDING,
+                    reservation_id=hold_id
                 )
                 volunteer_allocations.append(allocation)
                 assigned_volunteer_ids.add(volunteer.id)
-                logger.debug(f"Assigned Volunteer ID: {volunteer.id}")
+                logger.debug("Assigned Volunteer ID: %s", volunteer.id)
 
-            logger.debug(f"Total volunteers allocated: {len(volunteer_allocations)}")
-            logger.debug(f"Volunteer Allocations: {volunteer_allocations}")
+            logger.debug("Total volunteers allocated: %s", len(volunteer_allocations))
+            logger.debug("Volunteer Allocations: %s", volunteer_allocations)
 
             # Store allocations
-            task_allocations.append(TaskAllocation(
+            task_allocation = TaskAllocation(
                 task=task,
                 resource_allocations=resource_allocations,
-                volunteer_allocations=volunteer_allocations
-            ))
+                volunteer_allocations=volunteer_allocations,
+                allocation_id=allocation_id
+            )
+            if not preview:
+                save_allocation(allocation_id, state.disaster.disaster_id, task_allocation)
+            task_allocations.append(task_allocation)
             # logger.debug(f"Finished allocations for Task ID: {task.id}")
 
         state.task_allocations = task_allocations
@@ -2,10 +2,15 @@ from typing import Optional
 from app.agent.core.base_agent import BaseAgent
 from app.agent.schemas.state import State
 from app.agent.schemas.disaster import Disaster
-from app.agent.schemas.types import Action
-from app.agent.utils.disaster import add_disaster, get_disaster_by_id, get_nearest_disasters, load_disasters
+from app.agent.schemas.types import Action, AssignmentDecision
+from app.agent.utils.disaster import add_disaster, get_disaster_by_id, get_nearest_disasters, link_request_to_disaster
+from app.agent.utils.disaster_scoring import decide_assignment, disaster_type_key
+from app.agent.utils.location import geohash_encode
+from app.core.redis import get_redis
+from app.core.singleflight import SingleFlight
 
 from app.agent.config.llms_config_loader import LLMConfig
+from app.agent.config.pipeline_config_loader import PipelineConfig
 from app.agent.utils.llm import GroqAgent
 
 from app.utils.logger import get_logger
@@ -19,71 +24,119 @@ class AgentDisaster(BaseAgent):
         groq_agent = GroqAgent()
         llm_cfg = LLMConfig()
 
-        nearest = get_nearest_disasters(request=state.request, top_n=2)
-        logger.debug([disaster.dict() for disaster in nearest])
+        assignment_cfg = PipelineConfig().get('disaster_assignment')
+        nearest = get_nearest_disasters(request=state.request, top_n=assignment_cfg['candidates'])
+        logger.debug("Nearest disasters: %s", nearest)
 
-        system_prompt = """
-        You are an disaster assigning agent, you will be given with a set of disasters and a request.
-        The disasters are fetched using the coordinates which are closer to the request location.
-        Analyse the disasters and try to figure out if the request could be assigned to any of the listed disasters.
-        if yes return the disaster id.
-        if the disaster is same city is different return None
-        if the city is same but the disaster is different return None
-        """
-
-        user_prompt = f"""
-        List of nearest disasters:
-        {[disaster.dict() for disaster in nearest]}
-
-        New request:
-        {state.request.dict()}
-        """
-
-        # Make the request
-        disaster_id = groq_agent.complete(
-            system_prompt=system_prompt,
-            user_prompt=user_prompt,
-            model=llm_cfg.get_model('groq', 'DISASTER_ASSIGNMENT'),
-            response_model=Optional[str],
-            trace_name='disaster_assignment'
-        )
-
-        logger.debug(f"Disaster ID returned: {disaster_id}")
-
-        if not (disaster_id == None or disaster_id == 'None'): 
-            state.request.disaster_id = disaster_id
-            state.disaster = get_disaster_by_id(disaster_id)
-        else:
-            disasters = load_disasters()
-            # firestore needs to handle this creation
-            new_disaster_id = "Savinu"
+        # Cheap deterministic pass first; the LLM only sees the ambiguous middle band
+        assignment = decide_assignment(state.request, nearest, assignment_cfg)
+        logger.info("Deterministic disaster assignment: %s", assignment.decision.value)
 
+        disaster_id = None
+        if assignment.decision == AssignmentDecision.ASSIGN:
+            disaster_id = assignment.best.disaster.disaster_id
+        elif assignment.decision == AssignmentDecision.AMBIGUOUS:
             system_prompt = """
-            You are an disaster creating agent. You will be provided with new disaster id and a request.
-            You have to create an disaster from the request, for the location of the disaster try to use the city of the request.
+            You are an disaster assigning agent, you will be given with a set of disasters and a request.
+            The disasters are fetched using the coordinates which are closer to the request location.
+            Analyse the disasters and try to figure out if the request could be assigned to any of the listed disasters.
+            if yes return the disaster id.
+            if the disaster is same city is different return None
+            if the city is same but the disaster is different return None
             """
+
             user_prompt = f"""
-            new disaster id : {new_disaster_id}
-            request: {state.request}
+            List of nearest disasters:
+            {[disaster.model_dump() for disaster in nearest]}
+
+            New request:
+            {state.request.model_dump()}
             """
 
             # Make the request
-            disaster_parsed = groq_agent.complete(
+            disaster_id = groq_agent.complete(
                 system_prompt=system_prompt,
                 user_prompt=user_prompt,
-                model=llm_cfg.get_model('groq', 'DISASTER_CREATION'),
-                response_model=Disaster,
-                trace_name='disaster_creation'
+                model=llm_cfg.get_model('groq', 'DISASTER_ASSIGNMENT'),
+                response_model=Optional[str],
+                trace_name='disaster_assignment'
             )
 
-            for key, value in disaster_parsed.dict().items():
-                logger.debug(f"{key}: {value}")
+        logger.debug("Disaster ID returned: %s", disaster_id)
 
-            state.request.disaster_id = new_disaster_id
-            state.disaster = disaster_parsed
-            add_disaster(disaster_parsed)
+        if assignment.decision == AssignmentDecision.ASSIGN:
+            state.request.disaster_id = disaster_id
+            state.disaster = assignment.best.disaster
+        elif disaster_id is not None:
+            state.request.disaster_id = disaster_id
+            state.disaster = get_disaster_by_id(disaster_id)
+        else:
+            # Concurrent requests for the same not-yet-registered event share one
+            # creation: the first worker per geohash cell and type creates it,
+            # the others wait and attach to its result.
+            creation_cfg = PipelineConfig().get('disaster_creation')
+            coords = state.request.coordinates
+            cell = geohash_encode(coords.latitude, coords.longitude, creation_cfg['geohash_precision'])
+            # "Flooding" and "flood" share a flight
+            flight_key = f"{cell}:{disaster_type_key(state.request.disaster_type)}"
+
+            single_flight = SingleFlight(
+                get_redis(),
+                namespace='disaster_creation',
+                lock_ttl_s=creation_cfg['lock_ttl_s'],
+                result_ttl_s=creation_cfg['result_ttl_s'],
+                wait_timeout_s=creation_cfg['wait_timeout_s'],
+                poll_interval_s=creation_cfg['poll_interval_s'],
+            )
+
+            created = {}
+            def create() -> str:
+                created['disaster'] = self._create_disaster(state, groq_agent, llm_cfg)
+                return created['disaster'].disaster_id
+
+            for _ in range(2):
+                disaster_id, leader = single_flight.do(flight_key, create)
+                disaster = created['disaster'] if leader else get_disaster_by_id(disaster_id)
+                if disaster is not None:
+                    break
+                # the shared disaster was discarded or deleted since it was created
+                logger.info("Disaster %s from single-flight %s is gone, creating anew", disaster_id, flight_key)
+                single_flight.forget(flight_key, disaster_id)
+            else:
+                disaster = self._create_disaster(state, groq_agent, llm_cfg)
+            state.request.disaster_id = disaster.disaster_id
+            state.disaster = disaster
+
+        link_request_to_disaster(state.request)
 
         state.previous_action = Action.disaster_assignment
         state.next_action = Action.task_creation
         
-        return state
\ No newline at end of file
+        return state
+
+    def _create_disaster(self, state: State, groq_agent: GroqAgent, llm_cfg: LLMConfig) -> Disaster:
+        # the real ID is only known once Firestore has stored the document
+        new_disaster_id = "pending"
+
+        system_prompt = """
+        You are an disaster creating agent. You will be provided with new disaster id and a request.
+        You have to create an disaster from the request, for the location of the disaster try to use the city of the request.
+        """
+        user_prompt = f"""
+        new disaster id : {new_disaster_id}
+        request: {state.request}
+        """
+
+        # Make the request
+        disaster_parsed = groq_agent.complete(
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            model=llm_cfg.get_model('groq', 'DISASTER_CREATION'),
+            response_model=Disaster,
+            trace_name='disaster_creation'
+        )
+
+        logger.debug("Parsed disaster: %r", disaster_parsed)
+
+        disaster_parsed.disaster_id = add_disaster(disaster_parsed)
+        return disaster_parsed
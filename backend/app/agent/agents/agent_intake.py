@@ -14,7 +14,7 @@ class AgentIntake(BaseAgent):
 
         if state.request.coordinates:
             state.request.location_from_coordinates = get_location(state.request.coordinates)
-            logger.debug(f'location_from_coordinates: {state.request.location_from_coordinates}')
+            logger.debug("location_from_coordinates: %s", state.request.location_from_coordinates)
 
         user_prompt = ""
         if state.request.original_request_text_available:
@@ -13,6 +13,6 @@ class AgentOrchestrator(BaseAgent):
             logger.info('defining action')
             # determine and set next action here
         else:
-            logger.info(f'action: {state.next_action.value}')
+            logger.info("action: %s", state.next_action.value)
 
         return state
@@ -1,37 +1,54 @@
 from typing import List, Optional
 from app.agent.core.base_agent import BaseAgent
 from app.agent.schemas.state import State
-from app.agent.rag.rag import build_vectorstores_from_pdfs, retrieve_from_collection, parse_documents_to_text
+from app.agent.rag.rag import build_vectorstores_from_pdfs, retrieve_from_collection
 from app.agent.schemas.types import Action
 from app.agent.utils.observation import load_observations_by_disaster_id
 from app.agent.utils.task import save_tasks
 from app.agent.schemas.task import Task
 from app.agent.config.llms_config_loader import LLMConfig
+from app.agent.config.pipeline_config_loader import PipelineConfig
 from app.agent.utils.llm import GroqAgent
-from app.agent.utils.task_resources import save_request_resources
+from app.agent.utils.prompt import PromptBuilder, compact, relevance
+from app.core import tracing
 
 from app.utils.logger import get_logger
 logger = get_logger(__name__)
 
+# Only the fields the task model actually reasons about go into the prompt
+REQUEST_FIELDS = [
+    "original_request_text", "extracted_request_voice", "extracted_request_image",
+    "location_from_input", "location_from_coordinates", "urgency", "type_of_need",
+    "disaster_type", "affected_people_count",
+]
+DISASTER_FIELDS = ["disaster_type", "disaster_location", "disaster_summary"]
+OBSERVATION_FIELDS = ["title", "description", "urgency", "posted_time"]
+
 class AgentTask(BaseAgent):
     def handle(self, state: State) -> State:
         logger.info('Inside task agent')
 
-        guidelines = ""
+        budget_cfg = PipelineConfig().get('prompt_budget')
+        task_budget = budget_cfg['task_creation']
+
+        guidelines = []
         try:
-            build_vectorstores_from_pdfs()
-            docs = retrieve_from_collection(
-                collection_name=state.request.disaster_type.lower(),
-                query=state.request.original_request_text,
-            )
-            guidelines = parse_documents_to_text(docs)
+            with tracing.span("rag.guidelines", collection=state.request.disaster_type.lower(), k=task_budget['guidelines_k']) as span:
+                build_vectorstores_from_pdfs()
+                guidelines = retrieve_from_collection(
+                    collection_name=state.request.disaster_type.lower(),
+                    query=state.request.original_request_text,
+                    k=task_budget['guidelines_k'],
+                )
+                span.set(documents=len(guidelines))
         except Exception as e:
-            logger.error(f'During rag: {e}')
+            logger.error("During rag: %s", e)
 
-        top_k = 3
-        observations = load_observations_by_disaster_id(state.request.disaster_id, top_k=top_k)
-        
-        # Safety check for state.request and state.disaster before accessing .dict()
+        observations = load_observations_by_disaster_id(
+            state.request.disaster_id, top_k=task_budget['observations_k']
+        )
+
+        # Safety check for state.request and state.disaster before accessing .model_dump()
         if not state.request:
             logger.error("state.request is None. Cannot proceed with task creation.")
             return state
@@ -51,7 +68,7 @@ class AgentTask(BaseAgent):
             You will be provided with :
                 -request submitted by the affected individual of an disaster
                 -information about the disaster
-                -latest {top_k} observations submitted by the volunteers at the spot
+                -recent observations submitted by the volunteers at the spot
                 -disaster management guidelines retrieved from the vectorstore 
             Create tasks to be done in order to complete the request of the affected individual
             only use the information about the disaster and latest observations to get more current context.
@@ -62,21 +79,35 @@ class AgentTask(BaseAgent):
             - each task should be a standalone task, should not be a continuation of other one
             - only provide tasks for the request, do not provide tasks for the observations.
             """
-            user_prompt = f"""
-            Only create tasks relevant to do the needful to the request of the affected individual
-            request submitted by the affected  individual:
-            {state.request.dict()}
-
-            Use the below info only to just get the current situation of the disaster
-            information about the disaster:
-            {state.disaster.dict()}
-
-            latest {top_k} observations from the volunteers at the site:
-            {[observation.dict() for observation in observations]}
-
-            use the below guidelines too:
-            {guidelines}
-            """
+            query = state.request.original_request_text or ""
+            user_prompt = (
+                PromptBuilder(task_budget['max_prompt_tokens'], chars_per_token=budget_cfg['chars_per_token'])
+                .add(
+                    "Only create tasks relevant to do the needful to the request of the affected individual.\n"
+                    "Request submitted by the affected individual:",
+                    compact(state.request, REQUEST_FIELDS),
+                )
+                .add(
+                    "Use the below info only to get the current situation of the disaster.\n"
+                    "Information about the disaster:",
+                    compact(state.disaster, DISASTER_FIELDS),
+                )
+                # observations are short and current: they get the budget before guidelines.
+                # Most relevant to the request first; loaded newest first, which breaks ties
+                .add_ranked(
+                    "Recent observations from the volunteers at the site:",
+                    [
+                        (relevance(query, f"{o.title} {o.description}"), compact(o, OBSERVATION_FIELDS))
+                        for o in observations
+                    ],
+                )
+                # retrieval order is the vector-similarity order: keep it as the score
+                .add_ranked(
+                    "Use the below guidelines too:",
+                    [(-rank, doc.page_content) for rank, doc in enumerate(guidelines)],
+                )
+                .build()
+            )
 
             # Make the request
             tasks = groq_agent.complete(
@@ -87,34 +118,22 @@ class AgentTask(BaseAgent):
                 trace_name='task_creation'
             )
 
-            # persist into Firestore via CRUD layer**
+            # persist into Firestore via CRUD layer**, with the resource & manpower info
             saved = save_tasks(tasks, state.request)
-            # Extract and save resource & manpower info
-            entries = []
-            for created, at in zip(saved, tasks):
-                entries.append({
-                    "task_id": created.id,
-                    "resource_requirements": [
-                        {"resource_type": rt, "quantity": qty}
-                        for rt, qty in getattr(at, "resource_requirements", [])
-                    ],
-                    "manpower_requirement": getattr(at, "manpower_requirement", None),
-                })
-
-            req_id = getattr(state.request, "source_request_id", None) or state.request.disaster_id
-            save_request_resources(req_id, entries)
+            for task, db_task in zip(tasks, saved):
+                task.task_id = db_task.id
 
             state.tasks = tasks
             
             state.previous_action = Action.task_creation
             state.next_action = None
 
-            logger.info("Tasks saved to DB:", saved)
+            logger.info("Tasks saved to DB: %s", saved)
 
-            logger.info("Tasks created successfully:", state.tasks)
-            logger.info("State request task creation:", state.request)
+            logger.debug("Tasks created successfully: %s", state.tasks)
+            logger.debug("State request task creation: %s", state.request)
         except Exception as e:
-            logger.error(f"During task creation: {e}")
+            logger.error("During task creation: %s", e)
             # Optionally, you could return the state with an error message or empty tasks
             state.tasks = []
 
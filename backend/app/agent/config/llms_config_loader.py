@@ -1,10 +1,35 @@
+import os
 import yaml
 from pathlib import Path
+from typing import Any, Dict, List
 
 class LLMConfig:
     def __init__(self, path: str = "app/agent/config/llms_config.yaml"):
         with open(Path(path), "r") as file:
             self.config = yaml.safe_load(file)
 
+    def get_provider(self) -> str:
+        return os.environ.get("LLM_PROVIDER") or self.config.get("provider", "groq")
+
+    def get_chat_model(self, provider: str, task: str) -> str:
+        return self.config["chat"][provider][task]
+
+    def get_stub(self) -> Dict[str, Any]:
+        return self.config["stub"]
+
     def get_model(self, provider: str, task: str) -> str:
         return self.config[provider][task]
+
+    def get_fallbacks(self, provider: str, task: str) -> List[str]:
+        fallbacks = self.config.get("fallbacks", {}).get(provider, {})
+        return list(fallbacks.get(task, fallbacks.get("DEFAULT", [])))
+
+    def get_hedge_after(self, task: str) -> float:
+        hedge_after = self.config["latency"]["hedge_after_s"]
+        return float(hedge_after.get(task, hedge_after["DEFAULT"]))
+
+    def get_call_timeout(self) -> float:
+        return float(self.config["latency"]["call_timeout_s"])
+
+    def get_request_budget(self) -> float:
+        return float(self.config["latency"]["request_budget_s"])
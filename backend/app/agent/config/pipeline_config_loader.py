@@ -0,0 +1,11 @@
+import yaml
+from pathlib import Path
+from typing import Any, Dict
+
+class PipelineConfig:
+    def __init__(self, path: str = "app/agent/config/pipeline_config.yaml"):
+        with open(Path(path), "r") as file:
+            self.config = yaml.safe_load(file)
+
+    def get(self, section: str) -> Dict[str, Any]:
+        return self.config[section]
@@ -1,9 +1,11 @@
 from abc import ABC, abstractmethod
 from app.agent.schemas.state import State
+from app.core import tracing
 
 class BaseAgent(ABC):
     def __call__(self, state: State) -> State:
-        return self.handle(state)
+        with tracing.span(f"agent {type(self).__name__}"):
+            return self.handle(state)
 
     @abstractmethod
     def handle(self, state: State) -> State:
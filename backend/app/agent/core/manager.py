@@ -1,25 +1,20 @@
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
 import yaml
 import importlib
 from langgraph.graph import StateGraph, START, END
-from langfuse.callback import CallbackHandler
-import os
 
+from app.agent.config.llms_config_loader import LLMConfig
+from app.agent.core.budget import request_budget
 from app.agent.schemas.state import State
+from app.core import llm_tracing, tracing
 
 class Manager:
     def __init__(self, config_path: str = "app/agent/config/agents_config.yaml"):
         self.config_path = config_path
         self.graph = self._build_graph_from_config()
         self.app = self.graph.compile()
-        # Initialize Langfuse CallbackHandler for Langchain (tracing)
-        self.langfuse_handler = CallbackHandler(
-            secret_key=os.environ.get("LANGFUSE_SECRET_KEY"),
-            public_key=os.environ.get("LANGFUSE_PUBLIC_KEY"),
-            host=os.environ.get("LANGFUSE_HOST"),
-            trace_name='langgraph_resq_agent'
-        )
 
     def _load_class(self, dotted_path: str):
         module_path, class_name = dotted_path.rsplit('.', 1)
@@ -57,8 +52,20 @@ class Manager:
 
         return graph
 
-    def run(self, state: State) -> State:
-        return self.app.invoke(state, config={"callbacks": [self.langfuse_handler]})
+    def run(self, state: State, sample: Optional[bool] = None) -> State:
+        """Run the graph; `sample` forces the Langfuse sampling decision (benchmarks)."""
+        with llm_tracing.trace_run("langgraph_resq_agent", input=state, sample=sample) as sampled, \
+                tracing.span("agent_flow") as span:
+            # the trace id ties the Langfuse trace to the distributed one
+            metadata = {"trace_id": span.trace_id} if tracing.enabled() else {}
+            callbacks = []
+            if sampled:
+                # unsampled runs skip the handler, which records the whole State at every node
+                trace = llm_tracing.client().trace(name="langgraph_resq_agent", metadata=metadata)
+                callbacks.append(trace.get_langchain_handler(update_parent=True))
+            # every LLM call of this run shares one latency budget
+            with request_budget(LLMConfig().get_request_budget()):
+                return self.app.invoke(state, config={"callbacks": callbacks, "metadata": metadata})
     
     # def visualize(self, output_dir: str = "app/agent/visualizations/langgraph") -> str:
     #     Path(output_dir).mkdir(parents=True, exist_ok=True)
@@ -25,10 +25,10 @@ def build_vectorstores_from_pdfs(source_dir: str = 'app/agent/rag/docs', target_
 
         # Skip if vectorstore already exists
         if collection_path.exists():
-            logger.info(f"Collection '{collection_name}' already exists. Skipping...")
+            logger.info("Collection '%s' already exists. Skipping...", collection_name)
             continue
 
-        logger.info(f"Processing {pdf_file.name} -> collection '{collection_name}'")
+        logger.info("Processing %s -> collection '%s'", pdf_file.name, collection_name)
 
         # Load and split the PDF
         loader = PyPDFLoader(str(pdf_file))
@@ -39,7 +39,7 @@ def build_vectorstores_from_pdfs(source_dir: str = 'app/agent/rag/docs', target_
 
         # Save to disk
         vectorstore.save_local(str(collection_path))
-        logger.info(f"Collection '{collection_name}' saved at '{collection_path}'")
+        logger.info("Collection '%s' saved at '%s'", collection_name, collection_path)
 
 def retrieve_from_collection(
     collection_name: str,
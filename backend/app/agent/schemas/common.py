@@ -1,8 +1,7 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 class Coordinates(BaseModel):
     latitude: float = Field(..., alias="lat")
     longitude: float = Field(..., alias="lng")
 
-    class Config:
-        allow_population_by_field_name = True
+    model_config = ConfigDict(populate_by_name=True)
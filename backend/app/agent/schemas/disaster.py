@@ -1,5 +1,7 @@
-from typing import Optional
+from datetime import datetime
+from typing import List, Optional
 from app.agent.schemas.common import Coordinates
+from app.agent.schemas.types import AssignmentDecision
 from pydantic import BaseModel
 
 class Disaster(BaseModel):
@@ -7,4 +9,15 @@ class Disaster(BaseModel):
     disaster_type: str
     disaster_coordinates: Optional[Coordinates]
     disaster_location: Optional[str]
-    disaster_summary: Optional[str]
\ No newline at end of file
+    disaster_summary: Optional[str]
+    created_at: Optional[datetime] = None
+
+class DisasterMatch(BaseModel):
+    disaster: Disaster
+    distance_km: float
+    score: float
+
+class AssignmentResult(BaseModel):
+    decision: AssignmentDecision
+    best: Optional[DisasterMatch] = None
+    candidates: List[DisasterMatch] = []
\ No newline at end of file
@@ -20,6 +20,8 @@ class Request(BaseModel):
     type_of_need: Optional[TypeOfNeed]
     disaster_type: Optional[str]
     affected_people_count: Optional[int]
+    # Firestore ID of the originating request document
+    source_request_id: Optional[str] = None
 
 class TextParserOutput(BaseModel):
     location_from_input: Optional[str]
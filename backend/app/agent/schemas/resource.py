@@ -4,6 +4,7 @@ from app.agent.schemas.common import Coordinates
 from pydantic import BaseModel
 from enum import Enum
 class Resource(BaseModel):
+    resource_id: Optional[str] = None
     donor_id: str
     donor_type: DonorType
     resource_type: ResourceType
@@ -13,4 +13,6 @@ class State(BaseModel):
     request: Optional[Request]
     disaster: Optional[Disaster]
     tasks: Optional[List[Task]]
-    task_allocations: Optional[List[TaskAllocation]]
\ No newline at end of file
+    task_allocations: Optional[List[TaskAllocation]]
+    # allocation proposes without reserving, holding or saving anything
+    preview: bool = False
\ No newline at end of file
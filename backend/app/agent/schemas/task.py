@@ -3,12 +3,15 @@ from app.agent.schemas.types import AcceptedType, ResourceType, UrgencyLevel
 from app.agent.schemas.resource import Resource
 from app.agent.schemas.volunteer import Volunteer
 from pydantic import BaseModel
+from pydantic.json_schema import SkipJsonSchema
 
 class ResourceRequirement(BaseModel):
     resource_type: ResourceType
     quantity: int
 
 class Task(BaseModel):
+    # crud.task ID once the task is saved; not something the LLM fills in
+    task_id: SkipJsonSchema[Optional[str]] = None
     name: Optional[str] = None
     description: Optional[str] = None
     urgency: Optional[UrgencyLevel] = None
@@ -18,13 +21,16 @@ class Task(BaseModel):
 class ResourceAllocation(BaseModel):
     resource: Resource
     accepted: AcceptedType
+    reservation_id: Optional[str] = None  # crud.resource reservation holding the units
 
 class VolunteerAllocation(BaseModel):
     volunteer: Volunteer
     accepted: AcceptedType
+    reservation_id: Optional[str] = None  # hold taken with hold_volunteer
 
 class TaskAllocation(BaseModel):
     task: Task
     resource_allocations: Optional[List[ResourceAllocation]]
     volunteer_allocations: Optional[List[VolunteerAllocation]]
+    allocation_id: Optional[str] = None  # proposal to accept or reject (crud.allocation)
 
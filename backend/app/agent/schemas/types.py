@@ -49,4 +49,9 @@ class StatusType(str, Enum):
 class AcceptedType(str, Enum):
     YES = 'yes'
     NO = 'no'
-    PENDING = 'pending'
\ No newline at end of file
+    PENDING = 'pending'
+
+class AssignmentDecision(str, Enum):
+    ASSIGN = 'assign'        # confident match, no LLM needed
+    REJECT = 'reject'        # nothing plausible nearby, create a new disaster
+    AMBIGUOUS = 'ambiguous'  # let the LLM decide
@@ -0,0 +1,114 @@
+from redis.exceptions import RedisError
+
+from app.agent.config.pipeline_config_loader import PipelineConfig
+from app.agent.schemas.task import TaskAllocation
+from app.agent.utils.volunteer import confirm_volunteer, release_volunteer
+from app.crud import allocation as crud_allocation
+from app.crud.resource import StockConflict, commit_reservation, release_reservation
+from app.schemas.allocation import Allocation, AllocationCreate, AllocationStatus, ResourceHold, VolunteerHold
+
+from app.utils.logger import get_logger
+logger = get_logger(__name__)
+
+
+def new_allocation_id() -> str:
+    """ID of the next proposal; its holds are taken under allocation_holder(id)."""
+    return crud_allocation.new_id()
+
+
+def allocation_holder(allocation_id: str) -> str:
+    return f"allocation:{allocation_id}"
+
+
+def save_allocation(allocation_id: str, disaster_id: str, task_allocation: TaskAllocation) -> Allocation:
+    """
+    Persist a proposed TaskAllocation with the reservation / hold behind each
+    of its entries, so accept_allocation / reject_allocation can settle them.
+    """
+    return crud_allocation.create(allocation_id, AllocationCreate(
+        disaster_id=disaster_id,
+        task_id=task_allocation.task.task_id,
+        task=task_allocation.task.model_dump(mode="json"),
+        resources=[
+            ResourceHold(
+                resource_id=ra.resource.resource_id,
+                quantity=ra.resource.quantity,
+                reservation_id=ra.reservation_id,
+            )
+            for ra in task_allocation.resource_allocations or []
+        ],
+        volunteers=[
+            VolunteerHold(uid=va.volunteer.id, hold_id=va.reservation_id)
+            for va in task_allocation.volunteer_allocations or []
+        ],
+    ))
+
+
+def accept_allocation(allocation_id: str) -> Allocation:
+    """
+    Commit every stock reservation and confirm every volunteer hold of a
+    proposed allocation. Entries whose hold lapsed meanwhile are recorded
+    as not accepted. Both steps are idempotent: if this fails halfway, the
+    allocation stays ACCEPTING and accepting it again finishes the job.
+    ValueError / AllocationConflict as crud.allocation.claim.
+    """
+    allocation = crud_allocation.claim(allocation_id, AllocationStatus.ACCEPTING)
+    confirmed_hold_s = PipelineConfig().get('task_allocation')['confirmed_hold_s']
+    for hold in allocation.resources:
+        try:
+            commit_reservation(hold.reservation_id)
+            hold.accepted = True
+        except (StockConflict, ValueError) as e:
+            logger.info("Reservation %s of allocation %s was not kept: %s", hold.reservation_id, allocation_id, e)
+            hold.accepted = False
+    for hold in allocation.volunteers:
+        if hold.hold_id is None:
+            hold.accepted = True  # proposed without Redis: nothing to confirm
+            continue
+        try:
+            hold.accepted = confirm_volunteer(hold.uid, hold.hold_id, confirmed_hold_s)
+        except RedisError as e:
+            logger.warning("Could not confirm volunteer %s for allocation %s: %s", hold.uid, allocation_id, e)
+            hold.accepted = False
+        if not hold.accepted:
+            logger.info("Hold on volunteer %s for allocation %s had lapsed", hold.uid, allocation_id)
+    return crud_allocation.record_outcome(allocation)
+
+
+def reject_allocation(allocation_id: str) -> Allocation:
+    """
+    Give back every stock reservation and volunteer hold of a proposed
+    allocation; like accept_allocation, it can be retried if interrupted.
+    ValueError / AllocationConflict as crud.allocation.claim.
+    """
+    allocation = crud_allocation.claim(allocation_id, AllocationStatus.REJECTING)
+    for hold in allocation.resources:
+        try:
+            release_reservation(hold.reservation_id)
+        except ValueError as e:
+            logger.warning("Could not release reservation %s of allocation %s: %s", hold.reservation_id, allocation_id, e)
+        hold.accepted = False
+    for hold in allocation.volunteers:
+        if hold.hold_id is not None:
+            try:
+                release_volunteer(hold.uid, hold.hold_id)
+            except RedisError as e:
+                # the hold lapses on its own after hold_s
+                logger.warning("Could not release volunteer %s for allocation %s: %s", hold.uid, allocation_id, e)
+        hold.accepted = False
+    return crud_allocation.record_outcome(allocation)
+
+
+def release_task_holds(task_id: str) -> None:
+    """
+    Free the volunteers an accepted allocation holds for a task that has
+    completed or failed (their holds would otherwise last confirmed_hold_s).
+    """
+    for allocation in crud_allocation.list_by_task(task_id, AllocationStatus.ACCEPTED):
+        for hold in allocation.volunteers:
+            if not (hold.accepted and hold.hold_id):
+                continue
+            try:
+                release_volunteer(hold.uid, hold.hold_id)
+            except RedisError as e:
+                logger.warning("Could not release volunteer %s after task %s: %s", hold.uid, task_id, e)
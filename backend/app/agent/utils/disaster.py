@@ -6,32 +6,15 @@ from typing import List, Optional
 from app.agent.schemas.disaster import Disaster
 from app.agent.schemas.common import Coordinates
 from app.schemas.disaster import DisasterCreate
+from app.crud import request as crud_request
 from app.crud.disaster import create_disaster, list_disasters, get_disaster as crud_get_disaster
 
-from math import radians, sin, cos, sqrt, atan2
+from app.agent.utils.location import haversine_distance
 
 from app.utils.logger import get_logger
 logger = get_logger(__name__)
 
 
-def haversine_distance(lat1, lon1, lat2, lon2):
-    # Radius of Earth in kilometers
-    R = 6371.0
-    
-    # Convert latitude and longitude to radians
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-
-    # Compute differences
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-
-    # Haversine formula
-    a = sin(dlat / 2)**2 + cos(lat1) * cos(lat2) * sin(dlon / 2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1 - a))
-
-    return R * c  # in kilometers
-
-
 def load_disasters() -> List[Disaster]:
     """
     Fetch all disasters from Firestore and map them into our agent.Disaster schema.
@@ -49,12 +32,13 @@ def load_disasters() -> List[Disaster]:
                 disaster_coordinates=coords,
                 disaster_location=None,
                 disaster_summary=d.description,
+                created_at=d.created_at,
             )
         )
     return out
 
 
-def add_disaster(new_disaster: Disaster):
+def add_disaster(new_disaster: Disaster) -> str:
     # If disaster_coordinates is None, fall back to (0.0, 0.0)
     loc = new_disaster.disaster_coordinates or Coordinates(lat=0.0, lng=0.0)
 
@@ -70,7 +54,8 @@ def add_disaster(new_disaster: Disaster):
     )
 
     # Mark this one as coming from the agent
-    create_disaster(payload, is_agent_suggestion=True)
+    created = create_disaster(payload, is_agent_suggestion=True)
+    return created.id
 
 
 def get_disaster_by_id(disaster_id: str) -> Optional[Disaster]:
@@ -89,6 +74,7 @@ def get_disaster_by_id(disaster_id: str) -> Optional[Disaster]:
         disaster_coordinates=coords,
         disaster_location=None,
         disaster_summary=d.description,
+        created_at=d.created_at,
     )
 
 
@@ -113,4 +99,13 @@ def get_nearest_disasters(request: Request, top_n: int = 2) -> List[Disaster]:
 
     # Sort by distance and return top_n disasters
     distances.sort(key=lambda x: x[1])
-    return [disaster for disaster, _ in distances[:top_n]]
\ No newline at end of file
+    return [disaster for disaster, _ in distances[:top_n]]
+
+
+def link_request_to_disaster(request: Request) -> None:
+    """
+    Persist the agent's assignment on the originating request document, so it
+    no longer counts as unassigned (e.g. for hotspot detection).
+    """
+    if request.source_request_id and request.disaster_id:
+        crud_request.assign_disaster([request.source_request_id], request.disaster_id)
@@ -0,0 +1,123 @@
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set
+
+from app.agent.schemas.disaster import AssignmentResult, Disaster, DisasterMatch
+from app.agent.schemas.intake import Request
+from app.agent.schemas.types import AssignmentDecision
+from app.agent.utils.location import haversine_distance
+
+from app.utils.logger import get_logger
+logger = get_logger(__name__)
+
+
+_STOPWORDS = {"a", "an", "the", "in", "at", "of", "on", "near", "and", "to", "from"}
+_SUFFIXES = ("ing", "ed", "s")
+
+
+def _stem(word: str) -> str:
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[:-len(suffix)]
+    return word
+
+
+def disaster_type_terms(text: Optional[str]) -> Set[str]:
+    """
+    The words of a free-text disaster type or name, lower-cased and crudely
+    stemmed, so "Flooding", "floods" and "Flood in Colombo" all give "flood".
+    """
+    words = re.findall(r"[a-z]+", (text or "").lower())
+    return {_stem(w) for w in words if w not in _STOPWORDS}
+
+
+def disaster_type_key(text: Optional[str]) -> str:
+    """A stable key for a free-text disaster type ("unknown" when empty)."""
+    return "-".join(sorted(disaster_type_terms(text))) or "unknown"
+
+
+def _type_score(request_type: Optional[str], disaster_type: Optional[str]) -> float:
+    # disaster_type is the free-text disaster name, e.g. "Flood in Colombo"
+    a, b = disaster_type_terms(request_type), disaster_type_terms(disaster_type)
+    # Unknown on either side is neutral rather than a mismatch
+    if not a or not b:
+        return 0.5
+    # substring match between words, so "fire" still agrees with "wildfire"
+    return 1.0 if any(x in y or y in x for x in a for y in b) else 0.0
+
+
+def _recency_score(created_at: Optional[datetime], now: datetime, half_life_h: float) -> float:
+    if created_at is None:
+        return 0.5
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    age_h = max((now - created_at).total_seconds() / 3600, 0.0)
+    return 0.5 ** (age_h / half_life_h)
+
+
+def score_disaster(
+    request: Request,
+    disaster: Disaster,
+    cfg: Dict[str, Any],
+    now: Optional[datetime] = None,
+) -> Optional[DisasterMatch]:
+    """
+    Combine proximity, disaster-type agreement and recency into a 0..1 score.
+    Returns None when either side has no coordinates.
+    """
+    if not request.coordinates or not disaster.disaster_coordinates:
+        return None
+
+    now = now or datetime.now(timezone.utc)
+    distance_km = haversine_distance(
+        request.coordinates.latitude,
+        request.coordinates.longitude,
+        disaster.disaster_coordinates.latitude,
+        disaster.disaster_coordinates.longitude,
+    )
+
+    weights = cfg["weights"]
+    parts = {
+        "distance": 0.5 ** (distance_km / cfg["distance_half_km"]),
+        "type": _type_score(request.disaster_type, disaster.disaster_type),
+        "recency": _recency_score(disaster.created_at, now, cfg["recency_half_life_h"]),
+    }
+    score = sum(weights[k] * v for k, v in parts.items()) / sum(weights.values())
+
+    return DisasterMatch(disaster=disaster, distance_km=distance_km, score=score)
+
+
+def decide_assignment(
+    request: Request,
+    disasters: List[Disaster],
+    cfg: Dict[str, Any],
+    now: Optional[datetime] = None,
+) -> AssignmentResult:
+    """
+    Deterministic first pass of disaster assignment.
+      - ASSIGN     best candidate scores high and clearly beats the runner-up
+      - REJECT     nothing within range, or the best candidate scores low
+      - AMBIGUOUS  anything in between, left to the LLM
+    """
+    matches = [m for m in (score_disaster(request, d, cfg, now) for d in disasters) if m]
+    matches.sort(key=lambda m: m.score, reverse=True)
+
+    in_range = [m for m in matches if m.distance_km <= cfg["max_distance_km"]]
+    if not in_range:
+        return AssignmentResult(decision=AssignmentDecision.REJECT, candidates=matches)
+
+    best = in_range[0]
+    runner_up = in_range[1].score if len(in_range) > 1 else 0.0
+
+    if best.score >= cfg["auto_assign_score"] and best.score - runner_up >= cfg["min_margin"]:
+        decision = AssignmentDecision.ASSIGN
+    elif best.score < cfg["auto_reject_score"]:
+        decision = AssignmentDecision.REJECT
+    else:
+        decision = AssignmentDecision.AMBIGUOUS
+
+    logger.debug(
+        f"Assignment decision {decision.value}: best={best.disaster.disaster_id} "
+        f"score={best.score:.2f} distance={best.distance_km:.2f}km runner_up={runner_up:.2f}"
+    )
+    return AssignmentResult(decision=decision, best=best, candidates=matches)
@@ -0,0 +1,183 @@
+"""
+Geo-temporal hotspot detection over requests and observations that no
+disaster has claimed yet. Two points are neighbours when they are within
+`eps_km` of each other AND within `time_window_h` in time; DBSCAN then
+groups dense neighbourhoods into hotspots, each proposed as one disaster.
+"""
+
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from pydantic import BaseModel
+from scipy.sparse import csr_matrix
+from sklearn.cluster import DBSCAN
+from sklearn.neighbors import NearestNeighbors
+
+from app.crud import observation as crud_observation
+from app.crud import request as crud_request
+from app.crud.disaster import create_disaster
+from app.crud.observation import list_unassigned_observations
+from app.schemas.disaster import DisasterCreate
+
+from app.utils.logger import get_logger
+logger = get_logger(__name__)
+
+EARTH_RADIUS_KM = 6371.0
+
+
+class HotspotPoint(BaseModel):
+    kind: str                   # "request" | "observation"
+    id: str
+    lat: float
+    lng: float
+    created_at: datetime
+    category: Optional[str] = None
+    affected_people: Optional[int] = None
+
+
+class Hotspot(BaseModel):
+    lat: float
+    lng: float
+    points: List[HotspotPoint]
+
+    @property
+    def request_ids(self) -> List[str]:
+        return [p.id for p in self.points if p.kind == "request"]
+
+    @property
+    def observation_ids(self) -> List[str]:
+        return [p.id for p in self.points if p.kind == "observation"]
+
+    @property
+    def observation_count(self) -> int:
+        return len(self.observation_ids)
+
+
+def _as_utc(ts: datetime) -> datetime:
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def cluster_points(points: List[HotspotPoint], cfg: Dict[str, Any]) -> List[Hotspot]:
+    """
+    Spatio-temporal DBSCAN. Only pairs inside the spatial radius are ever
+    materialised (ball tree on haversine), so memory grows with the number of
+    close pairs rather than n^2.
+    """
+    if len(points) < cfg["min_samples"]:
+        return []
+
+    coords = np.radians([[p.lat, p.lng] for p in points])
+    hours = np.array([_as_utc(p.created_at).timestamp() / 3600 for p in points])
+
+    neighbours = NearestNeighbors(radius=cfg["eps_km"] / EARTH_RADIUS_KM, metric="haversine").fit(coords)
+    graph = neighbours.radius_neighbors_graph(coords, mode="distance").tocoo()
+
+    # Scale both dimensions so that 1.0 is the edge of the neighbourhood in each
+    spatial = graph.data * EARTH_RADIUS_KM / cfg["eps_km"]
+    temporal = np.abs(hours[graph.row] - hours[graph.col]) / cfg["time_window_h"]
+    scaled = np.maximum(spatial, temporal)
+    keep = scaled <= 1.0
+    # implicit zeros mean "not a neighbour" in a sparse precomputed matrix
+    st_graph = csr_matrix(
+        (np.maximum(scaled[keep], 1e-9), (graph.row[keep], graph.col[keep])),
+        shape=(len(points), len(points)),
+    )
+
+    labels = DBSCAN(eps=1.0, min_samples=cfg["min_samples"], metric="precomputed").fit_predict(st_graph)
+
+    hotspots = []
+    for label in sorted(set(labels) - {-1}):
+        members = [p for p, l in zip(points, labels) if l == label]
+        hotspots.append(Hotspot(
+            lat=float(np.mean([p.lat for p in members])),
+            lng=float(np.mean([p.lng for p in members])),
+            points=members,
+        ))
+    return hotspots
+
+
+def collect_points(cfg: Dict[str, Any], now: Optional[datetime] = None) -> List[HotspotPoint]:
+    now = now or datetime.now(timezone.utc)
+    since = now - timedelta(hours=cfg["lookback_h"])
+    # Fresh requests are still going through the per-request agent pipeline
+    until = now - timedelta(minutes=cfg["min_age_min"])
+
+    points: List[HotspotPoint] = []
+    for r in crud_request.list_unassigned(since, until):
+        auto_extract = r.auto_extract or {}
+        points.append(HotspotPoint(
+            kind="request",
+            id=r.id,
+            lat=r.location.lat,
+            lng=r.location.lng,
+            created_at=r.created_at,
+            category=r.type_of_need,
+            affected_people=auto_extract.get("affected_people_count"),
+        ))
+
+    for o in list_unassigned_observations(since):
+        if o.latitude is None or o.longitude is None:
+            continue
+        points.append(HotspotPoint(
+            kind="observation",
+            id=o.id,
+            lat=o.latitude,
+            lng=o.longitude,
+            created_at=o.created_at,
+            category=o.observation_type,
+        ))
+
+    if len(points) > cfg["max_points"]:
+        points.sort(key=lambda p: _as_utc(p.created_at), reverse=True)
+        points = points[:cfg["max_points"]]
+    return points
+
+
+def _to_disaster(hotspot: Hotspot) -> DisasterCreate:
+    requests = [p for p in hotspot.points if p.kind == "request"]
+    categories = Counter(p.category for p in hotspot.points if p.category)
+    dominant = categories.most_common(1)[0][0] if categories else "unknown"
+    times = sorted(_as_utc(p.created_at) for p in hotspot.points)
+    affected = sum(p.affected_people or 0 for p in requests) or len(requests)
+
+    description = (
+        f"Hotspot detected from {len(requests)} unassigned requests and "
+        f"{hotspot.observation_count} observations between "
+        f"{times[0]:%Y-%m-%d %H:%M} and {times[-1]:%Y-%m-%d %H:%M} UTC. "
+        f"Reported needs: " + ", ".join(f"{k} ({v})" for k, v in categories.most_common())
+    )
+    return DisasterCreate(
+        name=f"Suspected {dominant} hotspot",
+        description=description,
+        location={"lat": hotspot.lat, "lng": hotspot.lng},
+        affected_count=affected,
+    )
+
+
+def propose_hotspot_disasters(cfg: Dict[str, Any], now: Optional[datetime] = None) -> List[str]:
+    """
+    Cluster recent unassigned points, create one agent-suggested disaster per
+    hotspot that contains at least one request, and link the hotspot's
+    requests and observations to it (so later runs no longer cluster them).
+    Returns the IDs of the created disasters.
+    """
+    points = collect_points(cfg, now)
+    hotspots = cluster_points(points, cfg)
+    logger.info("Hotspot detection: %s unassigned points, %s hotspots", len(points), len(hotspots))
+
+    created = []
+    for hotspot in hotspots:
+        # observation-only clusters stay for humans to review
+        if not hotspot.request_ids:
+            continue
+        disaster = create_disaster(_to_disaster(hotspot), is_agent_suggestion=True)
+        crud_request.assign_disaster(hotspot.request_ids, disaster.id)
+        crud_observation.assign_disaster(hotspot.observation_ids, disaster.id)
+        logger.info(
+            "Proposed disaster %s at (%.4f, %.4f) linking %s requests and %s observations",
+            disaster.id, hotspot.lat, hotspot.lng, len(hotspot.request_ids), hotspot.observation_count,
+        )
+        created.append(disaster.id)
+    return created
@@ -1,15 +1,130 @@
+import asyncio
 import os
-from typing import Optional, Type, Any
-from groq import Groq
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple, Type, Any
+from groq import BadRequestError
 import instructor
-from langfuse.decorators import langfuse_context, observe
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt
+
+from app.agent.config.llms_config_loader import LLMConfig
+from app.agent.core.budget import remaining_budget
+from app.agent.utils.llm_providers import get_provider
+from app.agent.utils.prompt import estimate_tokens
+from app.agent.utils.schema_repair import repairable, salvage
+from app.core import llm_tracing, tracing
+from app.utils import metrics
+
+from app.utils.logger import get_logger
+logger = get_logger(__name__)
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    """Raised when no model in the fallback chain answered before the deadline."""
+
+
+_LABELS = ("trace_name", "model")
+CALL_SECONDS = metrics.histogram("llm_call_seconds", "End-to-end GroqAgent.complete wall time", _LABELS)
+ATTEMPT_SECONDS = metrics.histogram(
+    "llm_attempt_seconds", "Wall time of one model attempt in the hedge chain", _LABELS + ("outcome",)
+)
+TTFT_SECONDS = metrics.histogram("llm_ttft_seconds", "Provider queue + prompt time (time to first token)", _LABELS)
+PROMPT_TOKENS = metrics.histogram("llm_prompt_tokens", "Prompt tokens per attempt, all re-asks included", _LABELS, metrics.TOKEN_BUCKETS)
+COMPLETION_TOKENS = metrics.histogram("llm_completion_tokens", "Completion tokens per attempt, all re-asks included", _LABELS, metrics.TOKEN_BUCKETS)
+RETRIES = metrics.counter("llm_validation_retries_total", "Instructor re-asks after a validation failure", _LABELS)
+
+
+class CallUsage:
+    """Provider-reported usage of one model attempt, summed over instructor re-asks."""
+
+    def __init__(self):
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.ttft_s: Optional[float] = None
+        self.wall_s = 0.0
+
+    @property
+    def retries(self) -> int:
+        return max(self.requests - 1, 0)
+
+
+# Set per attempt task; instructor hooks fire inside that task's context
+_usage: ContextVar[Optional[CallUsage]] = ContextVar("llm_call_usage", default=None)
+
+
+def _on_completion_kwargs(*args, **kwargs) -> None:
+    usage = _usage.get()
+    if usage is not None:
+        usage.requests += 1
+
+
+def _on_completion_response(response: Any) -> None:
+    usage, raw = _usage.get(), getattr(response, "usage", None)
+    if usage is None or raw is None:
+        return
+    usage.prompt_tokens += raw.prompt_tokens or 0
+    usage.completion_tokens += raw.completion_tokens or 0
+    # Non-streaming: Groq reports queue and prompt-processing time, which together
+    # are when the first output token was produced
+    queue_time, prompt_time = getattr(raw, "queue_time", None), getattr(raw, "prompt_time", None)
+    if prompt_time is not None:
+        usage.ttft_s = (queue_time or 0.0) + prompt_time
+
+
+def _failed_generation(error: BaseException) -> Optional[str]:
+    """
+    Groq rejects tool calls it cannot parse with a 400 `tool_use_failed`
+    that still carries the raw generation.
+    """
+    if not isinstance(error, BadRequestError) or not isinstance(error.body, dict):
+        return None
+    body = error.body.get("error", error.body)
+    if not isinstance(body, dict) or body.get("code") != "tool_use_failed":
+        return None
+    return body.get("failed_generation")
+
+
+# Hedged calls run as asyncio tasks on one background loop per process so the
+# losing request can actually be cancelled (closing its HTTP stream) instead of
+# being left to run to completion in a thread.
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_pid: Optional[int] = None
+_loop_lock = threading.Lock()
+_clients: Dict[Tuple[str, Optional[str]], instructor.AsyncInstructor] = {}
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop, _loop_pid
+    with _loop_lock:
+        # Celery prefork children must not reuse the parent's (dead) loop thread
+        if _loop is None or _loop_pid != os.getpid():
+            _loop = asyncio.new_event_loop()
+            _loop_pid = os.getpid()
+            _clients.clear()
+            threading.Thread(target=_loop.run_forever, name="llm-hedge-loop", daemon=True).start()
+        return _loop
+
+
+def _get_client(provider, api_key: Optional[str]) -> instructor.AsyncInstructor:
+    # Only ever touched from the loop thread, so no lock is needed
+    key = (provider.name, api_key)
+    if key not in _clients:
+        client = provider.create_client(api_key)
+        client.on("completion:kwargs", _on_completion_kwargs)
+        client.on("completion:response", _on_completion_response)
+        _clients[key] = client
+    return _clients[key]
+
 
 class GroqAgent:
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, llm_config: Optional[LLMConfig] = None):
         self.api_key = api_key or os.environ.get("GROQ_API_KEY")
-        self.client = instructor.patch(Groq(api_key=self.api_key))
+        self.llm_cfg = llm_config or LLMConfig()
+        self.provider = get_provider(self.llm_cfg)
 
-    @observe(as_type="generation", name='llm_groq_generation')
+    @llm_tracing.observe(name='llm_groq_generation')
     def complete(
         self,
         system_prompt: str,
@@ -46,10 +161,10 @@ class GroqAgent:
            messages = [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt},
-            ] 
+            ]
 
         # Log the input and model parameters before calling the LLM
-        langfuse_context.update_current_observation(
+        llm_tracing.update_current_observation(
             input=messages,
             model=model,
             name=f'llm_groq_{trace_name}'
@@ -57,19 +172,204 @@ class GroqAgent:
             # metadata=kwargs_clone,
         )
 
-        response = self.client.chat.completions.create(
-            model=model,
-            response_model=response_model,
-            messages=messages,
-            max_retries=max_retries,
-        )
+        prompt_tokens = estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+        logger.info("%s: prompt ~%s tokens", trace_name, prompt_tokens)
 
-        langfuse_context.update_current_observation(
+        # trace names mirror the task keys of llms_config.yaml (parse_text -> PARSE_TEXT)
+        task = trace_name.upper()
+        models = [model] + self.llm_cfg.get_fallbacks('groq', task)
+
+        # Per-call deadline: the call ceiling, shortened by what is left of the request budget
+        timeout = self.llm_cfg.get_call_timeout()
+        budget = remaining_budget()
+        if budget is not None:
+            timeout = min(timeout, budget)
+        if timeout <= 0:
+            raise LLMDeadlineExceeded(f"{trace_name}: request latency budget exhausted before the call")
+
+        # Near-miss outputs are repaired locally instead of costing a re-ask
+        repair_model, unwrap = repairable(response_model, trace_name)
+
+        started = time.monotonic()
+        # the hedge loop runs on its own thread: the span covers the whole chain
+        with tracing.span(f"llm {trace_name}", tracing.CLIENT, **{"llm.model": model, "llm.timeout_s": round(timeout, 3)}) as span:
+            future = asyncio.run_coroutine_threadsafe(
+                self._hedged_create(
+                    models=models,
+                    messages=messages,
+                    response_model=repair_model,
+                    unwrap=unwrap,
+                    max_retries=max_retries,
+                    hedge_after=self.llm_cfg.get_hedge_after(task),
+                    deadline=time.monotonic() + timeout,
+                    trace_name=trace_name,
+                ),
+                _get_loop(),
+            )
+            try:
+                response, used_model, usage = future.result()
+            except Exception:
+                CALL_SECONDS.observe(time.monotonic() - started, trace_name=trace_name, model="none")
+                raise
+            span.set(**{
+                "llm.used_model": used_model,
+                "llm.prompt_tokens": usage.prompt_tokens,
+                "llm.completion_tokens": usage.completion_tokens,
+                "llm.retries": usage.retries,
+                "llm.ttft_s": usage.ttft_s,
+            })
+        CALL_SECONDS.observe(time.monotonic() - started, trace_name=trace_name, model=used_model)
+
+        logger.info(
+            "%s: %s answered in %.2fs (ttft %ss, %s prompt / %s completion tokens, %s retries)",
+            trace_name, used_model, usage.wall_s, usage.ttft_s,
+            usage.prompt_tokens, usage.completion_tokens, usage.retries,
+        )
+        llm_tracing.update_current_observation(
+            model=used_model,
             usage_details={
-                "input": len(str(messages)),
-                "output": len(str(response))
+                "input": usage.prompt_tokens or prompt_tokens,
+                "output": usage.completion_tokens or estimate_tokens(str(response))
+            },
+            metadata={
+                "ttft_s": usage.ttft_s,
+                "wall_s": usage.wall_s,
+                "retries": usage.retries,
+                "trace_id": tracing.current_trace_id(),
             },
             output=str(response)
         )
 
-        return response
+        if unwrap:
+            return response.content
+        # hand callers the plain schema type, not the repair subclass
+        return response_model.model_validate(response.model_dump(by_alias=True))
+
+    async def _hedged_create(
+        self,
+        models: List[str],
+        messages: List[dict],
+        response_model: Type[Any],
+        unwrap: bool,
+        max_retries: int,
+        hedge_after: float,
+        deadline: float,
+        trace_name: str,
+    ) -> Tuple[Any, str, CallUsage]:
+        """
+        Fire the primary model, then one more model from the chain every
+        `hedge_after` seconds (or straight away when an attempt fails) until one
+        answers. The first successful answer wins and every other attempt is cancelled.
+        When every model failed before the deadline, the last failure is raised as is.
+        """
+        client = _get_client(self.provider, self.api_key)
+        queue = list(models)
+        pending: Dict[asyncio.Task, str] = {}
+        errors: List[BaseException] = []
+        next_launch = time.monotonic()
+
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+
+                if queue and (now >= next_launch or not pending):
+                    attempt_model = queue.pop(0)
+                    if pending:
+                        logger.info("%s: no answer after %ss, hedging onto %s", trace_name, hedge_after, attempt_model)
+                    attempt = asyncio.ensure_future(self._attempt(
+                        client,
+                        trace_name,
+                        unwrap,
+                        model=attempt_model,
+                        response_model=response_model,
+                        messages=messages,
+                        max_retries=max_retries,
+                        timeout=deadline - now,
+                    ))
+                    pending[attempt] = attempt_model
+                    next_launch = now + hedge_after
+                    continue
+
+                if not pending:
+                    break
+
+                wake_at = min(deadline, next_launch) if queue else deadline
+                done, _ = await asyncio.wait(
+                    pending, timeout=max(wake_at - now, 0), return_when=asyncio.FIRST_COMPLETED
+                )
+                for attempt in done:
+                    attempt_model = pending.pop(attempt)
+                    if attempt.exception() is None:
+                        response, usage = attempt.result()
+                        return response, attempt_model, usage
+                    logger.warning("%s: %s failed: %s", trace_name, attempt_model, attempt.exception())
+                    errors.append(attempt.exception())
+        finally:
+            for attempt in pending:
+                attempt.cancel()
+
+        last_error = errors[-1] if errors else None
+        if last_error is not None and not queue and time.monotonic() < deadline:
+            # the chain ran out, not the clock: surface the provider's error
+            raise last_error
+        raise LLMDeadlineExceeded(
+            f"{trace_name}: no completion before the deadline (models tried: {', '.join(models[:len(models) - len(queue)])})"
+        ) from last_error
+
+    async def _attempt(
+        self,
+        client: instructor.AsyncInstructor,
+        trace_name: str,
+        unwrap: bool,
+        max_retries: int,
+        **kwargs,
+    ) -> Tuple[Any, CallUsage]:
+        """
+        One model of the hedge chain, with its usage recorded whatever the outcome.
+        """
+        usage = CallUsage()
+        _usage.set(usage)
+        started = time.monotonic()
+        outcome = "error"
+        attempts_left = max(max_retries, 1)
+        try:
+            while True:
+                # A provider-rejected tool call is salvaged locally before spending
+                # another attempt on it, so it must not be retried inside instructor
+                retrying = AsyncRetrying(
+                    stop=stop_after_attempt(attempts_left),
+                    retry=retry_if_exception(lambda e: _failed_generation(e) is None),
+                )
+                try:
+                    response = await client.chat.completions.create(max_retries=retrying, **kwargs)
+                    break
+                except BadRequestError as e:
+                    failed_generation = _failed_generation(e)
+                    if failed_generation is None:
+                        raise
+                    response = salvage(failed_generation, kwargs["response_model"], unwrap)
+                    if response is not None:
+                        logger.info("%s: salvaged rejected tool call from %s", trace_name, kwargs['model'])
+                        break
+                    attempts_left -= 1
+                    if attempts_left <= 0:
+                        raise
+            outcome = "ok"
+            return response, usage
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            usage.wall_s = time.monotonic() - started
+            labels = {"trace_name": trace_name, "model": kwargs["model"]}
+            ATTEMPT_SECONDS.observe(usage.wall_s, outcome=outcome, **labels)
+            # a cancelled attempt never got a provider response to account for
+            if usage.prompt_tokens or usage.completion_tokens:
+                PROMPT_TOKENS.observe(usage.prompt_tokens, **labels)
+                COMPLETION_TOKENS.observe(usage.completion_tokens, **labels)
+            if usage.retries:
+                RETRIES.inc(usage.retries, **labels)
+            if usage.ttft_s is not None:
+                TTFT_SECONDS.observe(usage.ttft_s, **labels)
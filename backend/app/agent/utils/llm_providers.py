@@ -0,0 +1,255 @@
+"""
+LLM backends behind GroqAgent and the chatbot's LangChain models.
+
+    groq  the real Groq API (default)
+    stub  offline and deterministic: schema-valid answers generated from the
+          response model, with injected latency and failures, for load tests
+
+Selected by `provider` in llms_config.yaml or the LLM_PROVIDER env variable.
+"""
+
+import asyncio
+import json
+import math
+import random
+import re
+import time
+import types
+import typing
+from collections import defaultdict
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+import instructor
+from instructor.hooks import Hooks
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import BaseModel
+from tenacity import AsyncRetrying, RetryError, stop_after_attempt
+
+from app.agent.config.llms_config_loader import LLMConfig
+from app.agent.utils.prompt import estimate_tokens
+
+from app.utils.logger import get_logger
+logger = get_logger(__name__)
+
+
+class StubProviderError(RuntimeError):
+    """Failure injected by the stub provider."""
+
+
+# ------------------------------ groq ------------------------------------- #
+class GroqProvider:
+    name = "groq"
+
+    def __init__(self, llm_cfg: LLMConfig):
+        self.llm_cfg = llm_cfg
+
+    def create_client(self, api_key: Optional[str]) -> instructor.AsyncInstructor:
+        from groq import AsyncGroq
+
+        # SDK-level retries are disabled: the hedge chain is the retry policy
+        return instructor.from_groq(AsyncGroq(api_key=api_key, max_retries=0))
+
+    def chat_model(self, task: str) -> BaseChatModel:
+        from langchain.chat_models import init_chat_model
+
+        return init_chat_model(f"groq:{self.llm_cfg.get_chat_model('groq', task)}")
+
+
+# ------------------------------ stub ------------------------------------- #
+_DISASTER_ID = re.compile(r"""['"]disaster_id['"]\s*:\s*['"]([^'"]+)['"]""")
+
+
+def _fake(annotation: Any, rng: random.Random, name: str, cfg: Dict[str, Any]) -> Any:
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+
+    if origin is typing.Annotated:
+        return _fake(args[0], rng, name, cfg)
+    if origin in (typing.Union, types.UnionType):
+        non_null = [a for a in args if a is not type(None)]
+        return _fake(non_null[0], rng, name, cfg) if non_null else None
+    if origin in (list, typing.List):
+        return [_fake(args[0] if args else str, rng, name, cfg) for _ in range(rng.randint(1, 3))]
+    if origin in (dict, typing.Dict):
+        return {}
+
+    if isinstance(annotation, type):
+        if issubclass(annotation, BaseModel):
+            return {
+                (field.alias or field_name): _fake(field.annotation, rng, field_name, cfg)
+                for field_name, field in annotation.model_fields.items()
+            }
+        if issubclass(annotation, Enum):
+            return rng.choice(list(annotation)).value
+        if annotation is bool:
+            return rng.random() < 0.5
+        if annotation is int:
+            return rng.randint(1, 20)
+        if annotation is float:
+            lat, lng = cfg["center"]
+            if name in ("lat", "latitude"):
+                return lat + rng.uniform(-cfg["spread_deg"], cfg["spread_deg"])
+            if name in ("lng", "longitude"):
+                return lng + rng.uniform(-cfg["spread_deg"], cfg["spread_deg"])
+            return rng.random()
+        if annotation is str:
+            return f"{name.replace('_', ' ')} {rng.randrange(16 ** 6):06x}"
+        if annotation is datetime:
+            return datetime.now(timezone.utc).isoformat()
+    return None
+
+
+def fake_response(response_model: typing.Type[BaseModel], rng: random.Random, prompt: str, cfg: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Schema-valid data for `response_model`. A bare Optional[str] answer (the
+    disaster-assignment shape) picks one of the disaster IDs quoted in the
+    prompt, or None, so the pipeline exercises both of its branches.
+    """
+    fields = response_model.model_fields
+    if list(fields) == ["content"] and fields["content"].annotation == Optional[str]:
+        candidates = _DISASTER_ID.findall(prompt)
+        return {"content": rng.choice(candidates + [None])}
+    return _fake(response_model, rng, "", cfg)
+
+
+class _StubRandom:
+    """
+    Per-call RNGs derived from (seed, model, prompt, n-th repeat), so a run is
+    reproducible regardless of how concurrent calls interleave.
+    """
+
+    def __init__(self, seed: Any):
+        self.seed = seed
+        self._seen: Dict[str, int] = defaultdict(int)
+
+    def for_call(self, *parts: str) -> random.Random:
+        key = ":".join((str(self.seed),) + parts)
+        n = self._seen[key]
+        self._seen[key] += 1
+        return random.Random(f"{key}:{n}")
+
+
+def _draw_latency(rng: random.Random, cfg: Dict[str, Any]) -> float:
+    latency = cfg["latency_s"]
+    return rng.lognormvariate(math.log(latency["median"]), latency["sigma"])
+
+
+class _StubCompletions:
+    def __init__(self, client: "StubClient"):
+        self.client = client
+
+    async def create(self, model: str, response_model: Any, messages: List[dict], max_retries: Any = 1, timeout: Optional[float] = None, **kwargs):
+        retrying = max_retries if isinstance(max_retries, AsyncRetrying) else AsyncRetrying(stop=stop_after_attempt(max_retries))
+        try:
+            async for attempt in retrying:
+                with attempt:
+                    self.client.hooks.emit_completion_arguments(model=model, messages=messages)
+                    return await self.client.complete_once(model, response_model, messages, timeout)
+        except RetryError as e:
+            e.reraise()
+
+
+class StubClient:
+    """Quacks like the instructor client surface GroqAgent uses."""
+
+    def __init__(self, cfg: Dict[str, Any], rng: _StubRandom):
+        self.cfg = cfg
+        self.rng = rng
+        self.hooks = Hooks()
+        self.chat = types.SimpleNamespace(completions=_StubCompletions(self))
+
+    def on(self, hook_name: str, handler) -> None:
+        self.hooks.on(hook_name, handler)
+
+    async def complete_once(self, model: str, response_model: Any, messages: List[dict], timeout: Optional[float]) -> Any:
+        prompt = json.dumps(messages, sort_keys=True, default=str)
+        rng = self.rng.for_call(model, prompt)
+        latency = _draw_latency(rng, self.cfg)
+        roll = rng.random()
+
+        if roll < self.cfg["timeout_rate"] or (timeout is not None and latency > timeout):
+            await asyncio.sleep(timeout if timeout is not None else latency)
+            raise TimeoutError(f"stub {model}: request timed out")
+        await asyncio.sleep(latency)
+        if roll < self.cfg["timeout_rate"] + self.cfg["failure_rate"]:
+            raise StubProviderError(f"stub {model}: injected failure")
+
+        data = fake_response(response_model, rng, prompt, self.cfg)
+        self.hooks.emit_completion_response(types.SimpleNamespace(usage=types.SimpleNamespace(
+            prompt_tokens=estimate_tokens(prompt),
+            completion_tokens=estimate_tokens(json.dumps(data, default=str)),
+            queue_time=latency * 0.1,
+            prompt_time=latency * 0.2,
+        )))
+        return response_model.model_validate(data)
+
+
+class StubChatModel(BaseChatModel):
+    """LangChain chat model answering with canned replies after a seeded delay."""
+
+    reply: str
+    stub_cfg: Dict[str, Any]
+    rng: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "StubChatModel":
+        # never calls tools: the chatbot graph ends after one model turn
+        return self
+
+    def _next(self, messages: List[BaseMessage]) -> typing.Tuple[float, ChatResult]:
+        rng = self.rng.for_call("chat", json.dumps([m.content for m in messages], default=str))
+        result = ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))])
+        return _draw_latency(rng, self.stub_cfg), result
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        latency, result = self._next(messages)
+        time.sleep(latency)
+        return result
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        latency, result = self._next(messages)
+        await asyncio.sleep(latency)
+        return result
+
+
+class StubProvider:
+    name = "stub"
+
+    def __init__(self, llm_cfg: LLMConfig):
+        self.cfg = llm_cfg.get_stub()
+        self.rng = _StubRandom(self.cfg["seed"])
+
+    def create_client(self, api_key: Optional[str]) -> StubClient:
+        return StubClient(self.cfg, self.rng)
+
+    def chat_model(self, task: str) -> BaseChatModel:
+        replies = self.cfg["chat_replies"]
+        return StubChatModel(reply=replies.get(task, replies["DEFAULT"]), stub_cfg=self.cfg, rng=self.rng)
+
+
+# ----------------------------- selection --------------------------------- #
+_PROVIDERS = {"groq": GroqProvider, "stub": StubProvider}
+_instances: Dict[str, Any] = {}
+
+
+def get_provider(llm_cfg: Optional[LLMConfig] = None):
+    llm_cfg = llm_cfg or LLMConfig()
+    name = llm_cfg.get_provider()
+    if name not in _PROVIDERS:
+        raise ValueError(f"Unknown LLM provider '{name}' (expected one of {', '.join(_PROVIDERS)})")
+    # one instance per process keeps the stub's call sequence (and so its output) reproducible
+    if name not in _instances:
+        logger.info("Using LLM provider: %s", name)
+        _instances[name] = _PROVIDERS[name](llm_cfg)
+    return _instances[name]
+
+
+def get_chat_model(task: str) -> BaseChatModel:
+    return get_provider().chat_model(task)
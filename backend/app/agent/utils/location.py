@@ -1,18 +1,72 @@
 from typing import Optional
 from app.agent.schemas.common import Coordinates
 from geopy.geocoders import Nominatim
+from math import radians, sin, cos, sqrt, atan2
+
+from app.core import tracing
 
 from app.utils.logger import get_logger
 logger = get_logger(__name__)
 
+
+def haversine_distance(lat1, lon1, lat2, lon2):
+    # Radius of Earth in kilometers
+    R = 6371.0
+    
+    # Convert latitude and longitude to radians
+    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
+
+    # Compute differences
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+
+    # Haversine formula
+    a = sin(dlat / 2)**2 + cos(lat1) * cos(lat2) * sin(dlon / 2)**2
+    c = 2 * atan2(sqrt(a), sqrt(1 - a))
+
+    return R * c  # in kilometers
+
+
+_GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash_encode(lat: float, lon: float, precision: int = 5) -> str:
+    """
+    Standard base32 geohash of a point. Precision 5 is a cell of roughly 5 km x 5 km.
+    """
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+
+    while len(chars) < precision:
+        # bits alternate between longitude and latitude, longitude first
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits = bits << 1
+            rng[1] = mid
+        even = not even
+
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_GEOHASH_BASE32[bits])
+            bits, bit_count = 0, 0
+
+    return "".join(chars)
+
+
 def get_location(coordinates: Coordinates) -> Optional[str]:
     logger.info('Inside get_location tool')
-    logger.debug(f'lat:{coordinates.latitude}, lon:{coordinates.longitude}')
+    logger.debug("lat:%s, lon:%s", coordinates.latitude, coordinates.longitude)
     
     try:
-        geolocator = Nominatim(user_agent="disaster-locator")
-        location = geolocator.reverse((coordinates.latitude, coordinates.longitude), exactly_one=True, timeout=10)
+        with tracing.span("geocode.reverse", tracing.CLIENT, provider="nominatim") as span:
+            geolocator = Nominatim(user_agent="disaster-locator")
+            location = geolocator.reverse((coordinates.latitude, coordinates.longitude), exactly_one=True, timeout=10)
+            span.set(found=location is not None)
         return location.address if location else None
     except Exception as e:
-        logger.error(f"During reverse geocoding: {e}")
+        logger.error("During reverse geocoding: %s", e)
         return None
\ No newline at end of file
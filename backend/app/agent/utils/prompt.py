@@ -0,0 +1,115 @@
+import json
+import math
+import re
+from typing import Any, Iterable, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from app.utils.logger import get_logger
+logger = get_logger(__name__)
+
+# Llama-family tokenizers average ~4 chars per token on English prose; JSON
+# punctuation and numbers tokenize denser, so err on the safe side.
+DEFAULT_CHARS_PER_TOKEN = 3.5
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def estimate_tokens(text: str, chars_per_token: float = DEFAULT_CHARS_PER_TOKEN) -> int:
+    if not text:
+        return 0
+    return math.ceil(len(text) / chars_per_token)
+
+
+def compact(obj: Any, fields: Optional[Iterable[str]] = None) -> str:
+    """
+    Render a model/dict as minified JSON, keeping only `fields` and dropping
+    empty values, instead of a Python repr of every attribute.
+    """
+    if isinstance(obj, BaseModel):
+        # dump only the fields asked for
+        data = obj.model_dump(include=set(fields) if fields is not None else None)
+    else:
+        data = dict(obj)
+    if fields is not None:
+        data = {k: data.get(k) for k in fields}
+    data = {k: v for k, v in data.items() if v not in (None, "", [], {})}
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def relevance(query: str, text: str) -> float:
+    """
+    Share of the query's words that also appear in `text` (0..1).
+    """
+    query_words = set(_WORD.findall(query.lower()))
+    if not query_words:
+        return 0.0
+    return len(query_words & set(_WORD.findall(text.lower()))) / len(query_words)
+
+
+class PromptBuilder:
+    """
+    Assembles a prompt from sections under a token budget. Required sections
+    are always kept; ranked sections get whatever budget is left, best item
+    first, and items that no longer fit are dropped (or truncated when at
+    least `min_partial_tokens` are still available).
+    """
+
+    def __init__(
+        self,
+        max_tokens: int,
+        chars_per_token: float = DEFAULT_CHARS_PER_TOKEN,
+        min_partial_tokens: int = 64,
+    ):
+        self.max_tokens = max_tokens
+        self.chars_per_token = chars_per_token
+        self.min_partial_tokens = min_partial_tokens
+        self._sections: List[Tuple[str, str, Optional[List[str]]]] = []
+        self.dropped: dict = {}
+
+    def _tokens(self, text: str) -> int:
+        return estimate_tokens(text, self.chars_per_token)
+
+    def add(self, header: str, body: str) -> "PromptBuilder":
+        self._sections.append((header, body, None))
+        return self
+
+    def add_ranked(self, header: str, items: List[Tuple[float, str]]) -> "PromptBuilder":
+        """
+        `items` are (score, text) pairs; ties keep their given order.
+        """
+        ranked = [text for _, text in sorted(items, key=lambda it: it[0], reverse=True)]
+        self._sections.append((header, "", ranked))
+        return self
+
+    def build(self) -> str:
+        fixed = sum(self._tokens(f"{h}\n{b}\n\n") for h, b, ranked in self._sections if ranked is None)
+        remaining = self.max_tokens - fixed
+        if remaining < 0:
+            logger.warning("Required prompt sections alone exceed the budget (%s > %s tokens)", fixed, self.max_tokens)
+
+        rendered = []
+        for header, body, ranked in self._sections:
+            if ranked is None:
+                rendered.append(f"{header}\n{body}")
+                continue
+
+            kept = []
+            remaining -= self._tokens(f"{header}\n\n")
+            for i, text in enumerate(ranked):
+                cost = self._tokens(text) + 1
+                if cost <= remaining:
+                    kept.append(text)
+                    remaining -= cost
+                    continue
+                if remaining >= self.min_partial_tokens:
+                    kept.append(text[:int((remaining - 1) * self.chars_per_token)].rstrip() + " ...")
+                    remaining = 0
+                    i += 1
+                self.dropped[header] = len(ranked) - i
+                break
+            rendered.append(f"{header}\n" + ("\n".join(kept) if kept else "(none)"))
+
+        if self.dropped:
+            logger.info("Prompt trimmed to %s tokens, dropped items: %s", self.max_tokens, self.dropped)
+        return "\n\n".join(rendered)
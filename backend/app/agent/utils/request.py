@@ -56,7 +56,6 @@ def parse_text(prompt) -> TextParserOutput:
         trace_name='parse_text'
     )
 
-    for key, value in parsed_request.dict().items():
-        logger.debug(f"{key}: {value}")
+    logger.debug("Parsed request: %r", parsed_request)
 
     return parsed_request
\ No newline at end of file
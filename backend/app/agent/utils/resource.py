@@ -1,8 +1,8 @@
 from pathlib import Path
 from typing import List
 
-from app.crud.resource import get_resources_by_ids_and_type as fetch_resources
-from typing import List
+from app.crud.resource import get_resources_by_ids_and_type as fetch_resources, reserve
+from typing import List, Optional
 from app.agent.schemas.resource import Resource as AgentResource, ResourceStatus
 from app.agent.schemas.types import ResourceType as AgentResType, DonorType, StatusType
 from app.agent.schemas.common import Coordinates
@@ -33,7 +33,7 @@ def get_resources_by_ids_and_type(
 ) -> List[AgentResource]:
     # call into Firestore-backed CRUD
     backend_resources = fetch_resources(donor_ids, resource_type)
-    logger.debug(f'Fetched backend resources {backend_resources}')
+    logger.debug("Fetched backend resources %s", backend_resources)
 
     agent_resources: List[AgentResource] = []
     for br in backend_resources:
@@ -42,6 +42,7 @@ def get_resources_by_ids_and_type(
 
         agent_resources.append(
             AgentResource(
+                resource_id=br.resource_id,
                 donor_id=br.uid,
                 donor_type=DonorType(br.role_id),           # assumes role_id matches DonorType enums
                 resource_type=AgentResType(br.category),    # category is a ResourceType str
@@ -53,4 +54,17 @@ def get_resources_by_ids_and_type(
                 status=status_str,
             )
         )
-    return agent_resources
\ No newline at end of file
+    return agent_resources
+
+
+def reserve_resource(resource: AgentResource, quantity: int, holder: str, ttl_s: float) -> Optional[str]:
+    """
+    Take a reservation on `quantity` units of `resource` that expires after
+    `ttl_s` unless committed. None when the stock is no longer there (taken
+    by a parallel allocation since it was listed).
+    """
+    try:
+        return reserve(resource.resource_id, quantity, holder=holder, ttl_s=ttl_s).reservation_id
+    except ValueError as e:
+        logger.debug("Could not reserve %s of resource %s: %s", quantity, resource.resource_id, e)
+        return None
@@ -0,0 +1,237 @@
+"""
+Deterministic repair of structured LLM output before it reaches Pydantic
+validation, so that near-misses (enum case, "None" strings, "about 50",
+JSON wrapped in prose) do not cost a full instructor re-ask round trip.
+
+`repairable(response_model, trace_name)` returns the model to hand to
+instructor: valid output goes through untouched, invalid output is repaired
+and re-validated, and only if that still fails does the original
+ValidationError reach instructor, which then re-asks as before.
+"""
+
+import json
+import re
+import types
+import typing
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError, ValidationInfo, create_model, model_validator
+
+from app.utils import metrics
+
+from app.utils.logger import get_logger
+logger = get_logger(__name__)
+
+OUTCOMES = metrics.counter(
+    "llm_schema_validation_total",
+    "Structured output validations by outcome: valid, repaired (re-ask avoided), "
+    "reask (repair failed), salvaged / unsalvageable (provider-rejected tool calls)",
+    ("trace_name", "outcome"),
+)
+
+NULL_STRINGS = {"", "none", "null", "nil", "n/a", "undefined"}
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+
+
+# ------------------------------ primitives ------------------------------- #
+def _norm(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", text.strip().lower()).strip("_")
+
+
+def _repair_enum(value: Any, enum_cls: Type[Enum]) -> Any:
+    if not isinstance(value, str):
+        return value
+    key = _norm(value)
+    for member in enum_cls:
+        if key in (_norm(str(member.value)), _norm(member.name)):
+            return member.value
+    return value
+
+
+def _repair_number(value: Any, target: type) -> Any:
+    if isinstance(value, str):
+        match = _NUMBER.search(value.replace(",", ""))
+        if not match:
+            return value
+        value = float(match.group())
+    if target is int and isinstance(value, float) and not isinstance(value, bool):
+        return int(round(value))
+    return value
+
+
+def extract_json(text: str) -> Any:
+    """
+    Parse the first JSON object/array found in `text` (code fences and
+    surrounding prose are ignored). Raises ValueError when there is none.
+    """
+    fenced = _FENCE.search(text)
+    if fenced:
+        text = fenced.group(1)
+    decoder = json.JSONDecoder()
+    for i, ch in enumerate(text):
+        if ch in "{[":
+            try:
+                return decoder.raw_decode(text, i)[0]
+            except json.JSONDecodeError:
+                continue
+    raise ValueError("no JSON value found")
+
+
+def repair_value(value: Any, annotation: Any) -> Any:
+    """
+    Best-effort coercion of `value` towards `annotation`. Never raises:
+    anything it cannot fix is returned unchanged for Pydantic to reject.
+    """
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+
+    if origin is typing.Annotated:
+        return repair_value(value, args[0])
+
+    if origin in (typing.Union, types.UnionType):
+        if isinstance(value, str) and type(None) in args and value.strip().lower() in NULL_STRINGS:
+            return None
+        if value is None:
+            return None
+        non_null = [a for a in args if a is not type(None)]
+        return repair_value(value, non_null[0]) if len(non_null) == 1 else value
+
+    if origin in (list, typing.List):
+        if isinstance(value, str):
+            try:
+                value = extract_json(value)
+            except ValueError:
+                return value
+        if isinstance(value, dict):
+            value = [value]
+        if isinstance(value, list) and args:
+            return [repair_value(v, args[0]) for v in value]
+        return value
+
+    if isinstance(annotation, type):
+        if issubclass(annotation, BaseModel):
+            return _repair_model_data(value, annotation)
+        if issubclass(annotation, Enum):
+            return _repair_enum(value, annotation)
+        if annotation in (int, float):
+            return _repair_number(value, annotation)
+        if annotation is str and isinstance(value, (int, float)) and not isinstance(value, bool):
+            return str(value)
+
+    return value
+
+
+def _repair_model_data(value: Any, model: Type[BaseModel]) -> Any:
+    if isinstance(value, str):
+        try:
+            value = extract_json(value)
+        except ValueError:
+            return value
+    if not isinstance(value, dict):
+        return value
+
+    repaired = dict(value)
+    for name, field in model.model_fields.items():
+        for key in (name, field.alias):
+            if key and key in repaired:
+                repaired[key] = repair_value(repaired[key], field.annotation)
+    return repaired
+
+
+# ------------------------- instructor integration ------------------------ #
+# validation context of callers that count the outcome themselves (salvage)
+_UNCOUNTED = "schema_repair_uncounted"
+
+
+class _Repairable(BaseModel):
+    __repair_site__: typing.ClassVar[str] = ""
+
+    @model_validator(mode="wrap")
+    @classmethod
+    def _repair_on_failure(cls, data: Any, handler, info: ValidationInfo):
+        counted = not (isinstance(info.context, dict) and info.context.get(_UNCOUNTED))
+
+        def count(outcome: str) -> None:
+            if counted:
+                OUTCOMES.inc(trace_name=cls.__repair_site__, outcome=outcome)
+
+        # output that validates is kept as is, even "n/a" in an Optional[str]
+        try:
+            validated = handler(data)
+        except ValidationError as original:
+            try:
+                validated = handler(_repair_model_data(data, cls))
+            except ValidationError:
+                count("reask")
+                raise original
+            count("repaired")
+            logger.info("%s: repaired invalid output locally: %s", cls.__repair_site__, original.errors()[:3])
+            return validated
+        count("valid")
+        return validated
+
+    @classmethod
+    def model_validate_json(cls, json_data, **kwargs):
+        # Tool arguments that are not even valid JSON never reach the validator above
+        try:
+            return super().model_validate_json(json_data, **kwargs)
+        except ValidationError as e:
+            if not any(err["type"] == "json_invalid" for err in e.errors()):
+                raise
+            try:
+                data = extract_json(json_data if isinstance(json_data, str) else json_data.decode())
+            except ValueError:
+                raise e
+            return cls.model_validate(data, **kwargs)
+
+
+# instructor's own wrapper (ModelAdapter) for non-model response types
+_WRAPPED_DOC = "Correctly Formatted and Extracted Response."
+
+
+@lru_cache(maxsize=None)
+def repairable(response_model: Any, trace_name: str) -> Tuple[Type[BaseModel], bool]:
+    """
+    Return (model, unwrap). Plain models are subclassed with the repair hook;
+    other types (Optional[str], List[Task], ...) are wrapped in a `content`
+    field, the same shape instructor uses for them, and must be unwrapped.
+    """
+    # instructor sends the docstring as the tool description: keep it
+    if isinstance(response_model, type) and issubclass(response_model, BaseModel):
+        model = create_model(
+            response_model.__name__, __base__=(response_model, _Repairable), __doc__=response_model.__doc__,
+        )
+        unwrap = False
+    else:
+        model = create_model(
+            "Response", __base__=_Repairable, __doc__=_WRAPPED_DOC, content=(response_model, ...),
+        )
+        unwrap = True
+    model.__repair_site__ = trace_name
+    return model, unwrap
+
+
+def salvage(failed_generation: str, model: Type[BaseModel], unwrap: bool) -> Optional[BaseModel]:
+    """
+    Recover a response from a generation the provider itself rejected
+    (e.g. Groq's `tool_use_failed`), or None.
+    """
+    try:
+        data = extract_json(failed_generation)
+        # tool-call envelopes: {"name": ..., "arguments"|"parameters": {...}}
+        if isinstance(data, dict) and "name" in data:
+            data = data.get("arguments") or data.get("parameters") or data
+        if isinstance(data, str):
+            data = extract_json(data)
+        if unwrap and not (isinstance(data, dict) and "content" in data):
+            data = {"content": data}
+        # counted once, below, not by the repair hook as well
+        result = model.model_validate(data, context={_UNCOUNTED: True})
+    except (ValueError, ValidationError):
+        OUTCOMES.inc(trace_name=model.__repair_site__, outcome="unsalvageable")
+        return None
+    OUTCOMES.inc(trace_name=model.__repair_site__, outcome="salvaged")
+    return result
@@ -1,7 +1,10 @@
 from typing import List, Optional, Any
 
+from app.core import http_cache
+from app.core.firebase import get_db
 from app.crud.task import (
-    create_task as _create_task_db,
+    COLLECTION as _TASKS,
+    stage_tasks as _stage_tasks_db,
     get_task as _get_task_db,
     list_tasks as _list_tasks_db,
     list_tasks_by_assignee as _list_tasks_by_assignee_db,
@@ -10,6 +13,7 @@ from app.crud.task import (
 )
 from app.schemas.task import TaskCreate, TaskUpdate, TaskStatusUpdate, Task as DBTask
 from app.agent.schemas.task import Task as AgentTaskSchema
+from app.agent.utils.task_resources import COLLECTION as _REQUEST_RESOURCES, stage_request_resources
 
 
 _URGENCY_TO_PRIORITY = {
@@ -22,9 +26,12 @@ _URGENCY_TO_PRIORITY = {
 def save_tasks(
     agent_tasks: List[AgentTaskSchema],
     request_obj: Any,
-) -> List[AgentTaskSchema]:
+) -> List[DBTask]:
     """
-    Persist agent-generated Task objects via the CRUD layer.
+    Persist agent-generated Task objects via the CRUD layer, together with
+    their resource & manpower requirements ('request_resources', keyed by
+    task ID), in one WriteBatch: one round trip, and either all of them are
+    written or none (a Celery retry never finds orphan tasks).
     - Translates urgency ("high"/"medium"/"low") → priority (1/2/3).
     - source_request_id → request_obj.source_request_id or disaster_id.
     - assigned_to → request_obj.assigned_to or None.
@@ -34,7 +41,7 @@ def save_tasks(
     source_req   = getattr(request_obj, "source_request_id", None) or disaster_id
     assigned_to  = getattr(request_obj, "assigned_to", None)
 
-    created = []
+    to_create = []
     for at in agent_tasks:
         # default to lowest priority if missing or unrecognized
         pri = _URGENCY_TO_PRIORITY.get(
@@ -51,7 +58,24 @@ def save_tasks(
             is_authorized=False,
             assigned_to=assigned_to,
         )
-        created.append(_create_task_db(tc))
+        to_create.append(tc)
+
+    batch = get_db().batch()
+    created = _stage_tasks_db(batch, to_create)
+    entries = [
+        {
+            "task_id": task.id,
+            "resource_requirements": [
+                {"resource_type": rt, "quantity": qty}
+                for rt, qty in getattr(at, "resource_requirements", None) or []
+            ],
+            "manpower_requirement": getattr(at, "manpower_requirement", None),
+        }
+        for task, at in zip(created, agent_tasks)
+    ]
+    stage_request_resources(batch, source_req, entries)
+    batch.commit()
+    http_cache.touch(_TASKS, _REQUEST_RESOURCES)
 
     return created
 
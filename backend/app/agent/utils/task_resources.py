@@ -3,21 +3,35 @@
 from datetime import datetime, timezone
 from typing import List, Dict
 from app.core.firebase import get_db
+from app.core import http_cache
 
-def save_request_resources(request_id: str, entries: List[Dict]) -> None:
+COLLECTION = "request_resources"
+
+
+def stage_request_resources(batch, request_id: str, entries: List[Dict]) -> None:
     """
-    Persist resource_requirements + manpower_requirement per task
-    under the 'request_resources' collection, one document per task_id.
+    Add the resource_requirements + manpower_requirement of each task to a
+    WriteBatch, one 'request_resources' document per task_id. The caller
+    commits the batch and then calls http_cache.touch(COLLECTION).
     """
     db = get_db()
+    now = datetime.now(timezone.utc)
     for entry in entries:
-        task_id = entry["task_id"]
         # Use the task_id as the document ID
-        db.collection("request_resources") \
-          .document(task_id) \
-          .set({
-              "request_id": request_id,
-              "resource_requirements": entry.get("resource_requirements", []),
-              "manpower_requirement": entry.get("manpower_requirement"),
-              "created_at": datetime.now(timezone.utc),
-          })
\ No newline at end of file
+        batch.set(db.collection(COLLECTION).document(entry["task_id"]), {
+            "request_id": request_id,
+            "resource_requirements": entry.get("resource_requirements", []),
+            "manpower_requirement": entry.get("manpower_requirement"),
+            "created_at": now,
+        })
+
+
+def save_request_resources(request_id: str, entries: List[Dict]) -> None:
+    """
+    Persist resource_requirements + manpower_requirement per task
+    under the 'request_resources' collection, one document per task_id.
+    """
+    batch = get_db().batch()
+    stage_request_resources(batch, request_id, entries)
+    batch.commit()
+    http_cache.touch(COLLECTION)
\ No newline at end of file
@@ -1,6 +1,9 @@
 from pathlib import Path
 import json
-from typing import List
+import uuid
+from typing import List, Optional, Tuple
+
+from redis.exceptions import RedisError
 
 from app.agent.schemas.volunteer import Volunteer as AgentVolunteer
 from app.agent.schemas.volunteer import Volunteer
@@ -12,10 +15,27 @@ from app.crud.disaster import (
     get_all_volunteer_ids_by_disaster as fetch_volunteer_ids_backend,
 )
 from app.crud.user import get_user_availability
+from app.core.redis import get_redis
 
 from app.utils.logger import get_logger
 logger = get_logger(__name__)
 
+_HOLD_PREFIX = "allocation:volunteer:"
+
+# Extend / drop a hold only while it is still our own
+_CONFIRM_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
 # def get_all_volunteers_by_disaster(disaster_id: str) -> List[Volunteer]:
 #     VOLUNTEERS_FILE = "app/agent/data/volunteers.json"
     
@@ -92,30 +112,30 @@ def get_all_volunteers_by_disaster(disaster_id: str) -> List[AgentVolunteer]:
     Fetch full volunteer records for a disaster from Firestore,
     then adapt them into the agent’s Volunteer schema.
     """
-    logger.debug(f"Fetching volunteers for disaster_id: {disaster_id}")
+    logger.debug("Fetching volunteers for disaster_id: %s", disaster_id)
     backend = fetch_volunteers_backend(disaster_id)
     if backend is None:
-        logger.debug(f"No volunteers found for disaster_id: {disaster_id}")
+        logger.debug("No volunteers found for disaster_id: %s", disaster_id)
         return []
 
     agents: List[AgentVolunteer] = []
-    logger.debug(f"Processing {len(backend)} volunteer records.")
+    logger.debug("Processing %s volunteer records.", len(backend))
 
     for rec in backend:
         uid = rec.get("uid")
         if uid is None:
-            logger.debug(f"Skipping record without UID: {rec}")
+            logger.debug("Skipping record without UID: %s", rec)
             continue
 
         lat = rec.get("location_lat")
         lng = rec.get("location_lng")
         if lat is None or lng is None:
-            logger.debug(f"Skipping record with missing location for UID: {uid}")
+            logger.debug("Skipping record with missing location for UID: %s", uid)
             continue
 
         available = get_user_availability(uid)
         status_str = "active" if available else "inactive"
-        logger.debug(f"UID: {uid}, Availability: {available}, Status: {status_str}")
+        logger.debug("UID: %s, Availability: %s, Status: %s", uid, available, status_str)
 
         agents.append(
             AgentVolunteer(
@@ -124,9 +144,9 @@ def get_all_volunteers_by_disaster(disaster_id: str) -> List[AgentVolunteer]:
                 status=status_str,
             )
         )
-        logger.debug(f"Volunteer added: UID: {uid}, Location: ({lat}, {lng}), Status: {status_str}")
+        logger.debug("Volunteer added: UID: %s, Location: (%s, %s), Status: %s", uid, lat, lng, status_str)
 
-    logger.debug(f"Total volunteers processed: {len(agents)}")
+    logger.debug("Total volunteers processed: %s", len(agents))
     return agents
 
 def get_all_volunteer_ids_by_disaster(disaster_id: str) -> List[str]:
@@ -137,4 +157,43 @@ def get_all_volunteer_ids_by_disaster(disaster_id: str) -> List[str]:
     if backend_ids is None:
         # disaster not found
         return []
-    return backend_ids
\ No newline at end of file
+    return backend_ids
+
+
+def hold_volunteer(uid: str, ttl_s: float) -> Tuple[bool, Optional[str]]:
+    """
+    Hold a volunteer for one allocation proposal, shared by every worker:
+    returns (free, hold_id). A volunteer another run holds is not free;
+    the hold lapses after `ttl_s` unless confirmed. Without Redis nobody
+    is held (hold_id None) and everybody is free.
+    """
+    hold_id = uuid.uuid4().hex
+    try:
+        if not get_redis().set(_HOLD_PREFIX + uid, hold_id, nx=True, px=int(ttl_s * 1000)):
+            return False, None
+    except RedisError as e:
+        logger.warning("Volunteer holds unavailable, allocating %s without one: %s", uid, e)
+        return True, None
+    return True, hold_id
+
+
+def is_volunteer_held(uid: str) -> bool:
+    """Whether some allocation holds the volunteer (False without Redis)."""
+    try:
+        return get_redis().get(_HOLD_PREFIX + uid) is not None
+    except RedisError as e:
+        logger.warning("Volunteer holds unavailable, treating %s as free: %s", uid, e)
+        return False
+
+
+def confirm_volunteer(uid: str, hold_id: str, ttl_s: float) -> bool:
+    """
+    Extend the hold `hold_id` on a volunteer to `ttl_s` (an upper bound: the
+    hold is released when the task is done); False if it lapsed.
+    """
+    return bool(get_redis().eval(_CONFIRM_SCRIPT, 1, _HOLD_PREFIX + uid, hold_id, int(ttl_s * 1000)))
+
+
+def release_volunteer(uid: str, hold_id: str) -> None:
+    """Drop the hold `hold_id` on a volunteer, if it is still in place."""
+    get_redis().eval(_RELEASE_SCRIPT, 1, _HOLD_PREFIX + uid, hold_id)
@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends
+from app.core.profiling import ProfiledRoute
 from app.agent.schemas.state import State
 from app.agent.core.manager import Manager
 
 from app.agent.rag.rag import build_vectorstores_from_pdfs, retrieve_from_collection, parse_documents_to_text
 
-router = APIRouter(prefix="/agent", tags=["agent"])
+router = APIRouter(prefix="/agent", tags=["agent"], route_class=ProfiledRoute)
 
 @router.post("/ask", response_model=State)
 async def ask(
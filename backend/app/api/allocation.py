@@ -0,0 +1,51 @@
+from fastapi import APIRouter, HTTPException, status
+
+from app.agent.utils.allocation import accept_allocation, reject_allocation
+from app.core.permissions import require_perms
+from app.core.profiling import ProfiledRoute
+from app.crud import allocation as crud
+from app.schemas.allocation import Allocation
+
+router = APIRouter(prefix="/allocations", tags=["Allocations"], route_class=ProfiledRoute)
+
+
+@router.get(
+    "/{allocation_id}",
+    response_model=Allocation,
+    dependencies=[require_perms("task:assign")]
+)
+def read_allocation(allocation_id: str):
+    allocation = crud.get(allocation_id)
+    if not allocation:
+        raise HTTPException(status_code=404, detail="Allocation not found")
+    return allocation
+
+
+@router.post(
+    "/{allocation_id}/accept",
+    response_model=Allocation,
+    dependencies=[require_perms("task:assign")]
+)
+def accept(allocation_id: str):
+    """Commit the proposal's stock reservations and volunteer holds."""
+    try:
+        return accept_allocation(allocation_id)
+    except crud.AllocationConflict as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.post(
+    "/{allocation_id}/reject",
+    response_model=Allocation,
+    dependencies=[require_perms("task:assign")]
+)
+def reject(allocation_id: str):
+    """Give the proposal's stock reservations and volunteer holds back."""
+    try:
+        return reject_allocation(allocation_id)
+    except crud.AllocationConflict as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
@@ -1,4 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from app.core import http_cache
+from app.core.profiling import ProfiledRoute
 from app.core.firebase import verify_token, get_app         
 from app.crud.user import create_user, get_user, update_user_availability, update_user_location
 from app.schemas.user import User, UserCreate, AvailabilityUpdate, Coordinates
@@ -7,7 +9,7 @@ from app.api.deps import (
     get_current_user,
 )    
 
-router = APIRouter(prefix="/users", tags=["auth"])
+router = APIRouter(prefix="/users", tags=["auth"], route_class=ProfiledRoute)
 
 
 @router.post("/register", response_model=User)
@@ -32,7 +34,8 @@ async def register(
     return await get_current_user(token)      # type: ignore
 
 
-@router.get("/me", response_model=User)
+# conditional before get_current_user: a 304 skips the user / role reads
+@router.get("/me", response_model=User, dependencies=[http_cache.conditional("users", private=True)])
 async def me(user: User = Depends(get_current_user)):
     return user
 
@@ -2,6 +2,7 @@
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 
+from app.core.profiling import ProfiledRoute
 from app.schemas.chat import ChatMessageCreate, ChatMessageResponse
 from app.api.deps import get_current_user
 from app.crud import chat as crud
@@ -9,6 +10,7 @@ from app.crud import chat as crud
 router = APIRouter(
     prefix="/disasters/{disaster_id}/chat",
     tags=["Chat"],
+    route_class=ProfiledRoute,
 )
 
 
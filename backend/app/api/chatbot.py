@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends
 
+from app.core.profiling import ProfiledRoute
 from app.chatbot.schemas.chat_input import ChatInput, ScoreInput
 from app.chatbot.core.chatbot import Chatbot
 
-router = APIRouter(prefix="/chatbot", tags=["chatbot"])
+router = APIRouter(prefix="/chatbot", tags=["chatbot"], route_class=ProfiledRoute)
 
 @router.post("/ask")
 async def ask(
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from firebase_admin import auth as fb_auth
@@ -80,3 +82,18 @@ def require_roles(*allowed: str):
         return user
 
     return Depends(guard)
+
+
+def is_admin_token(authorization: Optional[str]) -> bool:
+    """
+    Whether an `Authorization: Bearer <token>` header belongs to an admin.
+    For checks outside the dependency system (middleware); never raises.
+    """
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        user = get_user(verify_token(token)["uid"])
+    except Exception:
+        return False
+    return user is not None and user.role_id == "admin"
@@ -2,6 +2,9 @@
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, Body, status
 
+from app.core import http_cache
+from app.core.profiling import ProfiledRoute
+from app.core.responses import list_response
 from app.schemas.disaster import DisasterCreate, DisasterResponse
 from app.api.deps import get_current_user
 from app.core.permissions import require_perms as check_permission
@@ -18,7 +21,7 @@ from app.schemas.user import User
 from app.utils.logger import get_logger
 logger = get_logger(__name__)
 
-router = APIRouter(prefix="/disasters", tags=["Disasters"])
+router = APIRouter(prefix="/disasters", tags=["Disasters"], route_class=ProfiledRoute)
 
 
 @router.post(
@@ -41,16 +44,18 @@ def create_disaster(
     return crud.create_disaster(payload, admin_uid=user.uid)
 
 
-@router.get("", response_model=List[DisasterResponse])
-@router.get("/", include_in_schema=False, response_model=List[DisasterResponse])
+@router.get("", response_model=List[DisasterResponse], dependencies=[http_cache.conditional("disasters", max_age=15)])
+@router.get("/", include_in_schema=False, response_model=List[DisasterResponse],
+            dependencies=[http_cache.conditional("disasters", max_age=15)])
 def list_disasters():
-    return crud.list_disasters()
+    return list_response(DisasterResponse, crud.list_disasters())
 
 
 @router.get(
     "/location",
     response_model=List[dict],
-    summary="Fetch locations related to each disaster"
+    summary="Fetch locations related to each disaster",
+    dependencies=[http_cache.conditional("disasters", max_age=15)],
 )
 def list_disaster_locations():
     return crud.get_disaster_locations()
@@ -66,8 +71,7 @@ def get_agent_suggested_disasters():
     Retrieve all Disaster documents where `is_agent_suggestion == True`.
     """
     try:
-        disasters = list_agent_suggested_disasters()
-        return disasters
+        return list_response(DisasterResponse, list_agent_suggested_disasters())
     except Exception as e:
         # In case something goes wrong at the Firestore/query layer
         raise HTTPException(status_code=500, detail=str(e))
@@ -91,7 +95,7 @@ def join_disaster(
     role: str = Body(
         ...,
         embed=True,
-        regex="^(volunteer|first_responder|affected_individual)$"
+        pattern="^(volunteer|first_responder|affected_individual)$"
     ),
     user=Depends(get_current_user),
 ):
@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.profiling import ProfiledRoute
+from app.core.redis import get_redis
+from app.utils import metrics
+
+router = APIRouter(tags=["Metrics"], route_class=ProfiledRoute)
+
+
+# Left unauthenticated for the Prometheus scraper: keep it off the public ingress
+@router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    body = metrics.render([metrics.shared_snapshot(get_redis())])
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
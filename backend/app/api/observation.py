@@ -1,6 +1,8 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Body, status, Query
 
+from app.core.profiling import ProfiledRoute
+from app.core.responses import list_response
 from app.schemas.observation import ObservationCreate, ObservationResponse
 from app.crud.observation import (
     create_observation,
@@ -11,7 +13,7 @@ from app.crud.observation import (
 from app.api.deps import get_current_user
 from app.core.permissions import require_perms as check_permission
 
-router = APIRouter(prefix="/observations", tags=["Observations"])
+router = APIRouter(prefix="/observations", tags=["Observations"], route_class=ProfiledRoute)
 
 
 @router.post(
@@ -37,7 +39,7 @@ def create_obs(
 @router.get("", response_model=List[ObservationResponse])
 @router.get("/", include_in_schema=False, response_model=List[ObservationResponse])
 def list_obs(disaster_id: Optional[str] = Query(None)):
-    return list_observations(disaster_id)
+    return list_response(ObservationResponse, list_observations(disaster_id))
 
 
 @router.get("/{obs_id}", response_model=ObservationResponse)
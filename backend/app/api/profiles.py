@@ -0,0 +1,24 @@
+from typing import List
+
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import FileResponse
+
+from app.api.deps import require_roles
+from app.core import profiling
+from app.core.profiling import ProfiledRoute
+
+router = APIRouter(prefix="/admin/profiles", tags=["Profiling"], dependencies=[require_roles("admin")], route_class=ProfiledRoute)
+
+
+@router.get("", response_model=List[dict], summary="List stored profiles, newest first")
+def list_profiles():
+    return profiling.list_profiles()
+
+
+@router.get("/{name}", summary="Download a stored profile (.html: pyinstrument, .prof: cProfile)")
+def download_profile(name: str):
+    path = profiling.profile_path(name)
+    if path is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Profile not found")
+    media_type = "text/html" if path.suffix == ".html" else "application/octet-stream"
+    return FileResponse(path, media_type=media_type, filename=path.name)
@@ -1,5 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import List
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from app.core import profiling
+from app.core.profiling import ProfiledRoute
+from app.core.responses import ExportFormat, export_response, list_response
 from app.schemas.request import Request, RequestCreate, RequestStatusUpdate
 from app.schemas.user import User
 from app.core.permissions import require_perms
@@ -12,7 +16,7 @@ from app.celery_config import run_agentic_workflow, celery_app
 from app.utils.logger import get_logger
 logger = get_logger(__name__)
 
-router = APIRouter(prefix="/requests", tags=["Requests"], redirect_slashes=False)
+router = APIRouter(prefix="/requests", tags=["Requests"], redirect_slashes=False, route_class=ProfiledRoute)
 
 
 @router.post(
@@ -35,7 +39,7 @@ async def create_request(
     # Create the request in the database
     request = crud.create(current.uid, payload)
 
-    logger.debug(f'request : {request}')
+    logger.debug("request : %s", request)
 
     # Build the agentic payload
     agent_payload = {
@@ -60,7 +64,8 @@ async def create_request(
             "urgency": None,
             "type_of_need": request.type_of_need.lower(),
             "disaster_type": None,
-            "affected_people_count": None
+            "affected_people_count": None,
+            "source_request_id": request.id,
         },
         "disaster": None,
         # Provide an empty list instead of None
@@ -72,7 +77,9 @@ async def create_request(
         with celery_app.connection_or_acquire() as conn:
             run_agentic_workflow.apply_async(
                 args=[agent_payload],
-                connection=conn
+                connection=conn,
+                # a profiled request gets its agent run profiled too
+                headers={"profile": True} if profiling.requested() else None,
             )
     except Exception as e:
         # If Redis is exhausted or channel borrowing fails
@@ -96,7 +103,7 @@ async def create_request(
     dependencies=[require_perms("request:read_all")],
 )
 def list_requests():
-    return crud.list_all()
+    return list_response(Request, crud.list_all())
 
 
 @router.get(
@@ -105,7 +112,25 @@ def list_requests():
     dependencies=[require_perms("request:read_own")],
 )
 def my_requests(current: User = Depends(get_current_user)):
-    return crud.list_by_owner(current.uid)
+    return list_response(Request, crud.list_by_owner(current.uid))
+
+
+# - export (declared before /{req_id}, which would swallow it) -
+@router.get(
+    "/export",
+    dependencies=[require_perms("request:read_all")],
+    response_class=StreamingResponse,
+)
+def export_requests(
+    disaster_id: Optional[str] = None,
+    created_by: Optional[str] = None,
+    format: ExportFormat = "ndjson",
+):
+    """
+    GET /requests/export?format=ndjson|csv[&disaster_id=...][&created_by=...]
+    Streams the matching requests as they are read, without building the list.
+    """
+    return export_response(Request, crud.iter_requests(disaster_id, created_by), format, "requests")
 
 
 # - detail -
@@ -138,9 +163,11 @@ def update_request_status(
     req_id: str,
     payload: RequestStatusUpdate,
 ):
-    if not crud.get(req_id):
+    # the update itself 404s on a missing request: no existence check read
+    req = crud.patch_status(req_id, payload)
+    if not req:
         raise HTTPException(404, "Request not found")
-    return crud.patch_status(req_id, payload)
+    return req
 
 
 @router.get("/disaster/{disaster_id}", response_model=List[Request])
@@ -149,8 +176,4 @@ def list_requests_by_disaster(disaster_id: str):
     GET /requests/disaster/{disaster_id}
     Returns only those requests which have a matching disaster_id.
     """
-    results = crud.list_by_disaster(disaster_id)
-    if not results:
-        # Optional: return empty list or 404 if you prefer
-        return []
-    return results
\ No newline at end of file
+    return list_response(Request, crud.list_by_disaster(disaster_id))
\ No newline at end of file
@@ -1,11 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from app.schemas.resource import ResourceCreate, Resource, ResourceUpdate, StatusChangePayload
+from app.core import http_cache
+from app.core.profiling import ProfiledRoute
+from app.core.responses import ExportFormat, export_response, list_response
+from app.schemas.resource import ResourceCreate, Resource, ResourceUpdate, StatusChangePayload, Reservation, ReservationCreate
 from app.core.permissions import require_perms
 from app.crud import resource as crud
 from typing import List, Dict, Any
 from app.agent.schemas.state import State
 from app.agent.core.manager import Manager
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from app.crud.disaster import get_disaster
 from app.crud.task import get_tasks_by_disaster
 from app.crud.resource import get_request_resources 
@@ -15,7 +18,7 @@ from app.agent.core.manager import Manager
 from app.utils.logger import get_logger
 logger = get_logger(__name__)
 
-router = APIRouter(prefix="/resources", tags=["Resources"])
+router = APIRouter(prefix="/resources", tags=["Resources"], route_class=ProfiledRoute)
 
 
 @router.post(
@@ -40,7 +43,7 @@ def create_resource(payload: ResourceCreate):
 )
 def list_resources():
     try:
-        return crud.list_all()
+        return list_response(Resource, crud.list_all())
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch resources: {str(e)}")
 
@@ -52,14 +55,25 @@ def list_resources():
 )
 def list_available_resources():
     try:
-        return crud.list_available()
+        return list_response(Resource, crud.list_available())
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch available resources: {str(e)}")
 
 
+@router.get(
+    "/export",
+    dependencies=[require_perms("resource:read")],
+    response_class=StreamingResponse,
+)
+def export_resources(available: bool = False, format: ExportFormat = "ndjson"):
+    # streamed: a failure halfway through can only cut the body short, not turn into a 500
+    return export_response(Resource, crud.iter_resources(available_only=available), format, "resources")
+
+
 @router.get(
     "/locations",
-    response_model=List[Dict[str, Any]]
+    response_model=List[Dict[str, Any]],
+    dependencies=[http_cache.conditional("resources", max_age=15)],
 )
 def get_all_resource_locations():
     try:
@@ -89,11 +103,15 @@ def read_resource(rid: str):
     dependencies=[require_perms("resource:update")]
 )
 def update_resource(rid: str, payload: ResourceUpdate):
-    res = crud.get(rid)
-    if not res:
-        raise HTTPException(status_code=404, detail="Resource not found")
+    if payload.quantity_used is None:
+        raise HTTPException(status_code=400, detail="quantity_used is required to update the resource")
+    # the transaction reads the resource anyway: no existence check read
     try:
         return crud.patch(rid, payload)
+    except crud.StockConflict as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Update failed: {str(e)}")
     
@@ -126,6 +144,49 @@ def change_resource_status(rid: str, payload: StatusChangePayload):
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to update status: {str(e)}")
+
+
+@router.post(
+    "/{rid}/reservations",
+    response_model=Reservation,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[require_perms("resource:update")]
+)
+def reserve_resource(rid: str, payload: ReservationCreate):
+    try:
+        return crud.reserve(rid, payload.quantity, holder=payload.holder, ttl_s=payload.ttl_s)
+    except crud.StockConflict as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.post(
+    "/reservations/{reservation_id}/commit",
+    response_model=Reservation,
+    dependencies=[require_perms("resource:update")]
+)
+def commit_reservation(reservation_id: str):
+    try:
+        return crud.commit_reservation(reservation_id)
+    except crud.StockConflict as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.post(
+    "/reservations/{reservation_id}/release",
+    response_model=Reservation,
+    dependencies=[require_perms("resource:update")]
+)
+def release_reservation(reservation_id: str):
+    try:
+        return crud.release_reservation(reservation_id)
+    except crud.StockConflict as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     
 
 URGENCY_MAP = {
@@ -154,35 +215,35 @@ def map_urgency(raw: Any) -> str:
     status_code=status.HTTP_200_OK,
 )
 async def suggest(disaster_id: str) -> Any:
-    logger.debug(f"suggest() called with disaster_id={disaster_id}")
+    logger.debug("suggest() called with disaster_id=%s", disaster_id)
 
     # 1) Fetch the Disaster
     disaster = get_disaster(disaster_id)
     if not disaster:
-        logger.debug(f"Disaster {disaster_id} not found")
+        logger.debug("Disaster %s not found", disaster_id)
         raise HTTPException(status_code=404, detail="Disaster not found")
-    logger.debug(f"Found disaster: {disaster_id}")
+    logger.debug("Found disaster: %s", disaster_id)
 
     # 2) Fetch tasks
     tasks = get_tasks_by_disaster(disaster_id)
-    logger.debug(f"Retrieved {len(tasks)} tasks: {[t.id for t in tasks]}")
+    logger.debug("Retrieved %s tasks: %s", len(tasks), [t.id for t in tasks])
     if not tasks:
-        logger.debug(f"No tasks found for disaster {disaster_id}")
+        logger.debug("No tasks found for disaster %s", disaster_id)
         raise HTTPException(status_code=404, detail="No tasks found for this disaster")
 
     # 3) Filter & format
     filtered_tasks: List[Dict[str, Any]] = []
     for t in tasks:
-        logger.debug(f"Checking resources for task {t.id}")
+        logger.debug("Checking resources for task %s", t.id)
         resources_map = get_request_resources(t.id)
         if not resources_map:
-            logger.debug(f"No resources for task {t.id}, skipping")
+            logger.debug("No resources for task %s, skipping", t.id)
             continue
 
         tr = resources_map[t.id]
         raw_reqs = tr.get("resource_requirements", [])
         manpower = tr.get("manpower_requirement")
-        logger.debug(f"Found {len(raw_reqs)} resource entries, manpower={manpower!r}")
+        logger.debug("Found %s resource entries, manpower=%r", len(raw_reqs), manpower)
 
         # Unwrap your ['key', value] pairs
         formatted_reqs = []
@@ -194,20 +255,21 @@ async def suggest(disaster_id: str) -> Any:
                     "resource_type": rt[1],
                     "quantity":       qty[1],
                 })
-                logger.debug(f"resource_type={rt[1]}, quantity={qty[1]}")
+                logger.debug("resource_type=%s, quantity=%s", rt[1], qty[1])
             else:
                 formatted_reqs.append({
                     "resource_type": rt,
                     "quantity":       qty,
                 })
-                logger.debug(f"resource_type={rt!r}, quantity={qty!r}")
+                logger.debug("resource_type=%r, quantity=%r", rt, qty)
 
         # ── handle missing .urgency safely ──
         raw_urgency = getattr(t, "urgency", None)
         urgency = map_urgency(raw_urgency)
-        logger.debug(f"raw_urgency={raw_urgency!r} mapped to '{urgency}'")
+        logger.debug("raw_urgency=%r mapped to '%s'", raw_urgency, urgency)
 
         filtered_tasks.append({
+            "task_id":               t.id,
             "name":                  None,
             "description":           t.instructions,
             "urgency":               urgency,
@@ -215,7 +277,7 @@ async def suggest(disaster_id: str) -> Any:
             "manpower_requirement":  manpower,
         })
 
-    logger.debug(f"Built filtered_tasks with {len(filtered_tasks)} entries")
+    logger.debug("Built filtered_tasks with %s entries", len(filtered_tasks))
 
     # 4) Build response
     response_content = {
@@ -233,10 +295,12 @@ async def suggest(disaster_id: str) -> Any:
             "disaster_summary":  disaster.description
         },
         "tasks":            filtered_tasks,
-        "task_allocations": None
+        "task_allocations": None,
+        # a preview: nothing is reserved or held on the admin's behalf
+        "preview":          True,
     }
 
-    logger.debug(f"Returning response with {len(filtered_tasks)} tasks")
+    logger.debug("Returning response with %s tasks", len(filtered_tasks))
 
     ## Now we should pass this to the manager and he should handle the rest 
     manager = Manager()
@@ -1,13 +1,19 @@
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 
+from app.core import http_cache
+from app.core.profiling import ProfiledRoute
+from app.core.responses import ExportFormat, export_response, list_response
 from app.schemas.task import TaskCreate, Task, TaskStatusUpdate, TaskAssignPayload
 from app.schemas.user import User
 from app.core.permissions import require_perms
 from app.crud import task as crud
 from app.api.deps import get_current_user
-from app.crud.task import get_task, update_task
+from app.crud.task import update_task
 
-router = APIRouter(prefix="/tasks", tags=["Tasks"])
+router = APIRouter(prefix="/tasks", tags=["Tasks"], route_class=ProfiledRoute)
 
 # --- create ---
 @router.post(
@@ -19,15 +25,33 @@ def create_task(payload: TaskCreate):
 
 
 # --- list ---
-@router.get("", response_model=list[Task], dependencies=[require_perms("task:read_all")])
-@router.get("/", include_in_schema=False)  
+# conditional first: a 304 skips the permission lookups as well
+_LIST_DEPENDENCIES = [http_cache.conditional("tasks", "users", private=True), require_perms("task:read_all")]
+
+
+@router.get("", response_model=list[Task], dependencies=_LIST_DEPENDENCIES)
+@router.get("/", include_in_schema=False, dependencies=_LIST_DEPENDENCIES)
 def list_tasks():
-    return crud.list_tasks()
+    return list_response(Task, crud.list_tasks())
 
 
 @router.get("/me", response_model=list[Task], dependencies=[require_perms("task:read_own")])
 def my_tasks(current: User = Depends(get_current_user)):
-    return crud.list_tasks_by_assignee(current.uid)
+    return list_response(Task, crud.list_tasks_by_assignee(current.uid))
+
+
+# --- export (before /{task_id}) ---
+@router.get(
+    "/export",
+    dependencies=[require_perms("task:read_all")],
+    response_class=StreamingResponse,
+)
+def export_tasks(
+    disaster_id: Optional[str] = None,
+    assigned_to: Optional[str] = None,
+    format: ExportFormat = "ndjson",
+):
+    return export_response(Task, crud.iter_tasks(disaster_id, assigned_to), format, "tasks")
 
 
 # --- detail ---
@@ -60,11 +84,11 @@ def update_task_status(
     payload: TaskStatusUpdate,
     current: User = Depends(get_current_user),
 ):
-    task = crud.get_task(task_id)
+    # the update itself 404s on a missing task: no existence check read
+    task = crud.update_task_status(task_id, payload)
     if not task:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Task not found")
-
-    return crud.update_task_status(task_id, payload)
+    return task
 
 
 @router.patch(
@@ -75,10 +99,10 @@ def update_task_status(
 def authorize_task_endpoint(
     task_id: str,
 ):
-    task = crud.get_task(task_id)
+    task = crud.authorize_task(task_id)
     if not task:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Task not found")
-    return crud.authorize_task(task_id)
+    return task
 
 
 @router.patch(
@@ -91,8 +115,8 @@ def assign_task(
     payload: TaskAssignPayload,
     current: User = Depends(get_current_user),
 ):
-    task = get_task(task_id)
+    # pass the BaseModel directly, not a dict
+    task = update_task(task_id, payload)
     if not task:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Task not found")
-    # pass the BaseModel directly, not a dict
-    return update_task(task_id, payload)
\ No newline at end of file
+    return task
\ No newline at end of file
@@ -1,32 +1,23 @@
 import os
 import sys
 from celery import Celery, shared_task
-from redis import ConnectionPool, Redis
+from celery.signals import before_task_publish, task_postrun, task_prerun, worker_process_init
+from contextlib import ExitStack
+from app.core.redis import get_redis, redis_url
 
 from app.utils.logger import get_logger
 logger = get_logger(__name__)
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-# -------------------------------------------------------------------
-# Shared Redis pool for any app-side Redis usage
-# -------------------------------------------------------------------
-REDIS_HOST     = "redis-16819.c212.ap-south-1-1.ec2.redns.redis-cloud.com"
-REDIS_PORT     = 16819
-REDIS_USERNAME = "default"
-REDIS_PASSWORD = "VC5QOip29LYyzGgsPyFmFeyG38Amprc4"
-
-_pool = ConnectionPool(
-    host=REDIS_HOST,
-    port=REDIS_PORT,
-    password=REDIS_PASSWORD,
-    max_connections=5,            # limit app’s own connections
-)
-shared_redis = Redis(connection_pool=_pool)
+# CELERY_BROKER_URL overrides the shared Redis (REDIS_* settings), e.g.
+# redis://localhost:6379/0 for a local stack or memory:// for an in-process
+# worker (load simulations)
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL") or redis_url()
 
 celery_app = Celery(
     'backend',
-    broker=f'redis://default:{REDIS_PASSWORD}@{REDIS_HOST}:{REDIS_PORT}',
+    broker=CELERY_BROKER_URL,
     backend=None,              
 )
 
@@ -51,17 +42,109 @@ celery_app.conf.update(
     task_ignore_result=True,
 )
 
+# -------------------------------------------------------------------
+# Periodic jobs (run `celery -A app.celery_config beat` next to the worker)
+# -------------------------------------------------------------------
+from app.agent.config.pipeline_config_loader import PipelineConfig
+
+hotspot_cfg = PipelineConfig().get('hotspot_detection')
+# how often held resource reservations past their expiry are released
+reservation_sweep_s = float(os.getenv('RESERVATION_SWEEP_S', '60'))
+
+celery_app.conf.beat_schedule = {
+    'detect-hotspots': {
+        'task': 'detect_hotspots',
+        'schedule': hotspot_cfg['interval_s'],
+        # a late run is superseded by the next one
+        'options': {'expires': hotspot_cfg['interval_s']},
+    },
+    'expire-reservations': {
+        'task': 'expire_reservations',
+        'schedule': reservation_sweep_s,
+        'options': {'expires': reservation_sweep_s},
+    },
+}
+
 from app.agent.core.manager import Manager
+from app.core import profiling, tracing
+from app.core.storage import accounting
+from app.utils.metrics import start_publisher
+
+
+@worker_process_init.connect
+def _publish_worker_metrics(**_):
+    # LLM calls happen in the worker children: add their metrics to the shared totals
+    start_publisher(get_redis())
+
+
+@before_task_publish.connect
+def _propagate_trace(headers=None, **_):
+    # the worker continues the publisher's trace (read back as task.request.traceparent)
+    if headers is not None:
+        tracing.inject(headers)
+
+
+# Per task run, keyed by task id between the signals: the scopes opened for
+# it (trace span, Firestore accounting) and its Firestore operations
+_task_scopes = {}
+
+
+@task_prerun.connect
+def _open_task_scopes(task_id=None, task=None, **_):
+    scope = ExitStack()
+    scope.enter_context(tracing.remote_parent(getattr(task.request, tracing.HEADER, None)))
+    scope.enter_context(tracing.span(f"task {task.name}", tracing.CONSUMER, **{
+        "celery.task_id": task_id, "celery.retries": task.request.retries,
+    }))
+    _task_scopes[task_id] = (scope, scope.enter_context(accounting.track()))
+
+
+@task_postrun.connect
+def _close_task_scopes(task_id=None, task=None, **_):
+    scope, ops = _task_scopes.pop(task_id, (None, None))
+    if scope is None:
+        return
+    scope.close()
+    accounting.record(ops, "task", task.name)
+    logger.info("Task %s used Firestore: %s", task.name, ops.as_dict())
+
 
 @shared_task(bind=True, name='agent_flow', max_retries=3, default_retry_delay=10)
 def run_agentic_workflow(self, agent_payload: dict):
     """
     This task runs the agentic workflow asynchronously.
     """
+    reason = "requested" if getattr(self.request, "profile", False) else ("sampled" if profiling.sampled() else None)
     try:
-        manager = Manager()
-        response = manager.run(agent_payload)
+        with profiling.capture(reason), profiling.profile("task agent_flow"):
+            manager = Manager()
+            response = manager.run(agent_payload)
         return response
     except Exception as e:
-        logger.error(f"Agentic workflow failed: {e}")
+        logger.error("Agentic workflow failed: %s", e)
         raise self.retry(exc=e)
+
+
+@shared_task(name='detect_hotspots')
+def detect_hotspots():
+    """
+    Cluster recent unassigned requests/observations and propose disasters in bulk.
+    """
+    from app.agent.utils.hotspot import propose_hotspot_disasters
+
+    created = propose_hotspot_disasters(PipelineConfig().get('hotspot_detection'))
+    logger.info("Hotspot detection proposed %s disasters", len(created))
+    return created
+
+
+@shared_task(name='expire_reservations')
+def expire_reservations():
+    """
+    Give the units of resource reservations that were never committed back to stock.
+    """
+    from app.crud.resource import expire_reservations as release_expired
+
+    released = release_expired()
+    if released:
+        logger.info("Released %s expired resource reservations", released)
+    return released
@@ -6,11 +6,8 @@ import yaml
 from langchain_mcp_adapters.client import MultiServerMCPClient
 from langgraph.graph import StateGraph, MessagesState, START
 from langgraph.prebuilt import ToolNode, tools_condition
-from langchain.chat_models import init_chat_model
+from app.agent.utils.llm_providers import get_chat_model
 
-from langfuse.callback import CallbackHandler
-from langfuse.decorators import langfuse_context, observe
-import os
 
 from app.chatbot.schemas.user import User
 
@@ -18,19 +15,19 @@ from app.chatbot.guardrails.domain_check import is_domain_relevant
 from app.chatbot.guardrails.ethics_check import is_prompt_safe
 from app.chatbot.utils.summarizer import ChatSummarizer
 
-from langfuse import Langfuse
+from app.core import llm_tracing
 
 from app.utils.logger import get_logger
 logger = get_logger(__name__)
 
 class Chatbot:
     def __init__(self, config_path: str = "app/chatbot/config/mcp_config.yaml"):
-        self.model = init_chat_model("groq:llama3-70b-8192")
+        self.model = get_chat_model("CHATBOT")
         self.config_path = config_path
         self.client = None
         self.tools = None
         self.graph = None
-        self.langfuse = Langfuse()
+        self.langfuse = llm_tracing.client()
         self.chat_summarizer = ChatSummarizer()
 
     def load_config(self):
@@ -56,10 +53,14 @@ class Chatbot:
         self.graph = builder.compile()
 
     async def ask(self, prompt: str, user: User, chat_history=list):
+        with llm_tracing.trace_run("langgraph_resq_chatbot", input=prompt) as sampled:
+            return await self._ask(prompt, user, chat_history, sampled)
+
+    async def _ask(self, prompt: str, user: User, chat_history, sampled: bool):
         logger.info("Inside Chatbot")
-        logger.debug(f"prompt: {prompt}")
-        logger.debug(f"user: {str(user)}")
-        logger.debug(f"chat_history: {str(chat_history)}")
+        logger.debug("prompt: %s", prompt)
+        logger.debug("user: %s", str(user))
+        logger.debug("chat_history: %s", str(chat_history))
 
         if self.graph is None:
             raise RuntimeError("Graph not initialized. Call setup() first.")
@@ -85,18 +86,21 @@ class Chatbot:
 
         
         message = f"""
-        The user info is : {user.dict()}
+        The user info is : {user.model_dump()}
         {prompt_with_context}
         """
 
-        trace = self.langfuse.trace()
-        langfuse_handler_trace = trace.get_langchain_handler(
-            update_parent=True  # add i/o to trace itself as well
-        )
+        trace = self.langfuse.trace(name='langgraph_resq_chatbot', metadata={"sampled": sampled})
+        callbacks = []
+        if sampled:
+            callbacks.append(trace.get_langchain_handler(
+                update_parent=True  # add i/o to trace itself as well
+            ))
+        # unsampled turns keep the bare trace, so user feedback still has something to score
 
-        response = await self.graph.ainvoke({"messages": message}, config={"callbacks": [langfuse_handler_trace], "run_name": 'langgraph_resq_chatbot'})
+        response = await self.graph.ainvoke({"messages": message}, config={"callbacks": callbacks, "run_name": 'langgraph_resq_chatbot'})
 
-        logger.debug(f"response: {response['messages'][-1].content}")
+        logger.debug("response: %s", response['messages'][-1].content)
 
         return {
             'trace': trace.id,
@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import Any, Dict, List, Optional
-from pydantic import BaseModel, Field, Extra
+from pydantic import BaseModel, ConfigDict, Field
 
 class Location(BaseModel):
     """Simple lat/lng pair for API payloads & responses."""
@@ -33,6 +33,4 @@ class Request(BaseModel):
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        orm_mode = True
-        extra = Extra.ignore
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True, extra="ignore")
\ No newline at end of file
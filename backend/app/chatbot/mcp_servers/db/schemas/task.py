@@ -1,7 +1,7 @@
 from datetime import datetime
 from enum import Enum
 from typing import List, Literal, Optional
-from pydantic import BaseModel, Field, Extra
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class TaskStatusEnum(str, Enum):
@@ -53,8 +53,7 @@ class TaskInDBBase(TaskBase):
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class Task(TaskInDBBase):
@@ -62,6 +61,4 @@ class Task(TaskInDBBase):
     Complete Task schema for responses (including agent outputs),
     but ignore any extra fields coming from the LLM.
     """
-    class Config:
-        orm_mode = True
-        extra = Extra.ignore
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True, extra="ignore")
\ No newline at end of file
@@ -1,15 +1,14 @@
 from typing import List, Dict
-from langchain.chat_models import init_chat_model
+from app.agent.utils.llm_providers import get_chat_model
 from langchain_core.messages import HumanMessage
-from langfuse.decorators import langfuse_context, observe
+from app.core.llm_tracing import observe, update_current_observation
 
 from app.utils.logger import get_logger
 logger = get_logger(__name__)
 
 class ChatSummarizer:
     def __init__(self):
-        # Initialize the Groq model (LLaMA 3 70B)
-        self.model = init_chat_model("groq:gemma2-9b-it")
+        self.model = get_chat_model("SUMMARIZER")
 
     def format_chat_history(self, chat_history: List[Dict[str, str]]) -> str:
         """Format chat history into plain text dialogue."""
@@ -28,7 +27,7 @@ class ChatSummarizer:
             "Relevant Context Summary:"
         )
 
-    @observe(as_type='generation', name='chat_history_summarization')
+    @observe(name='chat_history_summarization')
     def get_contextual_prompt(self, chat_history: List[Dict[str, str]], user_prompt: str) -> str:
         """Generate a relevant context summary from chat history and user prompt."""
         logger.info('Inside chat summarizer')
@@ -36,7 +35,7 @@ class ChatSummarizer:
         prompt = self.build_prompt(chat_history, user_prompt)
 
         # Log the input and model parameters before calling the LLM
-        langfuse_context.update_current_observation(
+        update_current_observation(
             input=prompt,
             model='gemma2-9b-it',
             # model_parameters=model_parameters,
@@ -45,7 +44,7 @@ class ChatSummarizer:
 
         response = self.model.invoke([HumanMessage(content=prompt)])
 
-        langfuse_context.update_current_observation(
+        update_current_observation(
             usage_details={
                 "input": len(str(prompt)),
                 "output": len(str(response))
@@ -53,5 +52,5 @@ class ChatSummarizer:
             output=str(response)
         )
 
-        logger.debug(f'contextual prompt : {response.content}')
+        logger.debug("contextual prompt : %s", response.content)
         return response.content
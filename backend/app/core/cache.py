@@ -0,0 +1,163 @@
+"""
+core/cache.py
+-------------
+Read-through Redis cache for the single-document crud getters, shared by
+every API and Celery process.
+
+    def get_task(task_id):
+        return cache.read_through(Task, COLLECTION, task_id, lambda: _load_task(task_id))
+
+Entries are the model's JSON-mode dump packed with msgpack under
+`cache:{collection}:{id}` and live for CACHE_TTL_S. Writers call
+`invalidate(collection, *ids)` after changing documents. That replaces the
+entry with a tombstone for CACHE_TOMBSTONE_S instead of deleting it, and
+entries are only ever added with SET NX, so a reader that loaded the old
+document just before the write cannot put it back. Concurrent misses on a
+key, in any process, go through SingleFlight and cost one Firestore read.
+Not-found results are not cached.
+
+Redis trouble never fails a read: the getter falls back to Firestore, and
+Redis is left alone for CACHE_RETRY_S. Invalidations that could not be
+written are retried first thing when Redis is back; until they land, the
+cache is bypassed.
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Optional, Set, Type, TypeVar
+
+import msgpack
+from pydantic import BaseModel
+from redis.exceptions import RedisError
+
+from app.core.redis import get_redis
+from app.core.singleflight import SingleFlight
+from app.utils.logger import get_logger
+from app.utils.metrics import counter
+
+logger = get_logger(__name__)
+
+TTL_S = float(os.getenv("CACHE_TTL_S", "300"))
+TOMBSTONE_S = float(os.getenv("CACHE_TOMBSTONE_S", "10"))
+RETRY_S = float(os.getenv("CACHE_RETRY_S", "30"))
+
+CACHE_REQUESTS = counter(
+    "cache_requests_total",
+    "Cached crud getter calls by collection and result (hit, miss, bypass)",
+    ("collection", "result"),
+)
+
+M = TypeVar("M", bound=BaseModel)
+
+_PREFIX = "cache:"
+_TOMBSTONE = b""
+_FILLED, _ABSENT = "filled", "absent"
+
+_lock = threading.Lock()
+_missed: Set[str] = set()
+_retry_at = 0.0
+
+
+def _key(collection: str, doc_id: str) -> str:
+    return f"{_PREFIX}{collection}:{doc_id}"
+
+
+def _offline() -> bool:
+    return time.monotonic() < _retry_at
+
+
+def _fail(e: Exception) -> None:
+    global _retry_at
+    logger.warning("Cache unavailable for %ss: %s", RETRY_S, e)
+    _retry_at = time.monotonic() + RETRY_S
+
+
+def _flight() -> SingleFlight:
+    # waiters poll for a Firestore read, not an LLM call: keep the intervals short
+    return SingleFlight(get_redis(), "cache", lock_ttl_s=5, result_ttl_s=1, wait_timeout_s=3, poll_interval_s=0.02)
+
+
+def _cached(model: Type[M], key: str) -> Optional[M]:
+    raw = get_redis().get(key)
+    if not raw:  # missing or tombstone
+        return None
+    return model.model_validate(msgpack.unpackb(raw))
+
+
+def _fill(key: str, obj: BaseModel) -> None:
+    try:
+        packed = msgpack.packb(obj.model_dump(mode="json", by_alias=True))
+    except Exception as e:
+        logger.warning("Not caching %s: %s", key, e)
+        return
+    try:
+        get_redis().set(key, packed, nx=True, px=int(TTL_S * 1000))
+    except RedisError as e:
+        _fail(e)
+
+
+def read_through(model: Type[M], collection: str, doc_id: str, load: Callable[[], Optional[M]]) -> Optional[M]:
+    """`load()` (a Firestore read returning a `model` or None), served from the cache when possible."""
+    if _missed:
+        _tombstone()
+    if not doc_id or _missed or _offline():
+        CACHE_REQUESTS.inc(collection=collection, result="bypass")
+        return load()
+
+    key = _key(collection, doc_id)
+    try:
+        obj = _cached(model, key)
+    except RedisError as e:
+        _fail(e)
+        CACHE_REQUESTS.inc(collection=collection, result="bypass")
+        return load()
+    if obj is not None:
+        CACHE_REQUESTS.inc(collection=collection, result="hit")
+        return obj
+    CACHE_REQUESTS.inc(collection=collection, result="miss")
+
+    loaded = {}
+
+    def fill() -> str:
+        loaded["obj"] = obj = load()
+        if obj is None:
+            return _ABSENT
+        _fill(key, obj)
+        return _FILLED
+
+    result, leader = _flight().do(key, fill)
+    if leader:
+        return loaded["obj"]
+    if result == _ABSENT:
+        return None
+    try:
+        obj = _cached(model, key)
+    except RedisError as e:
+        _fail(e)
+        obj = None
+    # None: invalidated since the leader filled it
+    return obj if obj is not None else load()
+
+
+def _tombstone(*keys: str) -> None:
+    with _lock:
+        _missed.update(keys)
+        pending = set(_missed)
+    if not pending or _offline():
+        return
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for key in pending:
+            pipe.set(key, _TOMBSTONE, px=int(TOMBSTONE_S * 1000))
+        pipe.execute()
+    except RedisError as e:
+        _fail(e)
+        return
+    with _lock:
+        _missed.difference_update(pending)
+
+
+def invalidate(collection: str, *doc_ids: str) -> None:
+    """Drop the entries of documents that were just written. Never raises."""
+    _tombstone(*(_key(collection, doc_id) for doc_id in doc_ids))
@@ -1,44 +1,54 @@
 """
 core/firebase.py
 ----------------
-Singleton helpers for Firestore + Auth
+Singleton helpers for Firestore + Auth.
+get_db() serves the backend chosen by STORAGE_BACKEND (see core/storage),
+instrumented so every operation is counted (see core/storage/accounting).
 """
 
 import os
 from pathlib import Path
 from functools import lru_cache
-from typing import Dict, Any
+from typing import Dict, Any, Union
 
 from dotenv import load_dotenv
 import firebase_admin
 from firebase_admin import credentials, firestore, auth
 
+from app.core.storage import LocalClient, accounting, create_local_client, get_backend_name
+
 load_dotenv()
 
 ENV_KEY = "GOOGLE_APPLICATION_CREDENTIALS"
 _COL_ROLES = "roles"
 _COL_USERS = "users"
 
-service_account = os.getenv(ENV_KEY)
-if not service_account:
-    raise EnvironmentError(f"Missing env var: {ENV_KEY}")
+def _service_account_path() -> Path:
+    # Checked on first use, not at import: offline storage backends need no credentials
+    service_account = os.getenv(ENV_KEY)
+    if not service_account:
+        raise EnvironmentError(f"Missing env var: {ENV_KEY}")
 
-service_account_path = Path(service_account).expanduser().resolve()
-if not service_account_path.is_file():
-    raise FileNotFoundError(f"Service-account JSON not found: {service_account_path}")
+    service_account_path = Path(service_account).expanduser().resolve()
+    if not service_account_path.is_file():
+        raise FileNotFoundError(f"Service-account JSON not found: {service_account_path}")
+    return service_account_path
 
 
 @lru_cache(maxsize=1)
 def get_app() -> firebase_admin.App:
     if not firebase_admin._apps:
-        cred = credentials.Certificate(str(service_account_path))
+        cred = credentials.Certificate(str(_service_account_path()))
         firebase_admin.initialize_app(cred)
     return firebase_admin.get_app()
 
 
 @lru_cache(maxsize=1)
-def get_db() -> firestore.Client:
-    return firestore.client(app=get_app())
+def get_db() -> Union[firestore.Client, LocalClient]:
+    backend = get_backend_name()
+    if backend == "firestore":
+        return accounting.instrument(firestore.client(app=get_app()))
+    return accounting.instrument(create_local_client(backend))
 
 
 @lru_cache(maxsize=1)
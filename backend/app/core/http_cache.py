@@ -0,0 +1,171 @@
+"""
+core/http_cache.py
+------------------
+Conditional GETs (ETag / If-None-Match) for read-heavy endpoints.
+
+Every crud write path calls `touch(collection)` once the write is done,
+which bumps that collection's change marker: a Redis counter shared by all
+API and Celery processes. A route opts in with a dependency naming the
+collections its response is built from:
+
+    @router.get("/disasters", dependencies=[http_cache.conditional("disasters", max_age=15)])
+
+Its strong ETag hashes the path, the query string and those markers (plus
+the Authorization header on private routes), and is computed before the
+handler runs. A request whose If-None-Match matches is answered 304 right
+there, so neither the handler nor, when the dependency is listed first,
+the auth / permission lookups read Firestore. On private routes a 304
+only tells the holder of the very token that was last served a 200 that
+nothing changed. Otherwise the `http_caching` middleware in main.py stamps
+the ETag and the route's Cache-Control on the 200.
+
+Markers carry a random epoch, so counters lost with a Redis flush never
+reproduce an old ETag. While Redis is unreachable no ETags are issued
+(nothing can be served stale), touches are remembered and replayed on
+the next successful contact, and Redis is retried after
+HTTP_CACHE_RETRY_S.
+
+HTTP_CACHE_REQUESTS counts conditional routes by result; the hit ratio is
+hit / (hit + miss + none).
+"""
+
+import hashlib
+import os
+import threading
+import time
+import uuid
+from typing import List, Optional, Set
+
+from fastapi import Depends, HTTPException, Request, Response, status
+from redis.exceptions import RedisError
+
+from app.core.redis import get_redis
+from app.utils.logger import get_logger
+from app.utils.metrics import counter
+
+logger = get_logger(__name__)
+
+RETRY_S = float(os.getenv("HTTP_CACHE_RETRY_S", "30"))
+
+HTTP_CACHE_REQUESTS = counter(
+    "http_cache_requests_total",
+    "GETs on conditional routes by result: hit (304), miss (stale If-None-Match), "
+    "none (no If-None-Match), bypass (change markers unavailable)",
+    ("route", "result"),
+)
+
+_EPOCH_KEY = "http_cache:epoch"
+_MARKER_PREFIX = "http_cache:marker:"
+
+_lock = threading.Lock()
+_missed: Set[str] = set()
+_retry_at = 0.0
+
+
+# ---------------------------- change markers ----------------------------- #
+def _offline() -> bool:
+    return time.monotonic() < _retry_at
+
+
+def _fail(e: Exception) -> None:
+    global _retry_at
+    logger.warning("HTTP cache markers unavailable for %ss: %s", RETRY_S, e)
+    _retry_at = time.monotonic() + RETRY_S
+
+
+def touch(*collections: str) -> None:
+    """Record that `collections` changed. Never raises."""
+    with _lock:
+        _missed.update(collections)
+        pending = set(_missed)
+    if _offline():
+        return
+    try:
+        redis = get_redis()
+        for collection in pending:
+            redis.incr(_MARKER_PREFIX + collection)
+    except RedisError as e:
+        _fail(e)
+        return
+    with _lock:
+        _missed.difference_update(pending)
+
+
+def versions(collections: List[str]) -> Optional[List[bytes]]:
+    """The epoch and the markers of `collections`, or None while they cannot be trusted."""
+    if _missed:
+        touch()
+    if _missed or _offline():
+        return None
+    keys = [_EPOCH_KEY] + [_MARKER_PREFIX + c for c in collections]
+    try:
+        redis = get_redis()
+        values = redis.mget(keys)
+        if values[0] is None:
+            redis.set(_EPOCH_KEY, uuid.uuid4().hex, nx=True)
+            values = redis.mget(keys)
+    except RedisError as e:
+        _fail(e)
+        return None
+    return [v if v is not None else b"0" for v in values]
+
+
+# ------------------------------ validators ------------------------------- #
+def _matches(if_none_match: str, etag: str, wildcard: bool = True) -> bool:
+    # weak comparison, as RFC 9110 prescribes for If-None-Match
+    if if_none_match.strip() == "*":
+        return wildcard
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def conditional(*collections: str, max_age: int = 0, private: bool = False):
+    """
+    Route dependency making GETs of the route conditional on the change
+    markers of `collections`. Public routes may be reused by any cache for
+    `max_age` seconds; private ones only by the caller's, after revalidation.
+    """
+    if private:
+        cache_control = "private, no-cache"
+    else:
+        cache_control = f"public, max-age={max_age}" if max_age else "public, no-cache"
+
+    def check(request: Request) -> None:
+        route = getattr(request.scope.get("route"), "path", request.url.path)
+        markers = versions(list(collections))
+        if markers is None:
+            HTTP_CACHE_REQUESTS.inc(route=route, result="bypass")
+            return
+
+        digest = hashlib.blake2b(digest_size=16)
+        for part in (request.url.path, request.url.query, *markers):
+            digest.update(part if isinstance(part, bytes) else part.encode())
+            digest.update(b"\0")
+        if private:
+            digest.update(hashlib.sha256(request.headers.get("Authorization", "").encode()).digest())
+        etag = f'"{digest.hexdigest()}"'
+
+        headers = {"ETag": etag, "Cache-Control": cache_control}
+        if private:
+            headers["Vary"] = "Authorization"
+        if_none_match = request.headers.get("If-None-Match")
+        # "*" matches any tag: on private routes only a tag served for this token may 304
+        if if_none_match and _matches(if_none_match, etag, wildcard=not private):
+            HTTP_CACHE_REQUESTS.inc(route=route, result="hit")
+            raise HTTPException(status.HTTP_304_NOT_MODIFIED, headers=headers)
+        HTTP_CACHE_REQUESTS.inc(route=route, result="miss" if if_none_match else "none")
+        request.state.http_cache = headers
+
+    return Depends(check)
+
+
+def apply(request: Request, response: Response) -> None:
+    """Stamp the validators computed by `conditional` on a successful response."""
+    headers = getattr(request.state, "http_cache", None)
+    if headers is None or response.status_code != status.HTTP_200_OK:
+        return
+    for name, value in headers.items():
+        if name == "Vary":
+            # keep what CORSMiddleware added
+            response.headers.add_vary_header(value)
+        else:
+            response.headers[name] = value
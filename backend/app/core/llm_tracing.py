@@ -0,0 +1,224 @@
+"""
+core/llm_tracing.py
+-------------------
+Sampling, truncation and bounded export for the Langfuse instrumentation.
+
+Each pipeline run / chatbot turn is traced in full with probability
+LANGFUSE_TRACE_SAMPLE_RATE (head sampling, decided once by `trace_run`).
+Unsampled runs skip the Langfuse decorators and callback handlers
+altogether; when one of their calls fails or takes longer than
+LANGFUSE_SLOW_CALL_S it is still sent, afterwards, as a standalone
+observation with whatever it recorded (errors and slow calls are always
+kept).
+
+One Langfuse client is shared by the decorators, the handlers and the
+chatbot. Its input / output payloads are cut to LANGFUSE_MAX_FIELD_CHARS
+characters (and LANGFUSE_MAX_ITEMS list items) on its export thread, and
+its event queue holds at most LANGFUSE_MAX_QUEUE events: when the export
+falls behind, events are dropped instead of piling up in memory.
+
+    @observe(name="llm_groq_generation")
+    def complete(...):
+        update_current_observation(input=messages, model=model)
+"""
+
+import functools
+import inspect
+import os
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from langfuse import Langfuse
+from langfuse.decorators import langfuse_context
+from langfuse.decorators import observe as langfuse_observe
+from langfuse.utils.langfuse_singleton import LangfuseSingleton
+from pydantic import BaseModel
+
+from app.utils.logger import get_logger
+logger = get_logger(__name__)
+
+# not LANGFUSE_SAMPLE_RATE: the SDK reads that one itself and would also drop
+# the errors and slow calls kept here
+SAMPLE_RATE = float(os.getenv("LANGFUSE_TRACE_SAMPLE_RATE", "1.0"))
+SLOW_CALL_S = float(os.getenv("LANGFUSE_SLOW_CALL_S", "10"))
+MAX_FIELD_CHARS = int(os.getenv("LANGFUSE_MAX_FIELD_CHARS", "4000"))
+MAX_ITEMS = int(os.getenv("LANGFUSE_MAX_ITEMS", "50"))
+MAX_QUEUE = int(os.getenv("LANGFUSE_MAX_QUEUE", "10000"))
+
+
+# ------------------------------ truncation ------------------------------- #
+def truncate(data: Any, depth: int = 0) -> Any:
+    """A copy of an input / output payload with long strings and lists cut."""
+    if isinstance(data, str):
+        if len(data) <= MAX_FIELD_CHARS:
+            return data
+        return f"{data[:MAX_FIELD_CHARS]}... [{len(data) - MAX_FIELD_CHARS} more chars]"
+    if depth > 8:
+        return truncate(str(data), depth)
+    if isinstance(data, BaseModel):
+        data = data.model_dump()
+    if isinstance(data, dict):
+        return {k: truncate(v, depth + 1) for k, v in data.items()}
+    if isinstance(data, (list, tuple)):
+        items = [truncate(v, depth + 1) for v in data[:MAX_ITEMS]]
+        if len(data) > MAX_ITEMS:
+            items.append(f"... [{len(data) - MAX_ITEMS} more items]")
+        return items
+    return data
+
+
+def _mask(*, data: Any) -> Any:
+    # runs on the SDK's export thread, not on the traced call
+    return truncate(data)
+
+
+def client() -> Langfuse:
+    """The process-wide Langfuse client (the one `@observe` uses too)."""
+    singleton = LangfuseSingleton()
+    if singleton._langfuse is None:
+        langfuse = singleton.get(sample_rate=1.0, mask=_mask)
+        # the SDK only exposes its queue bound (100k) as a constructor default
+        langfuse.task_manager._ingestion_queue.maxsize = MAX_QUEUE
+    return singleton.get()
+
+
+# ------------------------------- sampling -------------------------------- #
+_sampled: ContextVar[Optional[bool]] = ContextVar("langfuse_sampled", default=None)
+
+
+class _Pending:
+    """What an unsampled call recorded, sent only if it fails or is slow."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.fields: Dict[str, Any] = {}
+
+
+_pending: ContextVar[Optional[_Pending]] = ContextVar("langfuse_pending", default=None)
+
+
+def sampled() -> bool:
+    """Whether the current run is traced in full (decided here outside of one)."""
+    decision = _sampled.get()
+    if decision is None:
+        return SAMPLE_RATE >= 1 or random.random() < SAMPLE_RATE
+    return decision
+
+
+@contextmanager
+def trace_run(name: str, input: Any = None, sample: Optional[bool] = None) -> Iterator[bool]:
+    """
+    Decide once whether the run inside the block is traced; yields the
+    decision. `sample` forces it (benchmarks). An unsampled run that fails
+    or is slow is still sent as a trace of its own.
+    """
+    decision = sampled() if sample is None else sample
+    token = _sampled.set(decision)
+    started = time.monotonic()
+    try:
+        yield decision
+    except Exception as e:
+        if not decision:
+            _send_trace(name, input, started, error=e)
+        raise
+    else:
+        if not decision and time.monotonic() - started > SLOW_CALL_S:
+            _send_trace(name, input, started)
+    finally:
+        _sampled.reset(token)
+
+
+def _send_trace(name: str, input: Any, started: float, error: Optional[BaseException] = None) -> None:
+    duration = time.monotonic() - started
+    try:
+        client().trace(
+            name=name,
+            input=input,
+            output={"error": f"{type(error).__name__}: {error}"} if error else None,
+            tags=["error" if error else "slow"],
+            metadata={"sampled": False, "duration_s": round(duration, 3)},
+        )
+    except Exception as e:
+        logger.warning("Could not send trace %s: %s", name, e)
+
+
+def update_current_observation(**fields: Any) -> None:
+    """langfuse_context.update_current_observation, for sampled and unsampled calls alike."""
+    pending = _pending.get()
+    if pending is None:
+        langfuse_context.update_current_observation(**fields)
+        return
+    metadata = fields.pop("metadata", None)
+    pending.fields.update(fields)
+    if metadata:
+        pending.fields.setdefault("metadata", {}).update(metadata)
+
+
+def _send_observation(pending: _Pending, started_at: datetime, duration: float, error: Optional[BaseException]) -> None:
+    fields = dict(pending.fields)
+    fields["name"] = fields.get("name") or pending.name
+    fields["metadata"] = {**fields.get("metadata", {}), "sampled": False, "duration_s": round(duration, 3)}
+    if error is not None:
+        fields.update(level="ERROR", status_message=f"{type(error).__name__}: {error}")
+    try:
+        client().generation(start_time=started_at, end_time=datetime.now(timezone.utc), **fields)
+    except Exception as e:
+        logger.warning("Could not send observation %s: %s", pending.name, e)
+
+
+@contextmanager
+def _unsampled(name: str) -> Iterator[None]:
+    pending = _Pending(name)
+    token = _pending.set(pending)
+    started_at, started = datetime.now(timezone.utc), time.monotonic()
+    try:
+        yield
+    except Exception as e:
+        _send_observation(pending, started_at, time.monotonic() - started, e)
+        raise
+    else:
+        duration = time.monotonic() - started
+        if duration > SLOW_CALL_S:
+            _send_observation(pending, started_at, duration, None)
+    finally:
+        _pending.reset(token)
+
+
+@contextmanager
+def _sampled_call() -> Iterator[None]:
+    # a sampled call inside an unsampled one reports to Langfuse directly
+    client()   # before the decorator builds the shared client without our settings
+    token = _pending.set(None)
+    try:
+        yield
+    finally:
+        _pending.reset(token)
+
+
+def observe(name: str, as_type: str = "generation") -> Callable:
+    """`langfuse.decorators.observe` that only traces sampled calls."""
+    def decorate(fn: Callable) -> Callable:
+        traced = langfuse_observe(as_type=as_type, name=name)(fn)
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                if sampled():
+                    with _sampled_call():
+                        return await traced(*args, **kwargs)
+                with _unsampled(name):
+                    return await fn(*args, **kwargs)
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if sampled():
+                    with _sampled_call():
+                        return traced(*args, **kwargs)
+                with _unsampled(name):
+                    return fn(*args, **kwargs)
+        return wrapper
+    return decorate
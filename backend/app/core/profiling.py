@@ -0,0 +1,202 @@
+"""
+core/profiling.py
+-----------------
+On-demand profiling of API handlers and Celery tasks.
+
+A request is profiled when an admin sends the `X-Profile` header, or at
+random with probability PROFILE_SAMPLE_RATE (default 0: off). Tasks are
+profiled when the request that enqueued them was, or at the same rate.
+pyinstrument (statistical, HTML output) is used when installed, cProfile
+(.prof, open with snakeviz / pstats) otherwise. cProfile sees only the
+thread it runs on, so async handlers profiled with it also show whatever
+else the event loop ran meanwhile.
+
+Profiles go to PROFILE_DIR (default app/logs/profiles), which keeps only
+the newest PROFILE_MAX_FILES; admins list and download them through
+/admin/profiles.
+"""
+
+import functools
+import inspect
+import os
+import random
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from fastapi.routing import APIRoute
+
+from app.utils.logger import get_logger
+logger = get_logger(__name__)
+
+try:
+    from pyinstrument import Profiler as _Pyinstrument
+except ImportError:  # optional dependency
+    _Pyinstrument = None
+
+HEADER = "X-Profile"
+
+SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = Path(os.getenv(
+    "PROFILE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs", "profiles")
+))
+MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+# pyinstrument sampling interval
+INTERVAL_S = float(os.getenv("PROFILE_INTERVAL_S", "0.001"))
+
+_NAME = re.compile(r"^[\w.-]+\.(html|prof)$")
+
+
+class Capture:
+    """A profiling request for the current request / task, and its outcome."""
+
+    def __init__(self, reason: str):
+        self.reason = reason
+        self.name: Optional[str] = None
+
+
+_capture: ContextVar[Optional[Capture]] = ContextVar("profile_capture", default=None)
+
+
+def sampled() -> bool:
+    return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+
+
+def requested() -> bool:
+    """Whether the current request / task asked to be profiled."""
+    return _capture.get() is not None
+
+
+@contextmanager
+def capture(reason: Optional[str]) -> Iterator[Optional[Capture]]:
+    """Ask for the handler run inside the block to be profiled (reason None: don't)."""
+    if reason is None:
+        yield None
+        return
+    token = _capture.set(Capture(reason))
+    try:
+        yield _capture.get()
+    finally:
+        _capture.reset(token)
+
+
+# ------------------------------ profiling -------------------------------- #
+def _slug(label: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", label).strip("_")[:80] or "profile"
+
+
+def _prune() -> None:
+    files = sorted(PROFILE_DIR.glob("*.*"), key=lambda p: p.stat().st_mtime)
+    for path in files[:max(0, len(files) - MAX_FILES)]:
+        path.unlink(missing_ok=True)
+
+
+@contextmanager
+def profile(label: str, async_mode: bool = False) -> Iterator[None]:
+    """Profile the block if a capture was requested; save it under PROFILE_DIR."""
+    current = _capture.get()
+    if current is None or current.name is not None:
+        # nothing asked for, or an outer block is already profiling
+        yield
+        return
+
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    started = time.perf_counter()
+    if _Pyinstrument is not None:
+        profiler = _Pyinstrument(interval=INTERVAL_S, async_mode="enabled" if async_mode else "disabled")
+        name = f"{stamp}_{_slug(label)}.html"
+    else:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        name = f"{stamp}_{_slug(label)}.prof"
+    current.name = name
+
+    try:
+        if _Pyinstrument is not None:
+            profiler.start()
+        else:
+            profiler.enable()
+    except (RuntimeError, ValueError) as e:
+        # another profiler is already running on this thread / interpreter
+        current.name = None
+        logger.warning("Not profiling %s: %s", label, e)
+        yield
+        return
+    try:
+        yield
+    finally:
+        if _Pyinstrument is not None:
+            profiler.stop()
+        else:
+            profiler.disable()
+        try:
+            PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+            path = PROFILE_DIR / name
+            if _Pyinstrument is not None:
+                path.write_text(profiler.output_html(), encoding="utf-8")
+            else:
+                profiler.dump_stats(str(path))
+            _prune()
+            logger.info("Profiled %s (%s) in %.0f ms: %s", label, current.reason, (time.perf_counter() - started) * 1000, name)
+        except OSError as e:
+            current.name = None
+            logger.warning("Could not save profile of %s: %s", label, e)
+
+
+def profiled(label: str, fn: Callable) -> Callable:
+    """Wrap a sync or async callable so its runs are profiled on request."""
+    if getattr(fn, "__profiled__", False):
+        return fn
+
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with profile(label, async_mode=True):
+                return await fn(*args, **kwargs)
+    else:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            # sync handlers run in the thread pool: profile on that thread
+            with profile(label):
+                return fn(*args, **kwargs)
+
+    wrapper.__profiled__ = True
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """APIRoute whose endpoint is profiled when the request asks for it."""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        methods = ",".join(sorted(kwargs.get("methods") or ["GET"]))
+        super().__init__(path, profiled(f"{methods} {path}", endpoint), **kwargs)
+
+
+# ------------------------------- storage --------------------------------- #
+def list_profiles() -> List[Dict[str, Any]]:
+    if not PROFILE_DIR.is_dir():
+        return []
+    profiles = []
+    for path in sorted(PROFILE_DIR.iterdir(), key=lambda p: p.stat().st_mtime, reverse=True):
+        if _NAME.match(path.name):
+            stat = path.stat()
+            profiles.append({
+                "name": path.name,
+                "format": path.suffix.lstrip("."),
+                "size_bytes": stat.st_size,
+                "created_at": datetime.fromtimestamp(stat.st_mtime, timezone.utc).isoformat(),
+            })
+    return profiles
+
+
+def profile_path(name: str) -> Optional[Path]:
+    """Path of a stored profile, or None (also for names that are not ours)."""
+    if not _NAME.match(name):
+        return None
+    path = PROFILE_DIR / name
+    return path if path.is_file() else None
@@ -0,0 +1,59 @@
+"""
+core/redis.py
+-------------
+Shared Redis connection pool for app-side Redis usage (locks, caches)
+
+The server comes from the environment only (REDIS_HOST, REDIS_PORT,
+REDIS_USERNAME, REDIS_PASSWORD). Without REDIS_HOST and REDIS_PASSWORD,
+every command fails with a ConnectionError naming them (so the caches and
+locks degrade as they do when Redis is down), and `redis_url()` raises.
+"""
+
+import os
+from functools import lru_cache
+from typing import Optional
+from urllib.parse import quote
+
+from redis import BlockingConnectionPool, Connection, Redis
+from redis.exceptions import ConnectionError
+
+REDIS_HOST     = os.getenv("REDIS_HOST")
+REDIS_PORT     = int(os.getenv("REDIS_PORT", "6379"))
+REDIS_USERNAME = os.getenv("REDIS_USERNAME", "default")
+REDIS_PASSWORD = os.getenv("REDIS_PASSWORD")
+# request paths call Redis (cache markers, locks): fail fast rather than hang
+REDIS_TIMEOUT_S = float(os.getenv("REDIS_TIMEOUT_S", "5"))
+
+
+def _missing_settings() -> Optional[str]:
+    missing = [name for name, value in (("REDIS_HOST", REDIS_HOST), ("REDIS_PASSWORD", REDIS_PASSWORD)) if not value]
+    return f"Redis is not configured: set {' and '.join(missing)} in the environment" if missing else None
+
+
+class _Unconfigured(Connection):
+    def connect(self):
+        raise ConnectionError(_missing_settings())
+
+
+def redis_url() -> str:
+    """The shared Redis as a URL (e.g. for the Celery broker)."""
+    missing = _missing_settings()
+    if missing:
+        raise RuntimeError(missing)
+    return f"redis://{quote(REDIS_USERNAME, safe='')}:{quote(REDIS_PASSWORD, safe='')}@{REDIS_HOST}:{REDIS_PORT}"
+
+
+@lru_cache(maxsize=1)
+def get_redis() -> Redis:
+    # callers queue for a free connection (up to the timeout) instead of failing
+    pool = BlockingConnectionPool(
+        connection_class=_Unconfigured if _missing_settings() else Connection,
+        host=REDIS_HOST,
+        port=REDIS_PORT,
+        password=REDIS_PASSWORD,
+        max_connections=5,            # limit app’s own connections
+        socket_connect_timeout=REDIS_TIMEOUT_S,
+        socket_timeout=REDIS_TIMEOUT_S,
+        timeout=REDIS_TIMEOUT_S,
+    )
+    return Redis(connection_pool=pool)
@@ -0,0 +1,111 @@
+"""
+core/responses.py
+-----------------
+JSON rendering for the API.
+
+`ORJSONResponse` is the app's default response class: whatever FastAPI
+serialises is encoded with orjson instead of json.dumps.
+
+List endpoints return `list_response(Model, items)` instead of the list
+itself. crud builds (and so validates) every item once already; here they
+go straight to JSON bytes through a cached pydantic TypeAdapter, skipping
+FastAPI's second validation against `response_model`, its dict-building
+pass and the encode of that copy. `response_model` stays on the route for
+the OpenAPI schema; the output (aliases included) is the same.
+
+Bulk exports return `export_response(Model, items, fmt, name)` over a crud
+generator: NDJSON (one JSON object per line) or CSV, written as the query
+stream is consumed. Lines are grouped into ~64 KiB chunks; Starlette sends
+each chunk before pulling the next, so a slow client slows the Firestore
+read down instead of the items piling up in memory.
+"""
+
+import csv
+import io
+from functools import lru_cache
+from typing import Any, Iterable, Iterator, List, Literal, Sequence, Type
+
+import orjson
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import TypeAdapter
+
+ExportFormat = Literal["ndjson", "csv"]
+
+_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+_CHUNK_BYTES = 64 * 1024
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: Type[Any]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+
+def dump_list(model: Type[Any], items: Sequence[Any]) -> bytes:
+    """JSON array of already-validated `model` instances, as FastAPI would render it."""
+    return _list_adapter(model).dump_json(items if isinstance(items, list) else list(items), by_alias=True)
+
+
+def list_response(model: Type[Any], items: Sequence[Any], status_code: int = 200) -> Response:
+    return Response(dump_list(model, items), status_code=status_code, media_type="application/json")
+
+
+@lru_cache(maxsize=None)
+def _adapter(model: Type[Any]) -> TypeAdapter:
+    return TypeAdapter(model)
+
+
+def _ndjson_lines(model: Type[Any], items: Iterable[Any]) -> Iterator[bytes]:
+    adapter = _adapter(model)
+    for item in items:
+        yield adapter.dump_json(item, by_alias=True) + b"\n"
+
+
+def _csv_lines(model: Type[Any], items: Iterable[Any]) -> Iterator[bytes]:
+    # one column per schema field; nested values (locations, lists) as JSON
+    adapter = _adapter(model)
+    columns = [field.alias or name for name, field in model.model_fields.items()]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def line(values: List[Any]) -> bytes:
+        writer.writerow(values)
+        data = buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    yield line(columns)
+    for item in items:
+        row = adapter.dump_python(item, mode="json", by_alias=True)
+        yield line([
+            orjson.dumps(v).decode() if isinstance(v, (dict, list)) else ("" if v is None else v)
+            for v in (row.get(c) for c in columns)
+        ])
+
+
+def _chunked(lines: Iterator[bytes]) -> Iterator[bytes]:
+    chunk: List[bytes] = []
+    size = 0
+    for line in lines:
+        chunk.append(line)
+        size += len(line)
+        if size >= _CHUNK_BYTES:
+            yield b"".join(chunk)
+            chunk, size = [], 0
+    if chunk:
+        yield b"".join(chunk)
+
+
+def export_response(model: Type[Any], items: Iterable[Any], fmt: ExportFormat, name: str) -> StreamingResponse:
+    """Stream `items` (ideally a generator) as an NDJSON or CSV attachment called `name`."""
+    lines = _csv_lines(model, items) if fmt == "csv" else _ndjson_lines(model, items)
+    return StreamingResponse(
+        _chunked(lines),
+        media_type=_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+    )
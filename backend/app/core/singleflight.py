@@ -0,0 +1,118 @@
+"""
+core/singleflight.py
+--------------------
+Distributed single-flight on Redis: for one key, only the first caller across
+all API / Celery processes runs the work; concurrent callers wait and reuse
+its result.
+"""
+
+import time
+import uuid
+from typing import Callable, Optional, Tuple
+
+from redis import Redis
+from redis.exceptions import RedisError
+
+from app.utils.logger import get_logger
+logger = get_logger(__name__)
+
+_PENDING_PREFIX = "pending:"
+
+# Delete the key only while it still holds our own pending marker
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    def __init__(
+        self,
+        redis: Redis,
+        namespace: str,
+        lock_ttl_s: float = 60,
+        result_ttl_s: float = 1800,
+        wait_timeout_s: float = 45,
+        poll_interval_s: float = 0.5,
+    ):
+        self.redis = redis
+        self.namespace = namespace
+        self.lock_ttl_ms = int(lock_ttl_s * 1000)
+        self.result_ttl_ms = int(result_ttl_s * 1000)
+        self.wait_timeout_s = wait_timeout_s
+        self.poll_interval_s = poll_interval_s
+
+    def _key(self, key: str) -> str:
+        return f"singleflight:{self.namespace}:{key}"
+
+    def do(self, key: str, fn: Callable[[], str]) -> Tuple[str, bool]:
+        """
+        Return (result, leader). `fn` must return a short string (e.g. a document ID),
+        which is kept for `result_ttl_s` so late arrivals attach to it as well.
+        Redis trouble never blocks the caller: it degrades to running `fn` locally.
+        """
+        redis_key = self._key(key)
+        marker = f"{_PENDING_PREFIX}{uuid.uuid4().hex}"
+        give_up_at = time.monotonic() + self.wait_timeout_s
+
+        while True:
+            try:
+                acquired = self.redis.set(redis_key, marker, nx=True, px=self.lock_ttl_ms)
+                result = None if acquired else self._wait(redis_key, give_up_at)
+            except RedisError as e:
+                logger.warning("Single-flight %s unavailable, running locally: %s", redis_key, e)
+                return fn(), True
+
+            if acquired:
+                return self._lead(redis_key, marker, fn), True
+            if result is not None:
+                logger.info("Single-flight %s: attached to existing result %s", redis_key, result)
+                return result, False
+            if time.monotonic() >= give_up_at:
+                logger.warning("Single-flight %s: timed out waiting for the leader, running locally", redis_key)
+                return fn(), True
+            # the leader failed and released the key: try to take over
+
+    def _lead(self, redis_key: str, marker: str, fn: Callable[[], str]) -> str:
+        try:
+            result = fn()
+        except Exception:
+            try:
+                self.redis.eval(_RELEASE_SCRIPT, 1, redis_key, marker)
+            except RedisError as e:
+                logger.warning("Single-flight %s: could not release lock: %s", redis_key, e)
+            raise
+
+        try:
+            self.redis.set(redis_key, result, px=self.result_ttl_ms)
+        except RedisError as e:
+            logger.warning("Single-flight %s: could not publish result: %s", redis_key, e)
+        return result
+
+    def forget(self, key: str, result: str) -> None:
+        """
+        Drop a published `result` that turned out to be unusable (e.g. the
+        document it names was deleted), so the next caller runs `fn` again.
+        A newer result or a flight in progress is left alone.
+        """
+        try:
+            self.redis.eval(_RELEASE_SCRIPT, 1, self._key(key), result)
+        except RedisError as e:
+            logger.warning("Single-flight %s: could not forget result: %s", self._key(key), e)
+
+    def _wait(self, redis_key: str, give_up_at: float) -> Optional[str]:
+        """
+        Poll until the leader publishes a result (returned) or the key disappears /
+        the wait times out (None).
+        """
+        while time.monotonic() < give_up_at:
+            value = self.redis.get(redis_key)
+            if value is None:
+                return None
+            value = value.decode() if isinstance(value, bytes) else value
+            if not value.startswith(_PENDING_PREFIX):
+                return value
+            time.sleep(self.poll_interval_s)
+        return None
@@ -0,0 +1,58 @@
+"""
+core/storage
+------------
+Storage backend selection. The CRUD layer codes against the Firestore
+client API; STORAGE_BACKEND picks what serves it:
+
+    firestore  Google Cloud Firestore (default)
+    memory     process-local dicts, nothing persisted
+    sqlite     one SQLite file (SQLITE_PATH, default resq.sqlite3)
+"""
+
+import os
+from typing import Any, Callable
+
+from app.core.storage import accounting
+from app.core.storage.documents import LocalClient
+
+BACKENDS = ("firestore", "memory", "sqlite")
+
+
+def get_backend_name() -> str:
+    backend = os.getenv("STORAGE_BACKEND", "firestore").lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown STORAGE_BACKEND '{backend}' (expected one of {', '.join(BACKENDS)})")
+    return backend
+
+
+def create_local_client(backend: str) -> LocalClient:
+    if backend == "memory":
+        from app.core.storage.memory import MemoryStore
+
+        return LocalClient(MemoryStore())
+    if backend == "sqlite":
+        from app.core.storage.sqlite import SQLiteStore
+
+        store = SQLiteStore(os.getenv("SQLITE_PATH", "resq.sqlite3"))
+        client = LocalClient(store)
+        store.client = client
+        return client
+    raise ValueError(f"'{backend}' is not a local storage backend")
+
+
+def run_transaction(db: Any, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run fn(transaction, *args, **kwargs) as one atomic read-modify-write on
+    any backend (Firestore retries it on contention).
+    """
+    def body(transaction, *a, **kw):
+        # the client is instrumented (get_db()): so is the transaction fn sees
+        return fn(accounting.instrument(transaction), *a, **kw)
+
+    client = accounting.unwrap(db)
+    if isinstance(client, LocalClient):
+        return client.run_transaction(body, *args, **kwargs)
+
+    from google.cloud import firestore
+
+    return firestore.transactional(body)(client.transaction(), *args, **kwargs)
@@ -0,0 +1,281 @@
+"""
+core/storage/accounting.py
+--------------------------
+Counts what each HTTP request / Celery task costs in Firestore terms.
+
+`instrument(client)` wraps the client get_db() returns: every reference,
+query, batch and transaction handed out by it is wrapped in turn, and each
+operation is charged to the innermost active `track()` scope (and the
+scopes around it). Reads are billed the way Firestore bills them: one per
+document returned, at least one per query.
+
+    with track() as ops:
+        crud.list_disasters()
+    ops.reads, ops.writes, ops.queries, ops.streamed, ops.seconds
+
+`read_budget()` turns a scope into an assertion for tests and benchmarks.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+from app.core import tracing
+from app.utils.metrics import counter, histogram
+
+OPS = counter(
+    "firestore_operations_total",
+    "Firestore operations by scope (http / task), route or task name and kind "
+    "(reads, writes, queries, streamed documents)",
+    ("scope", "route", "op"),
+)
+OP_SECONDS = counter(
+    "firestore_seconds_total",
+    "Wall time spent in Firestore calls",
+    ("scope", "route"),
+)
+READS_PER_CALL = histogram(
+    "firestore_reads_per_call",
+    "Documents read per request / task",
+    ("scope", "route"),
+    buckets=(0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000),
+)
+
+# class names shared by google.cloud.firestore and core/storage/documents
+_DOCUMENT = "DocumentReference"
+_QUERIES = {"CollectionReference", "Query", "CollectionGroup"}
+_BATCHES = {"WriteBatch"}
+_TRANSACTIONS = {"Transaction"}
+_AGGREGATIONS = {"AggregationQuery"}
+_SNAPSHOTS = {"DocumentSnapshot"}
+_WRAPPED = {_DOCUMENT} | _QUERIES | _BATCHES | _TRANSACTIONS | _AGGREGATIONS | _SNAPSHOTS
+
+_DOCUMENT_WRITES = {"create", "set", "update", "delete"}
+# methods that talk to the database; everything else (collection, document,
+# where, limit, batch ...) only builds objects
+_OPERATIONS = {"get", "stream", "get_all", "list_documents", "add", "commit"} | _DOCUMENT_WRITES
+
+
+class OpStats:
+    """Operation totals of one scope; updates also reach the enclosing scopes."""
+
+    __slots__ = ("reads", "writes", "queries", "streamed", "seconds", "parent")
+
+    def __init__(self, parent: Optional["OpStats"] = None):
+        self.reads = 0
+        self.writes = 0
+        self.queries = 0
+        self.streamed = 0
+        self.seconds = 0.0
+        self.parent = parent
+
+    def add(self, reads: int = 0, writes: int = 0, queries: int = 0, streamed: int = 0, seconds: float = 0.0) -> None:
+        stats = self
+        while stats is not None:
+            stats.reads += reads
+            stats.writes += writes
+            stats.queries += queries
+            stats.streamed += streamed
+            stats.seconds += seconds
+            stats = stats.parent
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "reads": self.reads,
+            "writes": self.writes,
+            "queries": self.queries,
+            "streamed": self.streamed,
+            "ms": round(self.seconds * 1000, 3),
+        }
+
+
+_current: ContextVar[Optional[OpStats]] = ContextVar("firestore_ops", default=None)
+
+
+def current() -> Optional[OpStats]:
+    return _current.get()
+
+
+def _charge(**amounts) -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.add(**amounts)
+
+
+@contextmanager
+def track() -> Iterator[OpStats]:
+    """Charge the operations made inside the block to a new (nested) scope."""
+    stats = OpStats(parent=_current.get())
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def record(stats: OpStats, scope: str, route: str) -> None:
+    """Add a finished scope's totals to the Prometheus counters."""
+    for op in ("reads", "writes", "queries", "streamed"):
+        value = getattr(stats, op)
+        if value:
+            OPS.inc(value, scope=scope, route=route, op=op)
+    OP_SECONDS.inc(stats.seconds, scope=scope, route=route)
+    READS_PER_CALL.observe(stats.reads, scope=scope, route=route)
+
+
+class ReadBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def read_budget(max_reads: int, max_writes: Optional[int] = None, label: str = "block") -> Iterator[OpStats]:
+    """
+    Fail with ReadBudgetExceeded when the block reads (or writes) more
+    documents than allowed. For tests and benchmarks.
+    """
+    with track() as stats:
+        yield stats
+    if stats.reads > max_reads:
+        raise ReadBudgetExceeded(f"{label}: {stats.reads} reads, budget {max_reads}")
+    if max_writes is not None and stats.writes > max_writes:
+        raise ReadBudgetExceeded(f"{label}: {stats.writes} writes, budget {max_writes}")
+
+
+# ------------------------------ wrapping --------------------------------- #
+def _unwrap(value: Any) -> Any:
+    if isinstance(value, _Tracked):
+        return value._target
+    if isinstance(value, (list, tuple)) and any(isinstance(v, _Tracked) for v in value):
+        return type(value)(_unwrap(v) for v in value)
+    return value
+
+
+def _wrap(value: Any) -> Any:
+    name = type(value).__name__
+    if name not in _WRAPPED:
+        if isinstance(value, tuple) and len(value) == 2 and type(value[1]).__name__ == _DOCUMENT:
+            # CollectionReference.add -> (update_time, reference)
+            return value[0], _Tracked(value[1])
+        return value
+    if name in _SNAPSHOTS:
+        return _Snapshot(value)
+    return _Tracked(value)
+
+
+def _stream(results, queries: int, seconds: float = 0.0, span: Optional[str] = None, started_ns: int = 0) -> Iterator[Any]:
+    """Wrap and count the documents of a query result as they are consumed."""
+    n = 0
+    started = time.perf_counter()
+    try:
+        for snapshot in results:
+            seconds += time.perf_counter() - started
+            n += 1
+            yield _wrap(snapshot)
+            started = time.perf_counter()
+        seconds += time.perf_counter() - started
+    finally:
+        _charge(reads=max(n, 1) if queries else n, queries=queries, streamed=n, seconds=seconds)
+        if span is not None:
+            # ends when the caller stops consuming
+            tracing.record(span, started_ns, kind=tracing.CLIENT, documents=n)
+
+
+class _Tracked:
+    """
+    Transparent proxy over a Firestore client object that charges its
+    operations to the current scope and wraps the objects it returns.
+    """
+
+    __slots__ = ("_target", "_kind")
+
+    def __init__(self, target: Any):
+        object.__setattr__(self, "_target", target)
+        object.__setattr__(self, "_kind", type(target).__name__)
+
+    def __getattr__(self, name: str) -> Any:
+        value = getattr(self._target, name)
+        if not callable(value):
+            return _wrap(value)
+        if name in _OPERATIONS:
+            return lambda *args, **kwargs: self._call(name, value, args, kwargs)
+        return lambda *args, **kwargs: _wrap(value(*map(_unwrap, args), **kwargs))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._target, name, value)
+
+    def __eq__(self, other: Any) -> bool:
+        return self._target == _unwrap(other)
+
+    def __hash__(self) -> int:
+        return hash(self._target)
+
+    def __len__(self) -> int:
+        return len(self._target)
+
+    def __bool__(self) -> bool:
+        return bool(self._target) if hasattr(self._target, "__len__") else True
+
+    def __repr__(self) -> str:
+        return repr(self._target)
+
+    def _call(self, name: str, method, args, kwargs) -> Any:
+        args = tuple(_unwrap(a) for a in args)
+        kwargs = {k: _unwrap(v) for k, v in kwargs.items()}
+        kind = self._kind
+        writes = len(self._target) if name == "commit" and kind in _BATCHES else 0
+
+        span = f"firestore {kind}.{name}" if tracing.enabled() else None
+        started_ns = time.time_ns()
+        started = time.perf_counter()
+        result = method(*args, **kwargs)
+        seconds = time.perf_counter() - started
+
+        if name in ("stream", "get", "get_all", "list_documents") and kind != _DOCUMENT \
+                and kind not in _AGGREGATIONS and type(result).__name__ not in _SNAPSHOTS:
+            # get_all and transaction.get(document) fetch documents, not a query
+            single = name == "get_all" or (kind in _TRANSACTIONS and _is_document(args))
+            docs = _stream(result, queries=0 if single else 1, seconds=seconds, span=span, started_ns=started_ns)
+            return list(docs) if isinstance(result, list) else docs
+
+        if span is not None:
+            tracing.record(span, started_ns, kind=tracing.CLIENT)
+        if name == "get":
+            _charge(reads=1, queries=int(kind in _AGGREGATIONS), seconds=seconds)
+        elif name in _DOCUMENT_WRITES and kind in _TRANSACTIONS:
+            # buffered; committed with the transaction
+            _charge(writes=1)
+        elif (name in _DOCUMENT_WRITES and kind == _DOCUMENT) or name == "add":
+            _charge(writes=1, seconds=seconds)
+        elif name == "commit" and kind in _BATCHES:
+            _charge(writes=writes, seconds=seconds)
+        return _wrap(result)
+
+
+def _is_document(args) -> bool:
+    return bool(args) and type(args[0]).__name__ == _DOCUMENT
+
+
+class _Snapshot:
+    """Read-only view of a snapshot whose `reference` stays instrumented."""
+
+    __slots__ = ("_target",)
+
+    def __init__(self, target: Any):
+        self._target = target
+
+    @property
+    def reference(self) -> _Tracked:
+        return _Tracked(self._target.reference)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._target, name)
+
+
+def instrument(client: Any) -> _Tracked:
+    return _Tracked(client)
+
+
+def unwrap(value: Any) -> Any:
+    """The underlying client object (e.g. for isinstance checks)."""
+    return _unwrap(value)
@@ -0,0 +1,445 @@
+"""
+core/storage/documents.py
+-------------------------
+A local implementation of the subset of the Firestore client API the CRUD
+layer uses (collections, documents, sub-collections, where/order_by/limit
+queries, batches and transactions), on top of a pluggable DocumentStore.
+
+Write semantics follow Firestore: SERVER_TIMESTAMP / ArrayUnion /
+ArrayRemove / Increment / DELETE_FIELD are applied, `update` on a missing
+document raises NotFound (as does `delete` given
+`client.write_option(exists=True)`), naive datetimes are stored as UTC.
+"""
+
+import copy
+import secrets
+import string
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from google.api_core.exceptions import AlreadyExists, NotFound
+from google.cloud.firestore_v1 import transforms
+
+_ID_ALPHABET = string.ascii_letters + string.digits
+
+ASCENDING = "ASCENDING"
+DESCENDING = "DESCENDING"
+
+
+def _auto_id() -> str:
+    return "".join(secrets.choice(_ID_ALPHABET) for _ in range(20))
+
+
+class DocumentStore:
+    """
+    Storage primitive: documents keyed by (collection path, document id).
+    `atomic()` must make the enclosed reads and writes one serialisable unit.
+    """
+
+    def get(self, collection: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def put(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def delete(self, collection: str, doc_id: str) -> None:
+        raise NotImplementedError
+
+    def scan(self, collection: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        raise NotImplementedError
+
+    @contextmanager
+    def atomic(self) -> Iterator[None]:
+        raise NotImplementedError
+
+
+# ------------------------------ values ----------------------------------- #
+def _normalise(value: Any) -> Any:
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    if isinstance(value, dict):
+        return {k: _normalise(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_normalise(v) for v in value]
+    return value
+
+
+def _apply_transform(current: Any, value: Any, now: datetime) -> Any:
+    if value is transforms.SERVER_TIMESTAMP:
+        return now
+    if isinstance(value, transforms.ArrayUnion):
+        merged = list(current) if isinstance(current, list) else []
+        merged += [v for v in value.values if v not in merged]
+        return merged
+    if isinstance(value, transforms.ArrayRemove):
+        return [v for v in (current if isinstance(current, list) else []) if v not in value.values]
+    if isinstance(value, transforms.Increment):
+        return (current if isinstance(current, (int, float)) and not isinstance(current, bool) else 0) + value.value
+    if isinstance(value, transforms.Maximum):
+        return value.value if not isinstance(current, (int, float)) else max(current, value.value)
+    if isinstance(value, transforms.Minimum):
+        return value.value if not isinstance(current, (int, float)) else min(current, value.value)
+    if isinstance(value, dict):
+        base = current if isinstance(current, dict) else {}
+        return {k: _apply_transform(base.get(k), v, now) for k, v in value.items()}
+    return _normalise(value)
+
+
+def _merge(target: Dict[str, Any], data: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    out = dict(target)
+    for key, value in data.items():
+        if value is transforms.DELETE_FIELD:
+            out.pop(key, None)
+        elif isinstance(value, dict) and isinstance(out.get(key), dict):
+            out[key] = _merge(out[key], value, now)
+        else:
+            out[key] = _apply_transform(out.get(key), value, now)
+    return out
+
+
+def _apply_update(target: Dict[str, Any], data: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    """`update` semantics: dotted keys address nested fields, values replace."""
+    out = copy.deepcopy(target)
+    for path, value in data.items():
+        parts = path.split(".")
+        node = out
+        for part in parts[:-1]:
+            if not isinstance(node.get(part), dict):
+                node[part] = {}
+            node = node[part]
+        if value is transforms.DELETE_FIELD:
+            node.pop(parts[-1], None)
+        else:
+            node[parts[-1]] = _apply_transform(node.get(parts[-1]), value, now)
+    return out
+
+
+def _field(data: Dict[str, Any], path: str) -> Tuple[bool, Any]:
+    node: Any = data
+    for part in path.split("."):
+        if not isinstance(node, dict) or part not in node:
+            return False, None
+        node = node[part]
+    return True, node
+
+
+# ----------------------------- snapshots --------------------------------- #
+class DocumentSnapshot:
+    def __init__(self, reference: "DocumentReference", data: Optional[Dict[str, Any]]):
+        self.reference = reference
+        self._data = data
+
+    @property
+    def id(self) -> str:
+        return self.reference.id
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field_path: str) -> Any:
+        found, value = _field(self._data or {}, field_path)
+        if not found:
+            raise KeyError(f"'{field_path}' is not contained in the data")
+        return copy.deepcopy(value)
+
+
+# ------------------------------ queries ---------------------------------- #
+def _as_utc(value: Any) -> Any:
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+_OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b and a is not None,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "in": lambda a, b: a in b,
+    "not-in": lambda a, b: a not in b and a is not None,
+    "array_contains": lambda a, b: isinstance(a, list) and b in a,
+    "array_contains_any": lambda a, b: isinstance(a, list) and any(v in a for v in b),
+}
+
+
+def _sort_key(value: Any) -> Tuple[int, Any]:
+    # Firestore's cross-type order: null < bool < number < timestamp < string < others
+    if value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, datetime):
+        return (3, value)
+    if isinstance(value, str):
+        return (4, value)
+    return (5, str(value))
+
+
+class Query:
+    def __init__(self, client: "LocalClient", path: str, filters=(), orders=(), limit_to: Optional[int] = None, offset_by: int = 0):
+        self._client = client
+        self._path = path
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit_to
+        self._offset = offset_by
+
+    def _copy(self, **changes) -> "Query":
+        state = dict(filters=self._filters, orders=self._orders, limit_to=self._limit, offset_by=self._offset)
+        state.update(changes)
+        return Query(self._client, self._path, **state)
+
+    def where(self, field_path: Optional[str] = None, op_string: Optional[str] = None, value: Any = None, *, filter=None) -> "Query":
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        if op_string not in _OPERATORS:
+            raise ValueError(f"Unsupported operator: {op_string}")
+        return self._copy(filters=self._filters + ((field_path, op_string, _as_utc(value)),))
+
+    def order_by(self, field_path: str, direction: str = ASCENDING) -> "Query":
+        return self._copy(orders=self._orders + ((field_path, direction),))
+
+    def limit(self, count: int) -> "Query":
+        return self._copy(limit_to=count)
+
+    def offset(self, num_to_skip: int) -> "Query":
+        return self._copy(offset_by=num_to_skip)
+
+    def _matches(self, data: Dict[str, Any]) -> bool:
+        for field_path, op, value in self._filters:
+            found, current = _field(data, field_path)
+            if not found:
+                return False
+            try:
+                if not _OPERATORS[op](current, value):
+                    return False
+            except TypeError:
+                # Firestore never matches across value types
+                return False
+        return True
+
+    def stream(self, transaction=None) -> Iterator[DocumentSnapshot]:
+        rows = [(doc_id, data) for doc_id, data in self._client._store.scan(self._path) if self._matches(data)]
+
+        for field_path, direction in reversed(self._orders):
+            # documents without the ordered field are excluded, as in Firestore
+            rows = [r for r in rows if _field(r[1], field_path)[0]]
+            rows.sort(key=lambda r: _sort_key(_field(r[1], field_path)[1]), reverse=direction == DESCENDING)
+        if not self._orders:
+            rows.sort(key=lambda r: r[0])
+
+        rows = rows[self._offset:]
+        if self._limit is not None:
+            rows = rows[:self._limit]
+
+        collection = CollectionReference(self._client, self._path)
+        for doc_id, data in rows:
+            yield DocumentSnapshot(collection.document(doc_id), data)
+
+    def get(self, transaction=None) -> List[DocumentSnapshot]:
+        return list(self.stream())
+
+
+class CollectionReference(Query):
+    def __init__(self, client: "LocalClient", path: str):
+        super().__init__(client, path)
+
+    @property
+    def id(self) -> str:
+        return self._path.rsplit("/", 1)[-1]
+
+    def document(self, document_id: Optional[str] = None) -> "DocumentReference":
+        return DocumentReference(self._client, self._path, document_id or _auto_id())
+
+    def add(self, document_data: Dict[str, Any], document_id: Optional[str] = None):
+        ref = self.document(document_id)
+        ref.create(document_data)
+        return datetime.now(timezone.utc), ref
+
+    def list_documents(self) -> List["DocumentReference"]:
+        return [self.document(doc_id) for doc_id, _ in self._client._store.scan(self._path)]
+
+
+class DocumentReference:
+    def __init__(self, client: "LocalClient", collection_path: str, doc_id: str):
+        self._client = client
+        self._collection = collection_path
+        self.id = doc_id
+
+    @property
+    def path(self) -> str:
+        return f"{self._collection}/{self.id}"
+
+    @property
+    def parent(self) -> CollectionReference:
+        return CollectionReference(self._client, self._collection)
+
+    def collection(self, collection_id: str) -> CollectionReference:
+        return CollectionReference(self._client, f"{self.path}/{collection_id}")
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, DocumentReference) and other.path == self.path
+
+    def __hash__(self) -> int:
+        return hash(self.path)
+
+    def get(self, field_paths=None, transaction=None) -> DocumentSnapshot:
+        return DocumentSnapshot(self, self._client._store.get(self._collection, self.id))
+
+    def create(self, document_data: Dict[str, Any]):
+        batch = self._client.batch()
+        batch.create(self, document_data)
+        return batch.commit()[0]
+
+    def set(self, document_data: Dict[str, Any], merge: bool = False):
+        batch = self._client.batch()
+        batch.set(self, document_data, merge=merge)
+        return batch.commit()[0]
+
+    def update(self, field_updates: Dict[str, Any], option=None):
+        batch = self._client.batch()
+        batch.update(self, field_updates)
+        return batch.commit()[0]
+
+    def delete(self, option=None):
+        batch = self._client.batch()
+        batch.delete(self, option=option)
+        return batch.commit()[0]
+
+
+# --------------------------- batches / txns ------------------------------ #
+class ExistsOption:
+    """`client.write_option(exists=...)`: the write fails unless the document does (not) exist."""
+
+    def __init__(self, exists: bool):
+        self.exists = exists
+
+
+class WriteResult:
+    def __init__(self, update_time: datetime):
+        self.update_time = update_time
+
+
+class WriteBatch:
+    def __init__(self, client: "LocalClient"):
+        self._client = client
+        self._writes: List[Tuple[str, DocumentReference, Any, bool]] = []
+
+    def create(self, reference: DocumentReference, document_data: Dict[str, Any]) -> "WriteBatch":
+        self._writes.append(("create", reference, document_data, False))
+        return self
+
+    def set(self, reference: DocumentReference, document_data: Dict[str, Any], merge: bool = False) -> "WriteBatch":
+        self._writes.append(("set", reference, document_data, merge))
+        return self
+
+    def update(self, reference: DocumentReference, field_updates: Dict[str, Any], option=None) -> "WriteBatch":
+        self._writes.append(("update", reference, field_updates, False))
+        return self
+
+    def delete(self, reference: DocumentReference, option: Optional[ExistsOption] = None) -> "WriteBatch":
+        # a delete has no data: the slot carries its precondition
+        self._writes.append(("delete", reference, option, False))
+        return self
+
+    def __len__(self) -> int:
+        return len(self._writes)
+
+    def commit(self, retry=None, timeout=None) -> List[WriteResult]:
+        store = self._client._store
+        now = datetime.now(timezone.utc)
+        with store.atomic():
+            # Stage every write against a local view first: a failing write
+            # (update of a missing doc, create of an existing one) applies nothing
+            staged: Dict[Tuple[str, str], Optional[Dict[str, Any]]] = {}
+
+            def current(ref: DocumentReference) -> Optional[Dict[str, Any]]:
+                key = (ref._collection, ref.id)
+                return staged[key] if key in staged else store.get(*key)
+
+            for kind, ref, data, merge in self._writes:
+                existing = current(ref)
+                key = (ref._collection, ref.id)
+                if kind == "create":
+                    if existing is not None:
+                        raise AlreadyExists(f"Document already exists: {ref.path}")
+                    staged[key] = _merge({}, data, now)
+                elif kind == "set":
+                    staged[key] = _merge(existing or {}, data, now) if merge else _merge({}, data, now)
+                elif kind == "update":
+                    if existing is None:
+                        raise NotFound(f"No document to update: {ref.path}")
+                    staged[key] = _apply_update(existing, data, now)
+                else:
+                    if data is not None and data.exists != (existing is not None):
+                        if data.exists:
+                            raise NotFound(f"No document to delete: {ref.path}")
+                        raise AlreadyExists(f"Document already exists: {ref.path}")
+                    staged[key] = None
+
+            for (collection, doc_id), data in staged.items():
+                if data is None:
+                    store.delete(collection, doc_id)
+                else:
+                    store.put(collection, doc_id, data)
+
+        results = [WriteResult(now) for _ in self._writes]
+        self._writes = []
+        return results
+
+
+class Transaction(WriteBatch):
+    """
+    Reads go straight to the store; run it through `run_transaction`, which
+    holds the store's atomic section for the whole read-modify-write.
+    """
+
+    def get(self, ref_or_query):
+        if isinstance(ref_or_query, DocumentReference):
+            return ref_or_query.get()
+        return ref_or_query.stream()
+
+    def get_all(self, references):
+        return [ref.get() for ref in references]
+
+
+class LocalClient:
+    def __init__(self, store: DocumentStore):
+        self._store = store
+
+    def collection(self, collection_path: str) -> CollectionReference:
+        return CollectionReference(self, collection_path.strip("/"))
+
+    def document(self, document_path: str) -> DocumentReference:
+        collection, doc_id = document_path.strip("/").rsplit("/", 1)
+        return DocumentReference(self, collection, doc_id)
+
+    def batch(self) -> WriteBatch:
+        return WriteBatch(self)
+
+    def transaction(self, **kwargs) -> Transaction:
+        return Transaction(self)
+
+    @staticmethod
+    def write_option(exists: bool) -> ExistsOption:
+        return ExistsOption(exists)
+
+    def get_all(self, references, field_paths=None, transaction=None) -> Iterator[DocumentSnapshot]:
+        for ref in references:
+            yield ref.get()
+
+    def run_transaction(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._store.atomic():
+            transaction = self.transaction()
+            result = fn(transaction, *args, **kwargs)
+            transaction.commit()
+        return result
@@ -0,0 +1,45 @@
+"""
+core/storage/memory.py
+----------------------
+Process-local, in-memory document store (tests, benchmarks, load tests).
+"""
+
+import copy
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from app.core.storage.documents import DocumentStore
+
+
+class MemoryStore(DocumentStore):
+    def __init__(self):
+        self._collections: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._lock = threading.RLock()
+
+    def get(self, collection: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            data = self._collections.get(collection, {}).get(doc_id)
+            return copy.deepcopy(data) if data is not None else None
+
+    def put(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        with self._lock:
+            self._collections.setdefault(collection, {})[doc_id] = copy.deepcopy(data)
+
+    def delete(self, collection: str, doc_id: str) -> None:
+        with self._lock:
+            self._collections.get(collection, {}).pop(doc_id, None)
+
+    def scan(self, collection: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        with self._lock:
+            docs = list(self._collections.get(collection, {}).items())
+        return iter(docs)
+
+    @contextmanager
+    def atomic(self) -> Iterator[None]:
+        with self._lock:
+            yield
+
+    def clear(self) -> None:
+        with self._lock:
+            self._collections.clear()
@@ -0,0 +1,107 @@
+"""
+core/storage/sqlite.py
+----------------------
+Single-file SQLite document store for offline, single-node deployments.
+Documents are JSON with tagged timestamps / geopoints / references; the
+API process and Celery workers can share one database file.
+"""
+
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from google.cloud.firestore import GeoPoint
+
+from app.core.storage.documents import DocumentReference, DocumentStore
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    collection TEXT NOT NULL,
+    id         TEXT NOT NULL,
+    data       TEXT NOT NULL,
+    PRIMARY KEY (collection, id)
+)
+"""
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"__ts__": value.isoformat()}
+    if isinstance(value, GeoPoint):
+        return {"__geo__": [value.latitude, value.longitude]}
+    if isinstance(value, DocumentReference):
+        return {"__ref__": value.path}
+    raise TypeError(f"Cannot store value of type {type(value).__name__}")
+
+
+class SQLiteStore(DocumentStore):
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+        self._lock = threading.RLock()
+        self._depth = 0
+        # set by the client so stored references decode back into live ones
+        self.client = None
+
+    def _decode_hook(self, obj: Dict[str, Any]) -> Any:
+        if len(obj) == 1:
+            if "__ts__" in obj:
+                return datetime.fromisoformat(obj["__ts__"])
+            if "__geo__" in obj:
+                return GeoPoint(*obj["__geo__"])
+            if "__ref__" in obj and self.client is not None:
+                return self.client.document(obj["__ref__"])
+        return obj
+
+    def _loads(self, text: str) -> Dict[str, Any]:
+        return json.loads(text, object_hook=self._decode_hook)
+
+    def get(self, collection: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM documents WHERE collection = ? AND id = ?", (collection, doc_id)
+            ).fetchone()
+        return self._loads(row[0]) if row else None
+
+    def put(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        with self.atomic():
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (collection, id, data) VALUES (?, ?, ?)",
+                (collection, doc_id, json.dumps(data, default=_encode)),
+            )
+
+    def delete(self, collection: str, doc_id: str) -> None:
+        with self.atomic():
+            self._conn.execute("DELETE FROM documents WHERE collection = ? AND id = ?", (collection, doc_id))
+
+    def scan(self, collection: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, data FROM documents WHERE collection = ?", (collection,)
+            ).fetchall()
+        return ((doc_id, self._loads(data)) for doc_id, data in rows)
+
+    @contextmanager
+    def atomic(self) -> Iterator[None]:
+        # Thread-level lock plus BEGIN IMMEDIATE, which also serialises
+        # writers in other processes sharing the file
+        with self._lock:
+            outermost = self._depth == 0
+            if outermost:
+                self._conn.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield
+            except BaseException:
+                self._depth -= 1
+                if outermost:
+                    self._conn.execute("ROLLBACK")
+                raise
+            self._depth -= 1
+            if outermost:
+                self._conn.execute("COMMIT")
@@ -0,0 +1,267 @@
+"""
+core/tracing.py
+---------------
+Minimal distributed tracing with the OpenTelemetry data model.
+
+Spans nest through a context variable and cross process boundaries as W3C
+`traceparent` headers: HTTP request -> Celery message -> Manager run ->
+agent nodes -> LLM calls / Firestore ops / geocoding / RAG, all in one
+trace. Finished spans are batched by a background thread and exported as
+OTLP/HTTP JSON to OTEL_EXPORTER_OTLP_ENDPOINT (e.g. http://localhost:4318
+for a local collector / Jaeger). Without an endpoint, tracing is off and
+`span()` costs one context-variable lookup.
+
+    with tracing.span("geocode.reverse", lat=lat, lng=lng) as s:
+        ...
+        s.set(address=address)
+"""
+
+import atexit
+import os
+import queue
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+
+from app.utils.logger import get_logger
+logger = get_logger(__name__)
+
+ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "").rstrip("/")
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "resq-backend")
+# finished spans held for export; beyond this they are dropped, not blocked on
+MAX_QUEUE = int(os.getenv("TRACING_MAX_QUEUE", "10000"))
+BATCH_SIZE = 512
+EXPORT_INTERVAL_S = 2.0
+
+HEADER = "traceparent"
+
+# OTLP span kinds
+INTERNAL, SERVER, CLIENT, PRODUCER, CONSUMER = 1, 2, 3, 4, 5
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], kind: int, attributes: Dict[str, Any]):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def update_name(self, name: str) -> None:
+        self.name = name
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+
+class _NoopSpan:
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def update_name(self, name: str) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+# the active span, or a remote parent (trace id, span id) taken from a traceparent
+_current: ContextVar[Optional[Any]] = ContextVar("trace_span", default=None)
+
+
+def enabled() -> bool:
+    return bool(ENDPOINT)
+
+
+def current_trace_id() -> Optional[str]:
+    parent = _current.get()
+    if parent is None:
+        return None
+    return parent.trace_id if isinstance(parent, Span) else parent[0]
+
+
+def _parent() -> tuple:
+    parent = _current.get()
+    if isinstance(parent, Span):
+        return parent.trace_id, parent.span_id
+    if parent is not None:
+        return parent
+    return secrets.token_hex(16), None
+
+
+@contextmanager
+def span(name: str, kind: int = INTERNAL, **attributes: Any) -> Iterator[Any]:
+    """A child of the current span (or the root of a new trace)."""
+    if not ENDPOINT:
+        yield _NOOP
+        return
+    trace_id, parent_id = _parent()
+    s = Span(name, trace_id, parent_id, kind, attributes)
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        s.end_ns = time.time_ns()
+        _exporter.submit(s)
+
+
+def record(name: str, start_ns: int, end_ns: Optional[int] = None, kind: int = INTERNAL, **attributes: Any) -> None:
+    """A finished child of the current span, for work timed after the fact (e.g. a consumed stream)."""
+    if not ENDPOINT:
+        return
+    trace_id, parent_id = _parent()
+    s = Span(name, trace_id, parent_id, kind, attributes)
+    s.start_ns, s.end_ns = start_ns, end_ns or time.time_ns()
+    _exporter.submit(s)
+
+
+# ----------------------------- propagation ------------------------------- #
+def inject(headers: Dict[str, Any]) -> Dict[str, Any]:
+    """Add the current span's traceparent to outgoing headers."""
+    parent = _current.get()
+    if isinstance(parent, Span):
+        headers[HEADER] = parent.traceparent
+    elif parent is not None:
+        headers[HEADER] = f"00-{parent[0]}-{parent[1]}-01"
+    return headers
+
+
+def _parse(traceparent: Optional[str]) -> Optional[tuple]:
+    parts = (traceparent or "").strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2]
+
+
+@contextmanager
+def remote_parent(traceparent: Optional[str]) -> Iterator[None]:
+    """Continue the trace of an incoming traceparent (ignored when absent or malformed)."""
+    parent = _parse(traceparent)
+    if parent is None or not ENDPOINT:
+        yield
+        return
+    token = _current.set(parent)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+# ------------------------------- export ---------------------------------- #
+def _value(v: Any) -> Dict[str, Any]:
+    if isinstance(v, bool):
+        return {"boolValue": v}
+    if isinstance(v, int):
+        return {"intValue": str(v)}
+    if isinstance(v, float):
+        return {"doubleValue": v}
+    return {"stringValue": str(v)}
+
+
+def _otlp(spans: List[Span]) -> Dict[str, Any]:
+    return {"resourceSpans": [{
+        "resource": {"attributes": [
+            {"key": "service.name", "value": {"stringValue": SERVICE_NAME}},
+            {"key": "process.pid", "value": {"intValue": str(os.getpid())}},
+        ]},
+        "scopeSpans": [{
+            "scope": {"name": "app.core.tracing"},
+            "spans": [{
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                **({"parentSpanId": s.parent_id} if s.parent_id else {}),
+                "name": s.name,
+                "kind": s.kind,
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns),
+                "attributes": [{"key": k, "value": _value(v)} for k, v in s.attributes.items() if v is not None],
+                "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+            } for s in spans],
+        }],
+    }]}
+
+
+class _Exporter:
+    """Batches finished spans and posts them from a daemon thread."""
+
+    def __init__(self):
+        self._queue: "queue.Queue[Span]" = queue.Queue(MAX_QUEUE)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self.dropped = 0
+
+    def submit(self, s: Span) -> None:
+        if self._thread is None or self._pid != os.getpid():
+            self._start()
+        try:
+            self._queue.put_nowait(s)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            # (re)started after a fork: the parent's thread did not come along
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+            self._thread.start()
+
+    def _drain(self, block: bool) -> List[Span]:
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=EXPORT_INTERVAL_S) if block else self._queue.get_nowait())
+            while len(batch) < BATCH_SIZE:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _post(self, client: httpx.Client, batch: List[Span]) -> None:
+        try:
+            client.post(f"{ENDPOINT}/v1/traces", json=_otlp(batch)).raise_for_status()
+        except Exception as e:
+            logger.warning("Could not export %s spans: %s", len(batch), e)
+
+    def _run(self) -> None:
+        with httpx.Client(timeout=5) as client:
+            while True:
+                batch = self._drain(block=True)
+                if batch:
+                    self._post(client, batch)
+
+    def flush(self) -> None:
+        if not ENDPOINT or self._queue.empty():
+            return
+        with httpx.Client(timeout=5) as client:
+            while True:
+                batch = self._drain(block=False)
+                if not batch:
+                    break
+                self._post(client, batch)
+
+
+_exporter = _Exporter()
+atexit.register(_exporter.flush)
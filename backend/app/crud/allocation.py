@@ -0,0 +1,106 @@
+# app/crud/allocation.py
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from google.cloud.firestore import DocumentReference
+from app.core import http_cache
+from app.core.firebase import get_db
+from app.core.storage import run_transaction
+from app.schemas.allocation import Allocation, AllocationCreate, AllocationStatus
+
+COLLECTION = "task_allocations"
+
+
+class AllocationConflict(ValueError):
+    """The allocation was already accepted or rejected."""
+
+
+# in-progress status of a decision -> its final status
+_SETTLES_TO = {
+    AllocationStatus.ACCEPTING: AllocationStatus.ACCEPTED,
+    AllocationStatus.REJECTING: AllocationStatus.REJECTED,
+}
+
+
+def _ref(allocation_id: Optional[str] = None) -> DocumentReference:
+    coll = get_db().collection(COLLECTION)
+    return coll.document(allocation_id) if allocation_id else coll.document()
+
+
+def new_id() -> str:
+    """An ID for an allocation about to be proposed (nothing is written)."""
+    return _ref().id
+
+
+def create(allocation_id: str, obj_in: AllocationCreate) -> Allocation:
+    """Store a proposed allocation under an ID taken from new_id()."""
+    data = obj_in.model_dump(mode="json")
+    data.update({
+        "status": AllocationStatus.PROPOSED.value,
+        "created_at": datetime.now(timezone.utc),
+    })
+    _ref(allocation_id).set(data)
+    http_cache.touch(COLLECTION)
+    return Allocation(allocation_id=allocation_id, **data)
+
+
+def get(allocation_id: str) -> Optional[Allocation]:
+    snap = _ref(allocation_id).get()
+    if not snap.exists:
+        return None
+    return Allocation(allocation_id=snap.id, **snap.to_dict())
+
+
+def list_by_task(task_id: str, status: AllocationStatus) -> List[Allocation]:
+    """Allocations of one task in the given status."""
+    query = (
+        get_db()
+        .collection(COLLECTION)
+        .where("task_id", "==", task_id)
+        .where("status", "==", status.value)
+    )
+    return [Allocation(allocation_id=s.id, **s.to_dict()) for s in query.stream()]
+
+
+def claim(allocation_id: str, status: AllocationStatus) -> Allocation:
+    """
+    Move a proposed allocation to the in-progress `status` (ACCEPTING or
+    REJECTING) in one transaction; record_outcome settles it once its holds
+    are dealt with. Claiming an allocation already in `status` again is
+    allowed, so a decision interrupted halfway can be retried. ValueError
+    if there is no such allocation, AllocationConflict if it was settled or
+    is being settled the other way.
+    """
+    ref = _ref(allocation_id)
+
+    def settle(transaction) -> Dict[str, Any]:
+        snap = ref.get(transaction=transaction)
+        if not snap.exists:
+            raise ValueError("Allocation not found")
+        data = snap.to_dict()
+        if data["status"] == status.value:
+            return data
+        if data["status"] != AllocationStatus.PROPOSED.value:
+            raise AllocationConflict(f"Allocation was already {data['status']}")
+        updates = {"status": status.value}
+        transaction.update(ref, updates)
+        return {**data, **updates}
+
+    data = run_transaction(get_db(), settle)
+    http_cache.touch(COLLECTION)
+    return Allocation(allocation_id=allocation_id, **data)
+
+
+def record_outcome(allocation: Allocation) -> Allocation:
+    """
+    Settle a claimed allocation: write which of its holds were actually
+    kept, together with its final status.
+    """
+    allocation.status = _SETTLES_TO[allocation.status]
+    allocation.settled_at = datetime.now(timezone.utc)
+    data = allocation.model_dump(mode="json", include={"resources", "volunteers", "status"})
+    data["settled_at"] = allocation.settled_at
+    _ref(allocation.allocation_id).update(data)
+    http_cache.touch(COLLECTION)
+    return allocation
@@ -4,12 +4,12 @@ from firebase_admin import firestore
 from datetime import timezone
 
 from app.core.firebase import get_db
+from app.core import http_cache
 from app.schemas.chat import ChatMessageResponse
 
-db = get_db()
 
 def _chat_id_for_disaster(disaster_id: str) -> str:
-    d = db.collection("disasters").document(disaster_id).get()
+    d = get_db().collection("disasters").document(disaster_id).get()
     if not d.exists:
         raise ValueError("Disaster not found")
     return d.to_dict()["chat_session_id"]
@@ -18,7 +18,7 @@ def _chat_id_for_disaster(disaster_id: str) -> str:
 def list_messages(disaster_id: str, limit: int = 50) -> List[ChatMessageResponse]:
     chat_id = _chat_id_for_disaster(disaster_id)
     q = (
-        db.collection("chatSessions")
+        get_db().collection("chatSessions")
           .document(chat_id)
           .collection("messages")
           .order_by("created_at", direction=firestore.Query.DESCENDING)
@@ -38,7 +38,7 @@ def list_messages(disaster_id: str, limit: int = 50) -> List[ChatMessageResponse
 def send_message(disaster_id: str, uid: str, text: str) -> None:
     chat_id = _chat_id_for_disaster(disaster_id)
     (
-        db.collection("chatSessions")
+        get_db().collection("chatSessions")
           .document(chat_id)
           .collection("messages")
           .add(
@@ -49,3 +49,4 @@ def send_message(disaster_id: str, uid: str, text: str) -> None:
               }
           )
     )
+    http_cache.touch("chatSessions")
@@ -1,22 +1,23 @@
 # app/crud/disaster.py
 from typing import List, Optional
 from firebase_admin import firestore
+from google.api_core.exceptions import NotFound
 from datetime import datetime, timezone
 
 from app.core.firebase import get_db
+from app.core import cache, http_cache
 from app.schemas.disaster import DisasterCreate, DisasterResponse
 
 from app.utils.logger import get_logger
 logger = get_logger(__name__)
 
-db = get_db()
-
 
 def create_disaster(
     payload: DisasterCreate,
     admin_uid: str = "",
     is_agent_suggestion: bool = False,
 ) -> DisasterResponse:
+    db = get_db()
     batch = db.batch()
     disaster_ref = db.collection("disasters").document()
     chat_ref = db.collection("chatSessions").document()
@@ -25,7 +26,7 @@ def create_disaster(
     batch.set(
         disaster_ref,
         {
-            **payload.dict(),
+            **payload.model_dump(),
             "created_at": now,
             "created_by": admin_uid,
             "chat_session_id": chat_ref.id,
@@ -41,18 +42,19 @@ def create_disaster(
         },
     )
     batch.commit()
+    http_cache.touch("disasters", "chatSessions")
 
     return DisasterResponse(
         id=disaster_ref.id,
         chat_session_id=chat_ref.id,
         created_at=datetime.now(timezone.utc),
         created_by=admin_uid,
-        **payload.dict(),
+        **payload.model_dump(),
     )
 
 
 def list_disasters() -> List[DisasterResponse]:
-    docs = db.collection("disasters").stream()
+    docs = get_db().collection("disasters").stream()
     results = []
     for d in docs:
         data = d.to_dict()
@@ -68,7 +70,7 @@ def list_agent_suggested_disasters() -> List[DisasterResponse]:
     """
     Return only those Disaster documents where is_agent_suggestion == True.
     """
-    docs = db.collection("disasters").stream()
+    docs = get_db().collection("disasters").stream()
     results: List[DisasterResponse] = []
 
     for d in docs:
@@ -80,55 +82,56 @@ def list_agent_suggested_disasters() -> List[DisasterResponse]:
 
 
 def get_disaster(disaster_id: str) -> Optional[DisasterResponse]:
-    doc_ref = db.collection("disasters").document(disaster_id)
-    snap = doc_ref.get()
+    return cache.read_through(DisasterResponse, "disasters", disaster_id, lambda: _load_disaster(disaster_id))
+
+
+def _load_disaster(disaster_id: str) -> Optional[DisasterResponse]:
+    # participants are not part of DisasterResponse: no need to stream the sub-collection
+    snap = get_db().collection("disasters").document(disaster_id).get()
     if not snap.exists:
         return None
-
-    data = snap.to_dict() or {}
-    # load participants sub-collection
-    parts = doc_ref.collection("participants").stream()
-    participants = [{"uid": p.id, **(p.to_dict() or {})} for p in parts]
-    data["participants"] = participants
-    return DisasterResponse(id=snap.id, **data)
+    return DisasterResponse(id=snap.id, **(snap.to_dict() or {}))
 
 
 def join_disaster(disaster_id: str, uid: str, role: str) -> Optional[DisasterResponse]:
+    """
+    One atomic batch: the `update` fails on a missing disaster (None is
+    returned) and then nothing is written. Participants are not part of
+    DisasterResponse, so the cached disaster is still current.
+    """
+    db = get_db()
     doc_ref = db.collection("disasters").document(disaster_id)
-    snap = doc_ref.get()
-    if not snap.exists:
-        return None
-
-    # 1) add/update the participant sub-doc
-    doc_ref.collection("participants") \
-           .document(uid) \
-           .set(
-               {"role": role, "joined_at": firestore.SERVER_TIMESTAMP},
-               merge=True
+    batch = db.batch()
+    # 1) array-union the UID into the root `participants` field
+    batch.update(doc_ref, {"participants": firestore.ArrayUnion([uid])})
+    # 2) add/update the participant sub-doc
+    batch.set(
+        doc_ref.collection("participants").document(uid),
+        {"role": role, "joined_at": firestore.SERVER_TIMESTAMP},
+        merge=True,
     )
-
-    # 2) also array-union the UID into the root `participants` field
-    doc_ref.update({
-        "participants": firestore.ArrayUnion([uid])
-    })
-
-    # return the updated disaster, including full participants list
+    try:
+        batch.commit()
+    except NotFound:
+        return None
+    http_cache.touch("disasters")
     return get_disaster(disaster_id)
 
 
 def leave_disaster(disaster_id: str, uid: str) -> Optional[DisasterResponse]:
+    """One atomic batch, as join_disaster."""
+    db = get_db()
     doc_ref = db.collection("disasters").document(disaster_id)
-    if not doc_ref.get().exists:
-        return None
-
-    # remove from sub-collection
-    doc_ref.collection("participants").document(uid).delete()
-
+    batch = db.batch()
     # remove from root array
-    doc_ref.update({
-        "participants": firestore.ArrayRemove([uid])
-    })
-
+    batch.update(doc_ref, {"participants": firestore.ArrayRemove([uid])})
+    # remove from sub-collection
+    batch.delete(doc_ref.collection("participants").document(uid))
+    try:
+        batch.commit()
+    except NotFound:
+        return None
+    http_cache.touch("disasters")
     return get_disaster(disaster_id)
 
 
@@ -136,14 +139,15 @@ def delete_disaster(disaster_id: str) -> None:
     """
     Permanently remove the disaster document and its associated chat session.
     """
-    doc_ref = db.collection("disasters").document(disaster_id)
-    doc = doc_ref.get()
-    if doc.exists:
-        data = doc.to_dict() or {}
-        chat_id = data.get("chat_session_id")
-        if chat_id:
-            db.collection("chatSessions").document(chat_id).delete()
-    doc_ref.delete()
+    db = get_db()
+    disaster = get_disaster(disaster_id)  # cached: for its chat session id
+    batch = db.batch()
+    if disaster is not None and disaster.chat_session_id:
+        batch.delete(db.collection("chatSessions").document(disaster.chat_session_id))
+    batch.delete(db.collection("disasters").document(disaster_id))
+    batch.commit()
+    cache.invalidate("disasters", disaster_id)
+    http_cache.touch("disasters", "chatSessions")
 
 
 def has_joined(disaster_id: str, uid: str) -> Optional[bool]:
@@ -153,7 +157,7 @@ def has_joined(disaster_id: str, uid: str) -> Optional[bool]:
       - False if the disaster exists but the user hasn’t joined
       - None  if the disaster does not exist at all
     """
-    doc_ref = db.collection("disasters").document(disaster_id)
+    doc_ref = get_db().collection("disasters").document(disaster_id)
     snap = doc_ref.get()
     if not snap.exists:
         return None
@@ -168,15 +172,15 @@ def get_all_volunteers_by_disaster(disaster_id: str) -> Optional[List[dict]]:
     each with a non-null 'display_name' (falling back to UID).
     - Returns None if the disaster does not exist.
     """
-    logger.debug(f"Checking if disaster '{disaster_id}' exists.")
-    doc_ref = db.collection("disasters").document(disaster_id)
+    logger.debug("Checking if disaster '%s' exists.", disaster_id)
+    doc_ref = get_db().collection("disasters").document(disaster_id)
     if not doc_ref.get().exists:
-        logger.debug(f"Disaster '{disaster_id}' does not exist.")
+        logger.debug("Disaster '%s' does not exist.", disaster_id)
         return None
 
     volunteers: List[dict] = []
     logger.debug(
-        f"Fetching participants with role='volunteer' for disaster '{disaster_id}'.")
+        "Fetching participants with role='volunteer' for disaster '%s'.", disaster_id)
 
     for part_snap in (
         doc_ref.collection("participants")
@@ -185,24 +189,24 @@ def get_all_volunteers_by_disaster(disaster_id: str) -> Optional[List[dict]]:
     ):
         uid = part_snap.id
         pdata = part_snap.to_dict() or {}
-        logger.debug(f"Processing participant UID: {uid}")
+        logger.debug("Processing participant UID: %s", uid)
 
-        user_snap = db.collection("users").document(uid).get()
+        user_snap = get_db().collection("users").document(uid).get()
         if user_snap.exists:
             display_name = user_snap.get("display_name") or uid
             location = user_snap.get("location")
             logger.debug(
-                f"************location of {uid} is {location} **************")
+                "************location of %s is %s **************", uid, location)
             if location:
                 location_lat = location.get('lat')
                 location_lng = location.get('lng')
 
             logger.debug(
-                f"Found user document for UID: {uid}, display_name: {display_name}")
+                "Found user document for UID: %s, display_name: %s", uid, display_name)
         else:
             display_name = uid
             logger.debug(
-                f"No user document found for UID: {uid}. Using UID as display_name.")
+                "No user document found for UID: %s. Using UID as display_name.", uid)
 
         volunteers.append({
             "uid": uid,
@@ -212,10 +216,10 @@ def get_all_volunteers_by_disaster(disaster_id: str) -> Optional[List[dict]]:
             **pdata
         })
         logger.debug(
-            f"Volunteer record added: UID: {uid}, Display Name: {display_name}")
+            "Volunteer record added: UID: %s, Display Name: %s", uid, display_name)
 
-    logger.debug(f"Total volunteers found: {len(volunteers)}")
-    logger.debug(f"Volunteers found: {volunteers}")
+    logger.debug("Total volunteers found: %s", len(volunteers))
+    logger.debug("Volunteers found: %s", volunteers)
     return volunteers
 
 
@@ -224,7 +228,7 @@ def get_all_volunteer_ids_by_disaster(disaster_id: str) -> Optional[List[str]]:
     Return list of UIDs for volunteers (role='volunteer') in a disaster.
     - Returns None if the disaster does not exist.
     """
-    doc_ref = db.collection("disasters").document(disaster_id)
+    doc_ref = get_db().collection("disasters").document(disaster_id)
     snap = doc_ref.get()
     if not snap.exists:
         return None
@@ -246,10 +250,10 @@ def get_disaster_locations() -> List[dict]:
 
     If there are no disasters, returns an empty list.
     """
-    docs = db.collection("disasters").stream()
+    docs = get_db().collection("disasters").stream()
     locations_list: List[dict] = []
     for d in docs:
-        print(f"[DEBUG] Processing disaster: {d}")
+        logger.debug("Processing disaster %s", d.id)
         data = d.to_dict() or {}
         locations_list.append({
             "id": d.id,
@@ -264,15 +268,14 @@ def approve_disaster(disaster_id: str) -> Optional[DisasterResponse]:
     Mark an agent-suggested Disaster as approved by setting is_agent_suggestion=False.
     Returns the updated DisasterResponse, or None if not found.
     """
-    doc_ref = db.collection("disasters").document(disaster_id)
-    snapshot = doc_ref.get()
-    if not snapshot.exists:
+    # Update the flag; fails on a missing disaster
+    try:
+        get_db().collection("disasters").document(disaster_id).update({"is_agent_suggestion": False})
+    except NotFound:
         return None
-
-    # Update the flag
-    doc_ref.update({"is_agent_suggestion": False})
-    updated = doc_ref.get().to_dict()
-    return DisasterResponse(id=disaster_id, **updated)
+    # the flag is not part of DisasterResponse: the cached disaster is the updated one
+    http_cache.touch("disasters")
+    return get_disaster(disaster_id)
 
 
 def discard_disaster(disaster_id: str) -> bool:
@@ -280,10 +283,11 @@ def discard_disaster(disaster_id: str) -> bool:
     Discard (delete) an agent-suggested Disaster.
     Returns True if deletion succeeded, False if document did not exist.
     """
-    doc_ref = db.collection("disasters").document(disaster_id)
-    snapshot = doc_ref.get()
-    if not snapshot.exists:
+    db = get_db()
+    try:
+        db.collection("disasters").document(disaster_id).delete(option=db.write_option(exists=True))
+    except NotFound:
         return False
-
-    doc_ref.delete()
+    cache.invalidate("disasters", disaster_id)
+    http_cache.touch("disasters")
     return True
\ No newline at end of file
@@ -3,38 +3,38 @@ from datetime import datetime, timezone
 from firebase_admin import firestore
 
 from app.core.firebase import get_db
+from app.core import http_cache
 from app.schemas.observation import ObservationCreate, ObservationResponse
 
-db = get_db()
-
 
 def create_observation(
     payload: ObservationCreate,
     user_uid: str
 ) -> ObservationResponse:
-    ref = db.collection("observations").document()
+    ref = get_db().collection("observations").document()
     now = firestore.SERVER_TIMESTAMP
 
     # write main record
     ref.set({
-        **payload.dict(),
+        **payload.model_dump(),
         "created_by": user_uid,
         "created_at": now
     })
+    http_cache.touch("observations")
 
     # return with real timestamps & IDs
     return ObservationResponse(
         id=ref.id,
         created_by=user_uid,
         created_at=datetime.now(timezone.utc),
-        **payload.dict()
+        **payload.model_dump()
     )
 
 
 def list_observations(
     disaster_id: Optional[str] = None
 ) -> List[ObservationResponse]:
-    col = db.collection("observations")
+    col = get_db().collection("observations")
     if disaster_id:
         col = col.where("disaster_id", "==", disaster_id)
 
@@ -45,8 +45,35 @@ def list_observations(
     ]
 
 
+def list_unassigned_observations(since: datetime) -> List[ObservationResponse]:
+    """
+    Observations created since `since` that carry no disaster_id.
+    """
+    docs = get_db().collection("observations").where("created_at", ">=", since).stream()
+    results = []
+    for d in docs:
+        data = d.to_dict() or {}
+        if not data.get("disaster_id"):
+            results.append(ObservationResponse(id=d.id, **data))
+    return results
+
+
+def assign_disaster(obs_ids: List[str], disaster_id: str) -> None:
+    """
+    Link many observations to one disaster with batched writes
+    (Firestore caps a batch at 500 operations).
+    """
+    db = get_db()
+    for start in range(0, len(obs_ids), 500):
+        batch = db.batch()
+        for obs_id in obs_ids[start:start + 500]:
+            batch.update(db.collection("observations").document(obs_id), {"disaster_id": disaster_id})
+        batch.commit()
+    http_cache.touch("observations")
+
+
 def get_observation(obs_id: str) -> Optional[ObservationResponse]:
-    doc = db.collection("observations").document(obs_id).get()
+    doc = get_db().collection("observations").document(obs_id).get()
     if not doc.exists:
         return None
     data = doc.to_dict() or {}
@@ -54,4 +81,5 @@ def get_observation(obs_id: str) -> Optional[ObservationResponse]:
 
 
 def delete_observation(obs_id: str) -> None:
-    db.collection("observations").document(obs_id).delete()
+    get_db().collection("observations").document(obs_id).delete()
+    http_cache.touch("observations")
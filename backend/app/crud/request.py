@@ -1,8 +1,10 @@
 from datetime import datetime, timezone
-from typing import List, Optional
+from typing import Iterator, List, Optional
 
 from google.cloud.firestore import DocumentReference, GeoPoint
+from app.core import cache, http_cache
 from app.core.firebase import get_db
+from app.core.storage import run_transaction
 from app.schemas.common import Location
 from app.schemas.request import RequestCreate, RequestStatusUpdate, Request
 
@@ -27,7 +29,7 @@ def create(created_by: str, payload: RequestCreate) -> Request:
     doc = _ref()
     now = datetime.now(timezone.utc)
 
-    data = payload.dict()
+    data = payload.model_dump()
     data["location"] = _location_to_geopoint(payload.location)
     data.update(
         {
@@ -39,6 +41,7 @@ def create(created_by: str, payload: RequestCreate) -> Request:
         }
     )
     doc.set(data)
+    http_cache.touch(COLLECTION)
     data["location"] = payload.location            # swap back for response
     return Request(id=doc.id, **data)
 
@@ -50,6 +53,10 @@ def _snap_to_model(snap) -> Request:
 
 
 def get(req_id: str) -> Optional[Request]:
+    return cache.read_through(Request, COLLECTION, req_id, lambda: _load(req_id))
+
+
+def _load(req_id: str) -> Optional[Request]:
     snap = _ref(req_id).get()
     return _snap_to_model(snap) if snap.exists else None
 
@@ -63,11 +70,29 @@ def list_by_owner(uid: str) -> List[Request]:
     return [_snap_to_model(s) for s in qs]
 
 
-def patch_status(req_id: str, payload: RequestStatusUpdate) -> Request:
-    data = {k: v for k, v in payload.dict().items() if v is not None}
+def patch_status(req_id: str, payload: RequestStatusUpdate) -> Optional[Request]:
+    """
+    Read and write the request in one transaction (one read, one write);
+    None if there is no such request.
+    """
+    data = {k: v for k, v in payload.model_dump().items() if v is not None}
     data["updated_at"] = datetime.now(timezone.utc)
-    _ref(req_id).update(data)
-    return get(req_id)
+    ref = _ref(req_id)
+
+    def update(transaction):
+        snap = ref.get(transaction=transaction)
+        if not snap.exists:
+            return None
+        transaction.update(ref, data)
+        return snap
+
+    snap = run_transaction(get_db(), update)
+    if snap is None:
+        return None
+    cache.invalidate(COLLECTION, req_id)
+    http_cache.touch(COLLECTION)
+    current = _snap_to_model(snap)
+    return Request.model_validate({**current.model_dump(), **data})
 
 def list_by_disaster(disaster_id: str) -> List[Request]:
     """
@@ -79,4 +104,49 @@ def list_by_disaster(disaster_id: str) -> List[Request]:
         .where("disaster_id", "==", disaster_id)
         .stream()
     )
-    return [_snap_to_model(s) for s in qs]
\ No newline at end of file
+    return [_snap_to_model(s) for s in qs]
+
+
+def iter_requests(disaster_id: Optional[str] = None, created_by: Optional[str] = None) -> Iterator[Request]:
+    """
+    Requests one at a time, straight off the query stream (for exports):
+    nothing is held beyond the document being converted.
+    """
+    query = get_db().collection(COLLECTION)
+    if disaster_id:
+        query = query.where("disaster_id", "==", disaster_id)
+    if created_by:
+        query = query.where("created_by", "==", created_by)
+    for snap in query.stream():
+        yield _snap_to_model(snap)
+
+
+def list_unassigned(since: datetime, until: datetime) -> List[Request]:
+    """
+    Requests created in [since, until] that are not linked to any disaster yet.
+    Filtering on disaster_id happens here to avoid needing a composite index.
+    """
+    qs = (
+        get_db()
+        .collection(COLLECTION)
+        .where("created_at", ">=", since)
+        .where("created_at", "<=", until)
+        .stream()
+    )
+    return [r for r in (_snap_to_model(s) for s in qs) if not r.disaster_id]
+
+
+def assign_disaster(req_ids: List[str], disaster_id: str) -> None:
+    """
+    Link many requests to one disaster with batched writes
+    (Firestore caps a batch at 500 operations).
+    """
+    db = get_db()
+    now = datetime.now(timezone.utc)
+    for start in range(0, len(req_ids), 500):
+        batch = db.batch()
+        for req_id in req_ids[start:start + 500]:
+            batch.update(_ref(req_id), {"disaster_id": disaster_id, "updated_at": now})
+        batch.commit()
+    cache.invalidate(COLLECTION, *req_ids)
+    http_cache.touch(COLLECTION)
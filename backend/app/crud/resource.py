@@ -1,15 +1,27 @@
-from datetime import datetime, timezone
-from typing import List, Optional, Dict, Any
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from google.api_core.exceptions import NotFound
 from google.cloud.firestore import DocumentReference
+from app.core import cache, http_cache
 from app.core.firebase import get_db
+from app.core.storage import run_transaction
 from app.schemas.resource import ResourceCreate, ResourceUpdate, Resource
-from app.schemas.resource import Resource, ResourceType
+from app.schemas.resource import Resource, ResourceType, Reservation, ReservationStatus
 
 from app.utils.logger import get_logger
 logger = get_logger(__name__)
 
 COLLECTION = "resources"
 USER_COLLECTION = "users"
+RESERVATIONS = "resource_reservations"
+
+# how long a reservation holds its units unless committed
+RESERVATION_TTL_S = float(os.getenv("RESERVATION_TTL_S", "300"))
+
+
+class StockConflict(ValueError):
+    """The stock or reservation is not in a state that allows the operation."""
 
 
 def _ref(rid: str | None = None) -> DocumentReference:
@@ -29,14 +41,19 @@ def create(obj_in: ResourceCreate) -> Resource:
     if role_id not in ["admin", "volunteer"]:
         raise ValueError("Invalid role_id in user profile")
 
-    data = obj_in.dict()
+    data = obj_in.model_dump()
     data["role_id"] = role_id
     data["updated_at"] = datetime.now(timezone.utc)
 
     doc.set(data)
+    http_cache.touch(COLLECTION)
     return Resource(resource_id=doc.id, **data)
 
 def get(rid: str) -> Optional[Resource]:
+    return cache.read_through(Resource, COLLECTION, rid, lambda: _load(rid))
+
+
+def _load(rid: str) -> Optional[Resource]:
     snap = _ref(rid).get()
     if not snap.exists:
         return None
@@ -44,22 +61,27 @@ def get(rid: str) -> Optional[Resource]:
     data = snap.to_dict()
 
     if "role_id" not in data or not data["role_id"]:
-        uid = data.get("uid")
-        if not uid:
-            raise ValueError(f"Cannot resolve 'role_id': UID is missing in resource {rid}")
+        data["role_id"] = _owner_role_id(rid, data)
+        _ref(rid).update({"role_id": data["role_id"]})
+        http_cache.touch(COLLECTION)
 
-        user_snap = get_db().collection(USER_COLLECTION).document(uid).get()
-        if not user_snap.exists:
-            raise ValueError(f"User not found for UID: {uid}")
+    return Resource(resource_id=snap.id, **data)
 
-        role_id = user_snap.to_dict().get("role_id")
-        if not role_id:
-            raise ValueError(f"role_id missing in user profile for UID: {uid}")
 
-        _ref(rid).update({"role_id": role_id})
-        data["role_id"] = role_id
+def _owner_role_id(rid: str, data: Dict[str, Any], transaction=None) -> str:
+    """The role_id of the user owning a resource stored without one."""
+    uid = data.get("uid")
+    if not uid:
+        raise ValueError(f"Cannot resolve 'role_id': UID is missing in resource {rid}")
 
-    return Resource(resource_id=snap.id, **data)
+    user_snap = get_db().collection(USER_COLLECTION).document(uid).get(transaction=transaction)
+    if not user_snap.exists:
+        raise ValueError(f"User not found for UID: {uid}")
+
+    role_id = user_snap.to_dict().get("role_id")
+    if not role_id:
+        raise ValueError(f"role_id missing in user profile for UID: {uid}")
+    return role_id
 
 
 def list_all() -> List[Resource]:
@@ -68,7 +90,7 @@ def list_all() -> List[Resource]:
         try:
             resources.append(Resource(resource_id=s.id, **s.to_dict()))
         except Exception as e:
-            logger.warning(f"Skipping invalid resource {s.id}: {e}")
+            logger.warning("Skipping invalid resource %s: %s", s.id, e)
     return resources
 
 def list_available() -> List[Resource]:
@@ -78,39 +100,183 @@ def list_available() -> List[Resource]:
         try:
             resources.append(Resource(resource_id=s.id, **s.to_dict()))
         except Exception as e:
-            logger.warning(f"Skipping invalid available resource {s.id}: {e}")
+            logger.warning("Skipping invalid available resource %s: %s", s.id, e)
     return resources
 
-def patch(rid: str, obj_in: ResourceUpdate) -> Resource:
-    existing = get(rid)
-    if not existing:
-        raise ValueError("Resource not found")
+def iter_resources(available_only: bool = False) -> Iterator[Resource]:
+    """
+    Resources one at a time, straight off the query stream (for exports);
+    invalid documents are skipped as in list_all.
+    """
+    query = get_db().collection(COLLECTION)
+    if available_only:
+        query = query.where("status", "==", "available")
+    for s in query.stream():
+        try:
+            yield Resource(resource_id=s.id, **s.to_dict())
+        except Exception as e:
+            logger.warning("Skipping invalid resource %s: %s", s.id, e)
 
-    data = {}
+def patch(rid: str, obj_in: ResourceUpdate) -> Resource:
+    if obj_in.quantity_used is None:
+        raise ValueError("quantity_used is required to update the resource")
+    return adjust_quantity(rid, -obj_in.quantity_used)
 
-    if obj_in.quantity_used is not None:
-        new_available = existing.quantity_available - obj_in.quantity_used
-        if new_available < 0:
-            raise ValueError("Not enough quantity available to fulfill this request")
-        data["quantity_available"] = new_available
 
+def _stock(snap, delta: int) -> Dict[str, Any]:
+    """The fields that put `delta` more units on the resource read as `snap`."""
+    if not snap.exists:
+        raise ValueError("Resource not found")
+    available = (snap.to_dict() or {}).get("quantity_available", 0) + delta
+    if available < 0:
+        raise StockConflict("Not enough quantity available to fulfill this request")
+    return {
+        "quantity_available": available,
         # Auto-update status based on availability only
-        data["status"] = "not_available" if new_available == 0 else "available"
+        "status": "not_available" if available == 0 else "available",
+        "updated_at": datetime.now(timezone.utc),
+    }
 
-    else:
-        raise ValueError("quantity_used is required to update the resource")
-
-    data["updated_at"] = datetime.now(timezone.utc)
-    _ref(rid).update(data)
 
-    return get(rid)
+def adjust_quantity(rid: str, delta: int) -> Resource:
+    """
+    Add `delta` (negative: consume) to quantity_available and set the status
+    to match, in one transaction: concurrent consumers can never take the
+    stock below zero (StockConflict).
+    """
+    return _update(rid, lambda snap: _stock(snap, delta))
 
 def set_status(rid: str, status: str) -> Resource:
-    _ref(rid).update({
-        "status": status,
-        "updated_at": datetime.now(timezone.utc)
-    })
-    return get(rid)
+    return _update(rid, lambda snap: {"status": status, "updated_at": datetime.now(timezone.utc)})
+
+
+def _update(rid: str, changes: Callable[[Any], Dict[str, Any]]) -> Resource:
+    """
+    Read the resource and write `changes(snap)` to it in one
+    transaction (one read, one write), and return it as written; a missing
+    resource raises ValueError. A resource still stored without a role_id
+    gets it resolved and written in the same transaction.
+    """
+    ref = _ref(rid)
+
+    def update(transaction) -> Dict[str, Any]:
+        snap = ref.get(transaction=transaction)
+        if not snap.exists:
+            raise ValueError("Resource not found")
+        current = snap.to_dict()
+        data = changes(snap)
+        if not current.get("role_id"):
+            data["role_id"] = _owner_role_id(rid, current, transaction)
+        transaction.update(ref, data)
+        return {**current, **data}
+
+    data = run_transaction(get_db(), update)
+    cache.invalidate(COLLECTION, rid)
+    http_cache.touch(COLLECTION)
+    return Resource(resource_id=rid, **data)
+
+# ------------------------------ reservations ------------------------------ #
+# A reservation takes its units off quantity_available right away, so every
+# later reader sees the reduced stock. Committing makes that permanent;
+# releasing (or expire_reservations, once RESERVATION_TTL_S has passed
+# without a commit) puts them back.
+
+def _reservation_ref(reservation_id: str) -> DocumentReference:
+    return get_db().collection(RESERVATIONS).document(reservation_id)
+
+
+def reserve(rid: str, quantity: int, holder: Optional[str] = None, ttl_s: Optional[float] = None) -> Reservation:
+    """Hold `quantity` units of a resource, or raise StockConflict if there are not enough."""
+    if quantity <= 0:
+        raise ValueError("quantity must be positive")
+    now = datetime.now(timezone.utc)
+    doc = get_db().collection(RESERVATIONS).document()
+    data = {
+        "resource_id": rid,
+        "quantity": quantity,
+        "holder": holder,
+        "status": ReservationStatus.HELD.value,
+        "created_at": now,
+        "expires_at": now + timedelta(seconds=ttl_s or RESERVATION_TTL_S),
+    }
+    ref = _ref(rid)
+
+    def hold(transaction) -> None:
+        transaction.update(ref, _stock(ref.get(transaction=transaction), -quantity))
+        transaction.set(doc, data)
+
+    run_transaction(get_db(), hold)
+    cache.invalidate(COLLECTION, rid)
+    http_cache.touch(COLLECTION)
+    return Reservation(reservation_id=doc.id, **data)
+
+
+def _settle(reservation_id: str, commit: bool) -> Dict[str, Any]:
+    """
+    Commit or release a held reservation in one transaction. A reservation
+    past its expiry is released either way; settling it again is a no-op.
+    """
+    ref = _reservation_ref(reservation_id)
+
+    def settle(transaction) -> Dict[str, Any]:
+        snap = ref.get(transaction=transaction)
+        if not snap.exists:
+            raise ValueError("Reservation not found")
+        data = snap.to_dict()
+        if data["status"] != ReservationStatus.HELD.value:
+            return data
+
+        now = datetime.now(timezone.utc)
+        if commit and data["expires_at"] > now:
+            updates = {"status": ReservationStatus.COMMITTED.value, "settled_at": now}
+        else:
+            updates = {"status": ReservationStatus.RELEASED.value, "settled_at": now}
+            resource_ref = _ref(data["resource_id"])
+            resource = resource_ref.get(transaction=transaction)
+            if resource.exists:  # deleted meanwhile: nothing to give back
+                transaction.update(resource_ref, _stock(resource, data["quantity"]))
+        transaction.update(ref, updates)
+        return {**data, **updates}
+
+    data = run_transaction(get_db(), settle)
+    if data["status"] == ReservationStatus.RELEASED.value:
+        cache.invalidate(COLLECTION, data["resource_id"])
+        http_cache.touch(COLLECTION)
+    return data
+
+
+def commit_reservation(reservation_id: str) -> Reservation:
+    """Make a held reservation permanent; StockConflict if it was released or has expired."""
+    data = _settle(reservation_id, commit=True)
+    if data["status"] != ReservationStatus.COMMITTED.value:
+        raise StockConflict("Reservation has expired or was released")
+    return Reservation(reservation_id=reservation_id, **data)
+
+
+def release_reservation(reservation_id: str) -> Reservation:
+    """Give a held reservation's units back; StockConflict if it was already committed."""
+    data = _settle(reservation_id, commit=False)
+    if data["status"] != ReservationStatus.RELEASED.value:
+        raise StockConflict("Reservation was already committed")
+    return Reservation(reservation_id=reservation_id, **data)
+
+
+def expire_reservations() -> int:
+    """Release every held reservation past its expiry (periodic job). Returns how many."""
+    now = datetime.now(timezone.utc)
+    held = get_db().collection(RESERVATIONS).where("status", "==", ReservationStatus.HELD.value)
+    expired = [s.id for s in held.stream() if s.to_dict()["expires_at"] <= now]
+    released = 0
+    for reservation_id in expired:
+        try:
+            release_reservation(reservation_id)
+            released += 1
+        except StockConflict:
+            pass  # committed just before its expiry
+        except Exception as e:
+            logger.warning("Could not release expired reservation %s: %s", reservation_id, e)
+    return released
+
 
 def update_role_id_by_uid(uid: str):
     user_snap = get_db().collection(USER_COLLECTION).document(uid).get()
@@ -123,27 +289,25 @@ def update_role_id_by_uid(uid: str):
         raise ValueError("Invalid role_id in user profile")
 
     query = get_db().collection(COLLECTION).where("uid", "==", uid).where("role_id", "==", None)
+    updated = []
     for doc in query.stream():
         doc.reference.update({
             "role_id": role_id,
             "updated_at": datetime.now(timezone.utc)
         })
+        updated.append(doc.id)
+    cache.invalidate(COLLECTION, *updated)
+    http_cache.touch(COLLECTION)
 
 def delete(rid: str) -> bool:
-    doc_ref = _ref(rid)
-    snap = doc_ref.get()
-    if not snap.exists:
+    try:
+        _ref(rid).delete(option=get_db().write_option(exists=True))
+    except NotFound:
         raise ValueError("Resource not found")
-    doc_ref.delete()
+    cache.invalidate(COLLECTION, rid)
+    http_cache.touch(COLLECTION)
     return True
 
-def set_status(rid: str, status: str) -> Resource:
-    _ref(rid).update({
-        "status": status,
-        "updated_at": datetime.now(timezone.utc)
-    })
-    return get(rid)  
-
 
 def get_resources_by_ids_and_type(donor_ids: List[str], resource_type: str) -> List[Resource]:
     """
@@ -170,8 +334,8 @@ def get_resources_by_ids_and_type(donor_ids: List[str], resource_type: str) -> L
         if res:
             resources.append(res)
         else:
-            logger.warning(f"Skipping resource {doc_snap.id} (could not load)")
-    logger.info(f"Resources fetched: {resources}")
+            logger.warning("Skipping resource %s (could not load)", doc_snap.id)
+    logger.debug("Resources fetched: %s", resources)
     return resources
 
 
@@ -187,6 +351,7 @@ def save_request_resources(request_id: str, entries: List[Dict]) -> None:
           "tasks": entries,
           "created_at": datetime.now(timezone.utc),
       })
+    http_cache.touch("request_resources")
 
 
 def get_request_resources(request_id: str) -> Dict[str, Dict[str, Any]]:
@@ -196,17 +361,17 @@ def get_request_resources(request_id: str) -> Dict[str, Dict[str, Any]]:
       1. Nested under "tasks"
       2. Flat (single-task) schema
     """
-    logger.debug(f"Fetching request_resources/{request_id}")
+    logger.debug("Fetching request_resources/%s", request_id)
     db = get_db()
     doc_ref = db.collection("request_resources").document(request_id)
     snap = doc_ref.get()
 
     if not snap.exists:
-        logger.debug(f"No document found for request_id={request_id}")
+        logger.debug("No document found for request_id=%s", request_id)
         return {}
 
     data = snap.to_dict() or {}
-    logger.debug(f"Document data: {data!r}")
+    logger.debug("Document data: %r", data)
 
     entries = data.get("tasks")
     if entries is None:
@@ -217,26 +382,26 @@ def get_request_resources(request_id: str) -> Dict[str, Dict[str, Any]]:
             "manpower_requirement": data.get("manpower_requirement"),
         }]
     else:
-        logger.debug(f"Found tasks array with {len(entries)} entries")
+        logger.debug("Found tasks array with %s entries", len(entries))
 
     result: Dict[str, Dict[str, Any]] = {}
     for i, entry in enumerate(entries, start=1):
         tid = entry.get("task_id")
-        logger.debug(f"Entry #{i}: task_id={tid!r}")
+        logger.debug("Entry #%s: task_id=%r", i, tid)
         if not tid:
-            logger.debug(f"skipping – no task_id")
+            logger.debug("skipping – no task_id")
             continue
 
         reqs = entry.get("resource_requirements", [])
         mprep = entry.get("manpower_requirement")
-        logger.debug(f"requirements={reqs!r}, manpower={mprep!r}")
+        logger.debug("requirements=%r, manpower=%r", reqs, mprep)
 
         result[tid] = {
             "resource_requirements": reqs,
             "manpower_requirement": mprep,
         }
 
-    logger.debug(f"Returning result with {len(result)} task(s): {list(result.keys())}")
+    logger.debug("Returning result with %s task(s): %s", len(result), list(result.keys()))
     return result
 
 
@@ -1,40 +1,74 @@
 # app/crud/task.py
 
 from datetime import datetime, timezone
-from typing import List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 
 from google.cloud.firestore import DocumentReference
+from app.core import cache, http_cache
 from app.core.firebase import get_db
-from app.schemas.task import TaskCreate, TaskUpdate, TaskStatusUpdate, Task
+from app.core.storage import run_transaction
+from app.schemas.task import TaskCreate, TaskUpdate, TaskStatusEnum, TaskStatusUpdate, Task
+from app.agent.utils.allocation import release_task_holds
 
 COLLECTION = "tasks"
 
+# status of a new task: TaskStatusUpdate's default if it ever gets one
+_STATUS_FIELD = TaskStatusUpdate.model_fields["status"]
+INITIAL_STATUS = "pending" if _STATUS_FIELD.is_required() else _STATUS_FIELD.default
+
+_FINISHED = (TaskStatusEnum.completed, TaskStatusEnum.failed)
+
 
 def _ref(task_id: Optional[str] = None) -> DocumentReference:
     coll = get_db().collection(COLLECTION)
     return coll.document(task_id) if task_id else coll.document()
 
 
-def create_task(obj_in: TaskCreate) -> Task:
-    """
-    Create a new Task document from TaskCreate, set initial status and timestamps.
-    """
-    now = datetime.now(timezone.utc)
-    data = obj_in.dict()
+def _new_task(obj_in: TaskCreate, now: datetime) -> Dict[str, Any]:
+    data = obj_in.model_dump()
     data.update({
-        "status": TaskStatusUpdate.schema()["properties"]["status"]["default"] if "default" in TaskStatusUpdate.schema()["properties"]["status"] else "pending",
+        "status": INITIAL_STATUS,
         "created_at": now,
         "updated_at": now,
     })
+    return data
+
+
+def create_task(obj_in: TaskCreate) -> Task:
+    """
+    Create a new Task document from TaskCreate, set initial status and timestamps.
+    """
+    data = _new_task(obj_in, datetime.now(timezone.utc))
     doc = _ref()
     doc.set(data)
+    http_cache.touch(COLLECTION)
     return Task(id=doc.id, **data)
 
 
+def stage_tasks(batch, objs_in: List[TaskCreate]) -> List[Task]:
+    """
+    Add new Tasks to a WriteBatch under IDs generated up front, and return
+    them as they will be stored. Nothing is written until the caller commits
+    the batch and then calls http_cache.touch(COLLECTION).
+    """
+    now = datetime.now(timezone.utc)
+    tasks = []
+    for obj_in in objs_in:
+        data = _new_task(obj_in, now)
+        doc = _ref()
+        batch.set(doc, data)
+        tasks.append(Task(id=doc.id, **data))
+    return tasks
+
+
 def get_task(task_id: str) -> Optional[Task]:
     """
-    Fetch a single Task by ID.
+    Fetch a single Task by ID (through the shared cache).
     """
+    return cache.read_through(Task, COLLECTION, task_id, lambda: _load_task(task_id))
+
+
+def _load_task(task_id: str) -> Optional[Task]:
     snap = _ref(task_id).get()
     if not snap.exists:
         return None
@@ -46,22 +80,34 @@ def list_tasks() -> List[Task]:
     List all Tasks in the collection, normalizing Firestore keys
     into the Pydantic schema.
     """
-    docs = get_db().collection(COLLECTION).stream()
-    tasks: list[Task] = []
+    return list(iter_tasks())
 
-    for doc in docs:
-        data = doc.to_dict()
 
-        if "disasterId" in data:
-            data["disaster_id"] = data.pop("disasterId")
-        if "assignedTo" in data:
-            data["assigned_to"] = data.pop("assignedTo")
-        if "etaMinutes" in data:
-            data["eta_minutes"] = data.pop("etaMinutes")
+def _normalized(snap) -> Task:
+    data = snap.to_dict()
 
-        tasks.append(Task(**{"id": doc.id, **data}))
+    if "disasterId" in data:
+        data["disaster_id"] = data.pop("disasterId")
+    if "assignedTo" in data:
+        data["assigned_to"] = data.pop("assignedTo")
+    if "etaMinutes" in data:
+        data["eta_minutes"] = data.pop("etaMinutes")
 
-    return tasks
+    return Task(**{"id": snap.id, **data})
+
+
+def iter_tasks(disaster_id: Optional[str] = None, assigned_to: Optional[str] = None) -> Iterator[Task]:
+    """
+    Tasks one at a time, straight off the query stream (for exports),
+    with legacy camelCase keys normalised.
+    """
+    query = get_db().collection(COLLECTION)
+    if disaster_id:
+        query = query.where("disaster_id", "==", disaster_id)
+    if assigned_to:
+        query = query.where("assigned_to", "==", assigned_to)
+    for snap in query.stream():
+        yield _normalized(snap)
 
 
 def list_tasks_by_assignee(uid: str) -> List[Task]:
@@ -76,23 +122,25 @@ def update_task(task_id: str, obj_in: TaskUpdate) -> Optional[Task]:
     """
     Apply partial updates to any updatable Task fields.
     """
-    updates = obj_in.dict(exclude_unset=True)
+    updates = obj_in.model_dump(exclude_unset=True)
     if not updates:
         return get_task(task_id)
 
     updates["updated_at"] = datetime.now(timezone.utc)
-    _ref(task_id).update(updates)
-    return get_task(task_id)
+    return _update(task_id, updates)
 
 
 def update_task_status(task_id: str, obj_in: TaskStatusUpdate) -> Optional[Task]:
     """
-    Update only status and/or ETA of a Task.
+    Update only status and/or ETA of a Task. A task that completed or failed
+    frees the volunteers its accepted allocations held.
     """
-    updates = obj_in.dict(exclude_unset=True)
+    updates = obj_in.model_dump(exclude_unset=True)
     updates["updated_at"] = datetime.now(timezone.utc)
-    _ref(task_id).update(updates)
-    return get_task(task_id)
+    task = _update(task_id, updates)
+    if task is not None and task.status in _FINISHED:
+        release_task_holds(task_id)
+    return task
 
 
 def authorize_task(task_id: str) -> Optional[Task]:
@@ -104,8 +152,29 @@ def authorize_task(task_id: str) -> Optional[Task]:
         "is_authorized": True,
         "updated_at": now,
     }
-    _ref(task_id).update(updates)
-    return get_task(task_id)
+    return _update(task_id, updates)
+
+
+def _update(task_id: str, updates: Dict[str, Any]) -> Optional[Task]:
+    """
+    Read and write the task in one transaction (one read, one write) and
+    return it with `updates` merged in, or None if there is no such task.
+    """
+    ref = _ref(task_id)
+
+    def update(transaction) -> Optional[Dict[str, Any]]:
+        snap = ref.get(transaction=transaction)
+        if not snap.exists:
+            return None
+        transaction.update(ref, updates)
+        return {**snap.to_dict(), **updates}
+
+    data = run_transaction(get_db(), update)
+    if data is None:
+        return None
+    cache.invalidate(COLLECTION, task_id)
+    http_cache.touch(COLLECTION)
+    return Task(id=task_id, **data)
 
 
 def get_tasks_by_disaster(disaster_id: str) -> List[Task]:
@@ -1,13 +1,19 @@
 from typing import List, Optional
 from fastapi import HTTPException, status
+from app.core import cache, http_cache
 from app.core.firebase import users_ref
 from app.schemas.user import User, Coordinates
 from google.cloud import firestore 
+from google.api_core.exceptions import NotFound
 
 from app.utils.logger import get_logger
 logger = get_logger(__name__)
 
 def get_user(uid: str) -> Optional[User]:
+    return cache.read_through(User, "users", uid, lambda: _load_user(uid))
+
+
+def _load_user(uid: str) -> Optional[User]:
     doc = users_ref().document(uid).get()
     if not doc.exists:
         return None
@@ -33,40 +39,45 @@ def create_user(
         },
         merge=True,
     )
+    cache.invalidate("users", uid)
+    http_cache.touch("users")
 
-def update_user_location(uid: str, coords: Coordinates) -> None:
-    user_doc = users_ref().document(uid).get()
-    if not user_doc.exists:
+def _location(coords: Coordinates) -> dict:
+    return {"lat": coords.latitude, "lng": coords.longitude}
+
+
+def _update(uid: str, updates: dict) -> None:
+    # `update` fails on a missing document: no existence read needed
+    try:
+        users_ref().document(uid).update(updates)
+    except NotFound:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    cache.invalidate("users", uid)
+    http_cache.touch("users")
+
 
+def update_user_location(uid: str, coords: Coordinates) -> None:
     # Update the nested location field
-    users_ref().document(uid).update({
-        "location": {
-            "lat": coords.latitude,
-            "lng": coords.longitude
-        }
-    })
+    _update(uid, {"location": _location(coords)})
 
 
 def update_user_availability(uid: str, availability: bool, coords: Optional[Coordinates] = None) -> None:
-    # fetch current user
-    user_doc = users_ref().document(uid).get()
-    if not user_doc.exists:
+    # fetch current user (cached)
+    user = get_user(uid)
+    if user is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    user_data = user_doc.to_dict()
-    if user_data.get("role_id") != "volunteer":
+    if user.role_id != "volunteer":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only volunteers may set availability"
         )
 
-    # perform the update
-    users_ref().document(uid).update({"availability": availability})
-
-    # if coordinates were provided, update location too
+    # perform the update, with the location if coordinates were provided
+    updates = {"availability": availability}
     if coords:
-        update_user_location(uid, coords)
+        updates["location"] = _location(coords)
+    _update(uid, updates)
 
 
 def get_user_availability(uid: str) -> bool:
@@ -92,14 +103,14 @@ def get_user_ids_by_role_id(role_id: str) -> List[str]:
     query = users_ref().where('role_id', '==', role_id).stream()
     user_ids = []
 
-    logger.debug(f"Fetching users with role_id: {role_id}")
+    logger.debug("Fetching users with role_id: %s", role_id)
 
     for doc in query:
         user_data = doc.to_dict()
         uid = user_data.get('uid')
         if uid:
             user_ids.append(uid)
-            logger.debug(f"Found user: {uid} with role_id: {role_id}")
+            logger.debug("Found user: %s with role_id: %s", uid, role_id)
 
-    logger.debug(f"Total users found with role_id '{role_id}': {len(user_ids)}")
+    logger.debug("Total users found with role_id '%s': %s", role_id, len(user_ids))
     return user_ids
\ No newline at end of file
@@ -1,21 +1,30 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 import os
 
-from .api.deps import get_current_user
+from .api.deps import get_current_user, is_admin_token
 
 from .api.requests import router as requests_router
 from .api.task import router as tasks_router
 from .api.resource import router as resources_router
+from .api.allocation import router as allocations_router
 from .api.auth import router as auth_router
 from .api.disaster import router as disaster_router
 from .api.chat import router as chat_router
 from .api.observation import router as observation_router
 from .api.agent import router as agent_router
 from .api.chatbot import router as chatbot_router
+from .api.metrics import router as metrics_router
+from .api.profiles import router as profiles_router
 
 
 from app.schemas.user import User 
+from app.core import http_cache, profiling, tracing
+from app.core.responses import ORJSONResponse
+from app.core.redis import get_redis
+from app.core.storage import accounting
+from app.utils import metrics
 
 # import sys
 
@@ -23,7 +32,13 @@ from app.schemas.user import User
 #     import asyncio
 #     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
+
+
+@app.on_event("startup")
+def _publish_api_metrics():
+    # each API worker adds its own metrics to the shared totals /metrics serves
+    metrics.start_publisher(get_redis())
 
 app.add_middleware(
     CORSMiddleware,
@@ -33,6 +48,59 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def firestore_accounting(request: Request, call_next):
+    # Firestore cost of the request (streamed bodies excluded), by route template
+    with accounting.track() as ops:
+        response = await call_next(request)
+    route = request.scope.get("route")
+    accounting.record(ops, "http", getattr(route, "path", "unmatched"))
+    response.headers["X-Firestore-Reads"] = str(ops.reads)
+    response.headers["X-Firestore-Writes"] = str(ops.writes)
+    response.headers["X-Firestore-Time-Ms"] = f"{ops.seconds * 1000:.1f}"
+    return response
+
+
+@app.middleware("http")
+async def profiling_hook(request: Request, call_next):
+    # admins ask with the X-Profile header; PROFILE_SAMPLE_RATE samples the rest
+    reason = None
+    if profiling.HEADER in request.headers:
+        if await run_in_threadpool(is_admin_token, request.headers.get("Authorization")):
+            reason = "requested"
+    elif profiling.sampled():
+        reason = "sampled"
+    with profiling.capture(reason) as capture:
+        response = await call_next(request)
+    if capture is not None and capture.name:
+        response.headers["X-Profile-Id"] = capture.name
+    return response
+
+
+@app.middleware("http")
+async def http_caching(request: Request, call_next):
+    # ETag / Cache-Control of the conditional routes (see core/http_cache)
+    response = await call_next(request)
+    http_cache.apply(request, response)
+    return response
+
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    # registered last, so outermost: every other middleware runs inside the server span
+    with tracing.remote_parent(request.headers.get(tracing.HEADER)), \
+            tracing.span(request.method, tracing.SERVER, **{"http.method": request.method, "http.target": request.url.path}) as span:
+        response = await call_next(request)
+        route = request.scope.get("route")
+        if route is not None:
+            span.update_name(f"{request.method} {route.path}")
+            span.set(**{"http.route": route.path})
+        span.set(**{"http.status_code": response.status_code})
+    if tracing.enabled():
+        response.headers["X-Trace-Id"] = span.trace_id
+    return response
+
 # Uncomment this ONLY when testing the backend Endpoints 
 
 # if os.getenv("ENV", "development") == "development":
@@ -51,12 +119,15 @@ app.add_middleware(
 app.include_router(requests_router)
 app.include_router(tasks_router)
 app.include_router(resources_router)
+app.include_router(allocations_router)
 app.include_router(auth_router)
 app.include_router(disaster_router)
 app.include_router(chat_router)
 app.include_router(observation_router)
 app.include_router(agent_router)
 app.include_router(chatbot_router)
+app.include_router(metrics_router)
+app.include_router(profiles_router)
 
 
 
@@ -0,0 +1,37 @@
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+from enum import Enum
+
+class AllocationStatus(str, Enum):
+    PROPOSED = "proposed"
+    ACCEPTING = "accepting"  # claimed, holds being committed: accepting again resumes
+    ACCEPTED = "accepted"
+    REJECTING = "rejecting"  # claimed, holds being released: rejecting again resumes
+    REJECTED = "rejected"
+
+class ResourceHold(BaseModel):
+    resource_id: str
+    quantity: int
+    reservation_id: str                # crud.resource reservation holding the units
+    accepted: Optional[bool] = None    # None until settled; False if the reservation had lapsed
+
+class VolunteerHold(BaseModel):
+    uid: str
+    hold_id: Optional[str] = None      # None when the volunteer was proposed without a hold
+    accepted: Optional[bool] = None
+
+class AllocationCreate(BaseModel):
+    disaster_id: str
+    task_id: Optional[str] = None      # crud.task the allocation staffs, if it was saved
+    task: Dict[str, Any] = Field(default_factory=dict, description="The agent task the allocation is for")
+    resources: List[ResourceHold] = Field(default_factory=list)
+    volunteers: List[VolunteerHold] = Field(default_factory=list)
+
+class Allocation(AllocationCreate):
+    allocation_id: str
+    status: AllocationStatus = AllocationStatus.PROPOSED
+    created_at: datetime
+    settled_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
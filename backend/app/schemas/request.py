@@ -1,6 +1,6 @@
 # schemas/requests.py
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
@@ -18,7 +18,7 @@ class Media(BaseModel):
 
 class RequestBase(BaseModel):
     disaster_id: Optional[str] = Field(
-        ..., description="Identifier for the associated disaster event", example="disaster_1234"
+        ..., description="Identifier for the associated disaster event", examples=["disaster_1234"]
     )
     type_of_need: str = Field(..., examples=["food", "medical", "rescue", "other"])
     description: Optional[str] = Field(None, description="Optional detailed description of the request")
@@ -46,5 +46,4 @@ class Request(RequestBase):
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
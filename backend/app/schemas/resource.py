@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional
 from datetime import datetime
 from enum import Enum
@@ -38,8 +38,7 @@ class StatusChangePayload(BaseModel):
 class ResourceUpdate(BaseModel):
     quantity_used: Optional[int] = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class Resource(ResourceBase):
     resource_id: str
@@ -47,6 +46,24 @@ class Resource(ResourceBase):
     role_id: str 
     updated_at: datetime
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
+
+class ReservationStatus(str, Enum):
+    HELD = "held"
+    COMMITTED = "committed"
+    RELEASED = "released"
+
+class ReservationCreate(BaseModel):
+    quantity: int = Field(..., gt=0)
+    holder: Optional[str] = None  # what the units are held for, e.g. a task id
+    ttl_s: Optional[float] = Field(None, gt=0)
+
+class Reservation(BaseModel):
+    reservation_id: str
+    resource_id: str
+    quantity: int
+    holder: Optional[str] = None
+    status: ReservationStatus
+    created_at: datetime
+    expires_at: datetime
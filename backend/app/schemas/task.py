@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, Extra
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional, Literal
 from datetime import datetime
 from enum import Enum
@@ -81,8 +81,7 @@ class TaskInDBBase(TaskBase):
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class Task(TaskInDBBase):
@@ -90,9 +89,7 @@ class Task(TaskInDBBase):
     Complete Task schema for responses (including agent outputs),
     but ignore any extra fields coming from the LLM.
     """
-    class Config:
-        orm_mode = True
-        extra = Extra.ignore
+    model_config = ConfigDict(from_attributes=True, extra="ignore")
 
 class TaskAssignPayload(BaseModel):
     assigned_to: str
\ No newline at end of file
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional
 from datetime import datetime
 
@@ -6,8 +6,7 @@ class Coordinates(BaseModel):
     latitude: float = Field(..., alias="lat")
     longitude: float = Field(..., alias="lng")
 
-    class Config:
-        allow_population_by_field_name = True
+    model_config = ConfigDict(populate_by_name=True)
 
 class Role(BaseModel):
     id: str
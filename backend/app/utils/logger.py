@@ -1,7 +1,55 @@
+import atexit
+import json
 import logging
 import os
-import json
+import queue
+import threading
+import time
 from datetime import datetime
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOGS_DIR = os.path.join(PROJECT_ROOT, 'logs')
+
+# Levels: LOG_LEVEL is the default, LOG_LEVELS overrides it per module
+# prefix, e.g. LOG_LEVELS="app.agent=DEBUG,app.crud=WARNING".
+DEFAULT_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# At most this many DEBUG records per call site per second reach the
+# handlers; the rest are counted and reported on the next one. 0 disables.
+DEBUG_SAMPLE_LIMIT = int(os.getenv("LOG_DEBUG_SAMPLE_LIMIT", "20"))
+# Records the listener writes before flushing the file.
+MAX_BATCH = int(os.getenv("LOG_MAX_BATCH", "512"))
+# Daily files older than this are deleted on rollover. 0 keeps them all.
+RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", "0"))
+
+
+@lru_cache(maxsize=None)
+def _module_path(pathname: str) -> str:
+    return os.path.relpath(pathname, PROJECT_ROOT).replace(os.sep, '/')
+
+
+@lru_cache(maxsize=1)
+def _module_levels() -> Dict[str, int]:
+    levels = {}
+    for item in os.getenv("LOG_LEVELS", "").split(","):
+        prefix, _, level = item.partition("=")
+        if prefix.strip() and level.strip():
+            levels[prefix.strip()] = logging.getLevelName(level.strip().upper())
+    return levels
+
+
+def level_for(name: Optional[str]) -> int:
+    """
+    The configured level for a logger name: the longest LOG_LEVELS prefix
+    that matches it, else LOG_LEVEL.
+    """
+    best, level = -1, logging.getLevelName(DEFAULT_LEVEL)
+    for prefix, prefix_level in _module_levels().items():
+        if (name == prefix or (name or "").startswith(prefix + ".")) and len(prefix) > best:
+            best, level = len(prefix), prefix_level
+    return level
 
 
 class ModulePathFilter(logging.Filter):
@@ -9,20 +57,96 @@ class ModulePathFilter(logging.Filter):
     Custom logging filter to inject the relative module path into the log record.
     """
     def filter(self, record):
-        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        relative_path = os.path.relpath(record.pathname, project_root)
-        record.module_path = relative_path.replace(os.sep, '/')
+        record.module_path = _module_path(record.pathname)
         return True
 
 
+class DebugSampler(logging.Filter):
+    """
+    Caps DEBUG records per call site (file, line) to `limit` per second, so
+    debug logging inside hot loops cannot flood the pipeline. Dropped
+    records are counted onto the next one let through as `suppressed`.
+    Runs before the record's message is formatted.
+    """
+    def __init__(self, limit: int):
+        super().__init__()
+        self.limit = limit
+        self._sites: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.limit <= 0:
+            return True
+        site = (record.pathname, record.lineno)
+        now = int(time.monotonic())
+        with self._lock:
+            window = self._sites.setdefault(site, [now, 0, 0])   # second, emitted, suppressed
+            if window[0] != now:
+                window[0], window[1] = now, 0
+            if window[1] >= self.limit:
+                window[2] += 1
+                return False
+            window[1] += 1
+            if window[2]:
+                record.suppressed, window[2] = window[2], 0
+        return True
+
+
+class LogQueueHandler(QueueHandler):
+    """
+    Queues records for the listener thread. Only the message is rendered
+    here (arguments may be mutated once the call returns); file I/O and
+    JSON encoding happen on the listener.
+    """
+    def prepare(self, record):
+        record = logging.makeLogRecord(record.__dict__)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        record.exc_info = record.exc_text = None
+        return record
+
+
 class JSONFileHandler(logging.FileHandler):
     """
-    Custom file handler that writes logs in JSON format.
+    Custom file handler that writes logs in JSON format to one file per day
+    (<dd_mm_yyyy>_logs.json), switching files when the date changes. It does
+    not flush per record; the listener flushes once per batch.
     """
+    def __init__(self, logs_dir: str, encoding: str = 'utf-8'):
+        self.logs_dir = logs_dir
+        self.log_date = self._date()
+        super().__init__(self._filename(self.log_date), mode='a', encoding=encoding, delay=True)
+
+    @staticmethod
+    def _date(created: Optional[float] = None) -> str:
+        return datetime.fromtimestamp(created or time.time()).strftime('%d_%m_%Y')
+
+    def _filename(self, log_date: str) -> str:
+        return os.path.join(self.logs_dir, f"{log_date}_logs.json")
+
+    def _rollover(self, log_date: str) -> None:
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        self.log_date = log_date
+        self.baseFilename = self._filename(log_date)
+        if RETENTION_DAYS > 0:
+            cutoff = time.time() - RETENTION_DAYS * 86400
+            for name in os.listdir(self.logs_dir):
+                path = os.path.join(self.logs_dir, name)
+                if name.endswith('_logs.json') and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+
     def emit(self, record):
-        log_entry = self.format(record)
-        self.stream.write(log_entry + '\n')
-        self.flush()
+        try:
+            log_date = self._date(record.created)
+            if log_date != self.log_date:
+                self._rollover(log_date)
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + '\n')
+        except Exception:
+            self.handleError(record)
 
 
 class JSONFormatter(logging.Formatter):
@@ -37,46 +161,116 @@ class JSONFormatter(logging.Formatter):
             "message": record.getMessage(),
             "function": record.funcName
         }
+        if getattr(record, 'suppressed', 0):
+            log_record["suppressed"] = record.suppressed
         return json.dumps(log_record)
 
 
-def get_logger(name: str = None) -> logging.Logger:
+class BatchingQueueListener(QueueListener):
     """
-    Get a configured logger with console and daily rotating JSON file handler.
+    Drains whatever has queued up (up to `max_batch` records) on each wake-up,
+    hands every record to the handlers, then flushes them once.
     """
-    logger = logging.getLogger(name)
-    if not logger.handlers:
-        logger.setLevel(logging.DEBUG)
+    def __init__(self, log_queue, *handlers, max_batch: int = MAX_BATCH):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.max_batch = max_batch
+
+    def _monitor(self):
+        while True:
+            batch = [self.dequeue(True)]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.dequeue(False))
+                except queue.Empty:
+                    break
+            stop = False
+            for record in batch:
+                if record is self._sentinel:
+                    stop = True
+                else:
+                    self.handle(record)
+            for handler in self.handlers:
+                try:
+                    handler.flush()
+                except ValueError:
+                    pass  # stream closed under us at shutdown (e.g. captured stdout)
+            if stop:
+                return
+
+
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_queue_handler: Optional[LogQueueHandler] = None
+_console_handler: Optional[logging.StreamHandler] = None
+_listener: Optional[BatchingQueueListener] = None
+_lock = threading.Lock()
+
+
+def _start_pipeline() -> LogQueueHandler:
+    """
+    One queue, handler and listener thread shared by every logger: callers
+    only enqueue, the listener formats and writes.
+    """
+    global _queue_handler, _console_handler, _listener
+    with _lock:
+        if _listener is None:
+            os.makedirs(LOGS_DIR, exist_ok=True)
+
+            # Formatter
+            json_formatter = JSONFormatter(datefmt='%Y-%m-%d %H:%M:%S')
+            module_filter = ModulePathFilter()
 
-        # Create logs directory if it doesn't exist
-        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        logs_dir = os.path.join(project_root, 'logs')
-        os.makedirs(logs_dir, exist_ok=True)
+            # Console handler
+            _console_handler = logging.StreamHandler()
+            _console_handler.setFormatter(json_formatter)
+            _console_handler.addFilter(module_filter)
 
-        # Define the log filename with the date
-        log_date = datetime.now().strftime('%d_%m_%Y')
-        log_filename = os.path.join(logs_dir, f"{log_date}_logs.json")
+            # File handler (JSON, one file per day)
+            file_handler = JSONFileHandler(LOGS_DIR)
+            file_handler.setFormatter(json_formatter)
+            file_handler.addFilter(module_filter)
 
-        # Console handler
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.DEBUG)
+            _listener = BatchingQueueListener(_log_queue, _console_handler, file_handler)
+            _listener.start()
+            atexit.register(_stop_pipeline)
 
-        # File handler (JSON)
-        file_handler = JSONFileHandler(log_filename, mode='a', encoding='utf-8')
-        file_handler.setLevel(logging.DEBUG)
+            _queue_handler = LogQueueHandler(_log_queue)
+            _queue_handler.addFilter(DebugSampler(DEBUG_SAMPLE_LIMIT))
+    return _queue_handler
 
-        # Formatter
-        json_formatter = JSONFormatter(datefmt='%Y-%m-%d %H:%M:%S')
-        console_handler.setFormatter(json_formatter)
-        file_handler.setFormatter(json_formatter)
 
-        # Filter to add module_path
-        module_filter = ModulePathFilter()
-        console_handler.addFilter(module_filter)
-        file_handler.addFilter(module_filter)
+def _stop_pipeline() -> None:
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
 
-        # Add handlers to logger
-        logger.addHandler(console_handler)
-        logger.addHandler(file_handler)
 
-    return logger
\ No newline at end of file
+def _restart_in_child() -> None:
+    # a forked child (e.g. a prefork Celery worker) inherits the queue but not
+    # the listener thread
+    global _lock
+    _lock = threading.Lock()
+    if _listener is not None:
+        _listener._thread = None
+        _listener.start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_in_child)
+
+
+def set_console_level(level: int) -> None:
+    """Raise or lower the console output alone; the file keeps every record."""
+    _start_pipeline()
+    _console_handler.setLevel(level)
+
+
+def get_logger(name: str = None) -> logging.Logger:
+    """
+    Get a logger at its configured level that hands records to the shared
+    background listener (console + daily JSON file).
+    """
+    logger = logging.getLogger(name)
+    if not logger.handlers:
+        logger.setLevel(level_for(name))
+        logger.addHandler(_start_pipeline())
+
+    return logger
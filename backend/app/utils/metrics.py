@@ -0,0 +1,261 @@
+"""
+Minimal in-process metrics (counters and histograms) rendered in the
+Prometheus text format.
+
+Each process records into its own registry and periodically adds what it
+recorded since the last flush to shared Redis hashes (HINCRBYFLOAT), API
+and Celery worker processes alike. The /metrics endpoint serves those
+totals, which keep growing across process restarts as Prometheus expects.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.utils.logger import get_logger
+logger = get_logger(__name__)
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+TOKEN_BUCKETS = (32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+_META_KEY = "metrics:meta"           # name -> JSON kind / help / labelnames / buckets
+_SERIES_PREFIX = "metrics:series:"   # one hash per metric: JSON [labels, slot] -> total
+
+LabelValues = Tuple[str, ...]
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str]):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series: Dict[LabelValues, object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def meta(self) -> dict:
+        return {
+            "kind": self.kind,
+            "help": self.help,
+            "labelnames": list(self.labelnames),
+            "buckets": list(getattr(self, "buckets", [])),
+        }
+
+    def snapshot(self, reset: bool = False) -> dict:
+        """What was recorded (since the last flush); `reset` starts over from zero."""
+        with self._lock:
+            series = [[list(k), v if isinstance(v, float) else list(v)] for k, v in self._series.items()]
+            if reset:
+                self._series = {}
+        return {**self.meta(), "series": series}
+
+    def restore(self, snap: dict) -> None:
+        """Add a snapshot taken with reset=True back (its flush failed)."""
+        with self._lock:
+            for labels, value in snap["series"]:
+                key = tuple(labels)
+                current = self._series.get(key)
+                if current is None:
+                    self._series[key] = value
+                elif isinstance(current, float):
+                    self._series[key] = current + value
+                else:
+                    self._series[key] = [a + b for a, b in zip(current, value)]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0.0) + amount
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str], buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            # [count per bucket..., +Inf count, sum]
+            state = self._series.get(key)
+            if state is None:
+                state = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            else:
+                state[len(self.buckets)] += 1
+            state[-1] += value
+
+
+_registry: Dict[str, _Metric] = {}
+_registry_lock = threading.Lock()
+
+
+def _get_or_create(cls, name: str, *args, **kwargs):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = cls(name, *args, **kwargs)
+        return metric
+
+
+def counter(name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+    return _get_or_create(Counter, name, help, labelnames)
+
+
+def histogram(name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+    return _get_or_create(Histogram, name, help, labelnames, buckets)
+
+
+def snapshot(reset: bool = False) -> Dict[str, dict]:
+    with _registry_lock:
+        metrics = list(_registry.values())
+    return {m.name: m.snapshot(reset) for m in metrics}
+
+
+# ----------------------------- exposition -------------------------------- #
+def _merge(snapshots: Iterable[Dict[str, dict]]) -> Dict[str, dict]:
+    merged: Dict[str, dict] = {}
+    for snap in snapshots:
+        for name, metric in snap.items():
+            target = merged.setdefault(name, {**metric, "series": {}})
+            for labels, value in metric["series"]:
+                key = tuple(labels)
+                if metric["kind"] == "counter":
+                    target["series"][key] = target["series"].get(key, 0.0) + value
+                else:
+                    current = target["series"].get(key)
+                    target["series"][key] = value if current is None else [a + b for a, b in zip(current, value)]
+    return merged
+
+
+def _fmt_labels(names: List[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k, v in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+def render(extra_snapshots: Iterable[Dict[str, dict]] = ()) -> str:
+    """
+    Prometheus text exposition (format 0.0.4) of what this process has not
+    flushed yet plus `extra_snapshots` (the shared totals).
+    """
+    lines = []
+    for name, metric in sorted(_merge([snapshot(), *extra_snapshots]).items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['kind']}")
+        names = metric["labelnames"]
+        for labels, value in sorted(metric["series"].items()):
+            if metric["kind"] == "counter":
+                lines.append(f"{name}{_fmt_labels(names, labels)} {value}")
+                continue
+            cumulative = 0.0
+            for bound, count in zip(metric["buckets"], value):
+                cumulative += count
+                lines.append(f"{name}_bucket{_fmt_labels(names, labels, ('le', str(bound)))} {cumulative}")
+            cumulative += value[len(metric["buckets"])]
+            lines.append(f"{name}_bucket{_fmt_labels(names, labels, ('le', '+Inf'))} {cumulative}")
+            lines.append(f"{name}_sum{_fmt_labels(names, labels)} {value[-1]}")
+            lines.append(f"{name}_count{_fmt_labels(names, labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+# ------------------------ cross-process sharing -------------------------- #
+def flush(redis) -> None:
+    """
+    Add everything recorded since the last flush to the shared totals, in
+    one pipeline. On failure it is kept for the next flush.
+    """
+    with _registry_lock:
+        metrics = list(_registry.values())
+    pending = [(m, m.snapshot(reset=True)) for m in metrics]
+    try:
+        pipe = redis.pipeline(transaction=False)
+        for metric, snap in pending:
+            pipe.hset(_META_KEY, metric.name, json.dumps(metric.meta()))
+            for labels, value in snap["series"]:
+                values = [value] if isinstance(value, float) else value
+                for slot, amount in enumerate(values):
+                    if amount:
+                        pipe.hincrbyfloat(_SERIES_PREFIX + metric.name, json.dumps([labels, slot]), amount)
+        pipe.execute()
+    except Exception:
+        for metric, snap in pending:
+            metric.restore(snap)
+        raise
+
+
+_publisher_pid: Optional[int] = None
+
+
+def start_publisher(redis, interval_s: float = 15) -> None:
+    """
+    Flush this process's registry to Redis every `interval_s` from a daemon
+    thread, and once more at exit. Once per process (forked children start
+    their own).
+    """
+    global _publisher_pid
+    with _registry_lock:
+        if _publisher_pid == os.getpid():
+            return
+        _publisher_pid = os.getpid()
+
+    def publish():
+        try:
+            flush(redis)
+        except Exception as e:
+            logger.warning("Could not publish metrics: %s", e)
+
+    def loop():
+        while True:
+            time.sleep(interval_s)
+            publish()
+
+    threading.Thread(target=loop, name="metrics-publisher", daemon=True).start()
+    atexit.register(publish)
+
+
+def shared_snapshot(redis) -> Dict[str, dict]:
+    """The totals every process has flushed, in snapshot() form."""
+    try:
+        metas = redis.hgetall(_META_KEY)
+        pipe = redis.pipeline(transaction=False)
+        for name in metas:
+            pipe.hgetall(_SERIES_PREFIX + (name.decode() if isinstance(name, bytes) else name))
+        all_series = pipe.execute()
+    except Exception as e:
+        logger.warning("Could not read shared metrics: %s", e)
+        return {}
+
+    shared: Dict[str, dict] = {}
+    for (name, meta), fields in zip(metas.items(), all_series):
+        name = name.decode() if isinstance(name, bytes) else name
+        meta = json.loads(meta)
+        width = len(meta["buckets"]) + 2
+        series: Dict[LabelValues, object] = {}
+        for field, amount in fields.items():
+            labels, slot = json.loads(field)
+            key = tuple(labels)
+            if meta["kind"] == "counter":
+                series[key] = float(amount)
+            else:
+                series.setdefault(key, [0.0] * width)[slot] = float(amount)
+        shared[name] = {**meta, "series": [[list(k), v] for k, v in series.items()]}
+    return shared
@@ -0,0 +1,13 @@
+"""
+Performance benchmarks for the agent pipeline, the API under load, the
+rendering of large list responses and schema validation throughput.
+
+    python -m benchmarks.run --scale small
+    python -m benchmarks.run --scale large --runs 200 --save-baseline
+    python -m benchmarks.surge --timeline benchmarks/timelines/flood.yaml
+    python -m benchmarks.serialization --items 10000
+    python -m benchmarks.validation
+
+Everything runs offline: STORAGE_BACKEND=memory, LLM_PROVIDER=stub, and
+geocoding / RAG / Redis replaced in-process (see benchmarks.harness).
+"""
@@ -0,0 +1,333 @@
+"""
+Synthetic datasets for the benchmarks, grown from the fixtures in
+app/agent/data/*.json and written straight into a (local) Firestore client
+in the shapes app.crud reads back.
+
+Requests come in three kinds, so every branch of disaster assignment is
+exercised: `near` (inside a known disaster, assigned deterministically),
+`ambiguous` (10-20 km out, sent to the LLM) and `new` (far from everything,
+a disaster is created).
+"""
+
+import json
+import math
+import random
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.cloud.firestore import GeoPoint
+from pydantic import BaseModel
+
+from app.agent.schemas.task import ResourceRequirement, Task
+from app.agent.schemas.types import ResourceType, TypeOfNeed, UrgencyLevel
+
+FIXTURES_DIR = Path("app/agent/data")
+
+_BATCH_SIZE = 500           # Firestore's per-batch write limit
+_KM_PER_DEG = 111.0
+
+
+class Scale(BaseModel):
+    disasters: int
+    volunteers: int
+    admins: int
+    resources: int
+    observations: int
+    requests: int
+
+
+SCALES: Dict[str, Scale] = {
+    "small": Scale(disasters=20, volunteers=200, admins=5, resources=1_000, observations=400, requests=25),
+    "medium": Scale(disasters=100, volunteers=2_000, admins=10, resources=10_000, observations=4_000, requests=50),
+    "large": Scale(disasters=1_000, volunteers=10_000, admins=20, resources=50_000, observations=20_000, requests=100),
+}
+
+REQUEST_MIX = {"near": 0.6, "ambiguous": 0.2, "new": 0.2}
+
+
+class Dataset(BaseModel):
+    scale: Scale
+    seed: int
+    disaster_ids: List[str]
+    volunteer_ids: List[str]
+    admin_ids: List[str]
+    # agent workflow payloads, as api/requests.py enqueues them
+    requests: List[Dict[str, Any]]
+    request_kinds: List[str]
+
+
+def load_fixtures(fixtures_dir: Path = FIXTURES_DIR) -> Dict[str, List[dict]]:
+    fixtures = {}
+    for name in ("disasters", "volunteers", "resources", "observations"):
+        with open(fixtures_dir / f"{name}.json", "r") as f:
+            fixtures[name] = json.load(f)
+    return fixtures
+
+
+def _jitter(rng: random.Random, lat: float, lng: float, km: float) -> Tuple[float, float]:
+    lat = lat + rng.gauss(0, km / _KM_PER_DEG)
+    lng = lng + rng.gauss(0, km / _KM_PER_DEG)
+    return max(-89.9, min(89.9, lat)), (lng + 180) % 360 - 180
+
+
+def _offset(rng: random.Random, lat: float, lng: float, min_km: float, max_km: float) -> Tuple[float, float]:
+    distance = rng.uniform(min_km, max_km) / _KM_PER_DEG
+    bearing = rng.uniform(0, 360)
+    dlat = distance * math.cos(math.radians(bearing))
+    dlng = distance * math.sin(math.radians(bearing))
+    return max(-89.9, min(89.9, lat + dlat)), (lng + dlng + 180) % 360 - 180
+
+
+def _zipf_weights(n: int) -> List[float]:
+    # a few large disasters draw most volunteers, as in real surges
+    return [1 / (rank + 1) for rank in range(n)]
+
+
+class _Writer:
+    """Buffers writes into batches of at most 500."""
+
+    def __init__(self, db):
+        self.db = db
+        self.batch = db.batch()
+
+    def set(self, ref, data: Dict[str, Any]) -> None:
+        self.batch.set(ref, data)
+        if len(self.batch) >= _BATCH_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        if len(self.batch):
+            self.batch.commit()
+        self.batch = self.db.batch()
+
+
+def generate(db, scale: Scale, seed: int = 7, now: Optional[datetime] = None) -> Dataset:
+    """
+    Populate `db` with disasters, volunteers (users + disaster participants),
+    admins, resources, observations and open requests at `scale`.
+    """
+    rng = random.Random(seed)
+    now = now or datetime.now(timezone.utc)
+    fixtures = load_fixtures()
+    writer = _Writer(db)
+
+    # ------------------------------ disasters ---------------------------- #
+    disasters = []
+    for i in range(scale.disasters):
+        template = rng.choice(fixtures["disasters"])
+        coords = template["disaster_coordinates"]
+        lat, lng = _jitter(rng, coords["latitude"], coords["longitude"], km=40)
+        ref = db.collection("disasters").document(f"disaster-{i:05d}")
+        disasters.append({
+            "id": ref.id,
+            "ref": ref,
+            "lat": lat,
+            "lng": lng,
+            "type": template["disaster_type"].strip().capitalize(),
+            "summary": template["disaster_summary"],
+            "city": template["disaster_location"].split(",")[0],
+            "participants": [],
+            "created_at": now - timedelta(hours=rng.uniform(1, 24 * 7)),
+        })
+
+    weights = _zipf_weights(len(disasters))
+
+    # ------------------------------ users -------------------------------- #
+    admins = [f"admin-{i:04d}" for i in range(scale.admins)]
+    for uid in admins:
+        writer.set(db.collection("users").document(uid), {
+            "uid": uid,
+            "email": f"{uid}@bench.local",
+            "display_name": uid,
+            "role_id": "admin",
+            "created_at": now,
+        })
+
+    volunteers = []
+    for i in range(scale.volunteers):
+        uid = f"volunteer-{i:06d}"
+        home = rng.choices(disasters, weights=weights)[0]
+        lat, lng = _jitter(rng, home["lat"], home["lng"], km=5)
+        volunteers.append((uid, lat, lng))
+        home["participants"].append(uid)
+        writer.set(db.collection("users").document(uid), {
+            "uid": uid,
+            "email": f"{uid}@bench.local",
+            "display_name": uid,
+            "role_id": "volunteer",
+            "availability": rng.random() < 0.7,
+            "location": {"lat": lat, "lng": lng},
+            "created_at": now,
+        })
+        writer.set(home["ref"].collection("participants").document(uid), {
+            "role": "volunteer",
+            "joined_at": now,
+        })
+
+    for d in disasters:
+        writer.set(d["ref"], {
+            "name": d["type"],
+            "description": d["summary"],
+            "location": {"lat": d["lat"], "lng": d["lng"]},
+            "image_urls": [],
+            "type": None,
+            "severity": None,
+            "affected_count": None,
+            "created_at": d["created_at"],
+            "created_by": rng.choice(admins) if admins else "",
+            "chat_session_id": f"chat-{d['id']}",
+            "participants": d["participants"],
+            "is_agent_suggestion": False,
+        })
+
+    # ------------------------------ resources ---------------------------- #
+    fixture_quantities: Dict[str, List[int]] = {}
+    for r in fixtures["resources"]:
+        fixture_quantities.setdefault(r["resource_type"], []).append(r["quantity"])
+    categories = [t.value for t in ResourceType]
+    # types seen in the fixtures are the common ones
+    category_weights = [3 if c in fixture_quantities else 1 for c in categories]
+
+    for i in range(scale.resources):
+        if volunteers and (not admins or rng.random() < 0.8):
+            uid, lat, lng = rng.choice(volunteers)
+            role_id = "volunteer"
+        else:
+            uid, role_id = rng.choice(admins), "admin"
+            home = rng.choices(disasters, weights=weights)[0]
+            lat, lng = home["lat"], home["lng"]
+        lat, lng = _jitter(rng, lat, lng, km=2)
+
+        category = rng.choices(categories, weights=category_weights)[0]
+        base = rng.choice(fixture_quantities.get(category, [1, 2, 5]))
+        total = max(1, int(base * rng.uniform(0.5, 3)))
+        available = rng.random() < 0.85
+        writer.set(db.collection("resources").document(f"resource-{i:06d}"), {
+            "category": category,
+            "quantity_total": total,
+            "quantity_available": rng.randint(1, total) if available else 0,
+            "location_lat": lat,
+            "location_lng": lng,
+            "status": "available" if available else "not_available",
+            "uid": uid,
+            "role_id": role_id,
+            "updated_at": now,
+        })
+
+    # ---------------------------- observations --------------------------- #
+    for i in range(scale.observations):
+        template = rng.choice(fixtures["observations"])
+        d = rng.choices(disasters, weights=weights)[0]
+        lat, lng = _jitter(rng, d["lat"], d["lng"], km=1)
+        writer.set(db.collection("observations").document(f"observation-{i:06d}"), {
+            "disaster_id": d["id"],
+            "title": template["title"],
+            "description": template["description"],
+            "observation_type": "situation",
+            "urgency": template["urgency"],
+            "latitude": lat,
+            "longitude": lng,
+            "address": d["city"],
+            "image_urls": [],
+            "created_by": rng.choice(volunteers)[0] if volunteers else "",
+            "created_at": now - timedelta(hours=rng.uniform(0, 48)),
+        })
+
+    # ------------------------------ requests ----------------------------- #
+    needs = [n.value for n in TypeOfNeed if n != TypeOfNeed.other]
+    payloads, kinds = [], []
+    for i in range(scale.requests):
+        kind = rng.choices(list(REQUEST_MIX), weights=list(REQUEST_MIX.values()))[0]
+        d = rng.choices(disasters, weights=weights)[0]
+        if kind == "near":
+            lat, lng = _jitter(rng, d["lat"], d["lng"], km=0.5)
+        elif kind == "ambiguous":
+            lat, lng = _offset(rng, d["lat"], d["lng"], 10, 20)
+        else:
+            lat, lng = _offset(rng, d["lat"], d["lng"], 300, 600)
+
+        need = rng.choice(needs)
+        observation = rng.choice(fixtures["observations"])
+        text = (
+            f"{d['summary']} near {d['city']}. {observation['description']} "
+            f"We need {need} for about {rng.randint(2, 60)} people."
+        )
+
+        ref = db.collection("requests").document(f"request-{i:05d}")
+        writer.set(ref, {
+            "disaster_id": None,
+            "type_of_need": need,
+            "description": text,
+            "media": [],
+            "location": GeoPoint(lat, lng),
+            "auto_extract": None,
+            "created_by": f"affected-{i:05d}",
+            "status": "open",
+            "assigned_task_id": None,
+            "created_at": now,
+            "updated_at": now,
+        })
+        payloads.append(agent_payload(ref.id, text, need, lat, lng))
+        kinds.append(kind)
+
+    writer.flush()
+    return Dataset(
+        scale=scale,
+        seed=seed,
+        disaster_ids=[d["id"] for d in disasters],
+        volunteer_ids=[uid for uid, _, _ in volunteers],
+        admin_ids=admins,
+        requests=payloads,
+        request_kinds=kinds,
+    )
+
+
+def agent_payload(request_id: str, text: str, need: str, lat: float, lng: float, disaster_id: Optional[str] = None) -> Dict[str, Any]:
+    """The workflow payload api/requests.py builds for a new text-only request."""
+    return {
+        "previous_action": None,
+        "next_action": "request_extraction",
+        "request": {
+            "disaster_id": disaster_id,
+            "original_request_text_available": True,
+            "original_request_text": text,
+            "original_request_voice_available": False,
+            "original_request_voice": "",
+            "extracted_request_voice": None,
+            "original_request_image_available": False,
+            "original_request_image": "",
+            "extracted_request_image": None,
+            "coordinates": {"lat": lat, "lng": lng},
+            "location_from_coordinates": None,
+            "location_from_input": None,
+            "urgency": None,
+            "type_of_need": need,
+            "disaster_type": None,
+            "affected_people_count": None,
+            "source_request_id": request_id,
+        },
+        "disaster": None,
+        "task_allocations": None,
+        "tasks": None,
+    }
+
+
+def synthetic_tasks(rng: random.Random, n: int = 3) -> List[Task]:
+    """Tasks shaped like task-creation output, with fixture resource types."""
+    fixtures = load_fixtures()
+    types = sorted({r["resource_type"] for r in fixtures["resources"]})
+    tasks = []
+    for i in range(n):
+        requirements = [
+            ResourceRequirement(resource_type=t, quantity=rng.randint(1, 10))
+            for t in rng.sample(types, k=rng.randint(1, min(3, len(types))))
+        ]
+        tasks.append(Task(
+            name=f"task {i + 1}",
+            description=rng.choice(fixtures["observations"])["description"],
+            urgency=rng.choice(list(UrgencyLevel)),
+            resource_requirements=requirements,
+            manpower_requirement=rng.randint(1, 8),
+        ))
+    return tasks
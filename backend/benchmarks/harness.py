@@ -0,0 +1,381 @@
+"""
+Instrumentation for the pipeline benchmarks: per-node wall time, storage
+operation counts and (optionally) tracemalloc peaks, plus the in-process
+stand-ins for the external services the pipeline calls.
+"""
+
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+from unittest import mock
+
+from app.agent.core.base_agent import BaseAgent
+from app.agent.core.manager import Manager
+from app.core import llm_tracing
+from app.core.storage import accounting
+from app.utils.logger import set_console_level
+
+OP_KINDS = ("reads", "writes", "queries")
+
+
+# ------------------------------ recording -------------------------------- #
+class _Frame:
+    def __init__(self, name: str):
+        self.name = name
+        self.start_mem = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+        self.peak = 0
+
+
+_frame: ContextVar[Optional[_Frame]] = ContextVar("benchmark_frame", default=None)
+
+
+class Recorder:
+    """
+    Samples per measured name: seconds, storage ops (as counted by
+    core/storage/accounting) and, while tracemalloc is tracing, peak bytes
+    allocated above the starting point. Measurements nest; an outer one
+    includes everything measured inside it.
+    """
+
+    def __init__(self):
+        self.seconds: Dict[str, List[float]] = defaultdict(list)
+        self.ops: Dict[str, List[Counter]] = defaultdict(list)
+        self.peak_bytes: Dict[str, List[int]] = defaultdict(list)
+        self.notes: Dict[str, Dict[str, Any]] = defaultdict(dict)
+
+    def note(self, name: str, **values: Any) -> None:
+        """Extra figures reported alongside a measured name (not compared)."""
+        self.notes[name].update(values)
+
+    @contextmanager
+    def measure(self, name: str) -> Iterator[None]:
+        outer = _frame.get()
+        frame = _Frame(name)
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+        token = _frame.set(frame)
+        start = time.perf_counter()
+        try:
+            with accounting.track() as ops:
+                yield
+        finally:
+            elapsed = time.perf_counter() - start
+            _frame.reset(token)
+            self.seconds[name].append(elapsed)
+            self.ops[name].append(Counter({kind: getattr(ops, kind) for kind in OP_KINDS}))
+            if tracing:
+                frame.peak = max(frame.peak, tracemalloc.get_traced_memory()[1] - frame.start_mem)
+                self.peak_bytes[name].append(frame.peak)
+            if outer is not None:
+                outer.peak = max(outer.peak, frame.start_mem - outer.start_mem + frame.peak)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        out = {}
+        for name, samples in self.seconds.items():
+            ops = self.ops[name]
+            entry = {
+                "n": len(samples),
+                "mean_ms": round(1000 * sum(samples) / len(samples), 3),
+                "p50_ms": round(1000 * percentile(samples, 50), 3),
+                "p95_ms": round(1000 * percentile(samples, 95), 3),
+                "p99_ms": round(1000 * percentile(samples, 99), 3),
+                "ops": {kind: round(sum(o[kind] for o in ops) / len(ops), 2) for kind in OP_KINDS},
+            }
+            if self.peak_bytes.get(name):
+                peaks = self.peak_bytes[name]
+                entry["peak_kib_p50"] = round(percentile(peaks, 50) / 1024, 1)
+                entry["peak_kib_max"] = round(max(peaks) / 1024, 1)
+            entry.update(self.notes.get(name, {}))
+            out[name] = entry
+        return out
+
+
+def percentile(samples: List[float], p: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+# ------------------------------- pipeline -------------------------------- #
+class TimedManager(Manager):
+    """Manager whose agent nodes are measured under their node class name."""
+
+    def __init__(self, recorder: Recorder, **kwargs):
+        self.recorder = recorder
+        super().__init__(**kwargs)
+
+    def _load_class(self, dotted_path: str):
+        cls = super()._load_class(dotted_path)
+        if not (isinstance(cls, type) and issubclass(cls, BaseAgent)):
+            return cls
+        recorder = self.recorder
+
+        class Timed(cls):
+            def __call__(self, state):
+                with recorder.measure(cls.__name__):
+                    return super().__call__(state)
+
+        Timed.__name__ = cls.__name__
+        return Timed
+
+
+# --------------------------- external services --------------------------- #
+class LocalRedis:
+    """
+    In-process stand-in for the Redis commands SingleFlight, the HTTP cache
+    markers, the crud cache and the allocation holds use: SET (NX/PX), GET,
+    MGET, INCR, non-transactional pipelines and the compare-and-delete /
+    compare-and-pexpire scripts.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, Any] = {}
+        self._expires: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key: str) -> bool:
+        if key in self._expires and self._expires[key] <= time.monotonic():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    def set(self, key: str, value: Any, nx: bool = False, px: Optional[int] = None, ex: Optional[int] = None):
+        with self._lock:
+            if nx and self._live(key):
+                return None
+            self._data[key] = value.encode() if isinstance(value, str) else value
+            ttl = px / 1000 if px else ex
+            if ttl:
+                self._expires[key] = time.monotonic() + ttl
+            else:
+                self._expires.pop(key, None)
+            return True
+
+    def get(self, key: str):
+        with self._lock:
+            return self._data.get(key) if self._live(key) else None
+
+    def mget(self, keys):
+        with self._lock:
+            return [self._data.get(k) if self._live(k) else None for k in keys]
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            value = int(self._data[key]) + 1 if self._live(key) else 1
+            self._data[key] = str(value).encode()
+            return value
+
+    def eval(self, script: str, numkeys: int, key: str, marker: str, *args):
+        with self._lock:
+            if not (self._live(key) and self._data[key] == marker.encode()):
+                return 0
+            if "pexpire" in script:
+                self._expires[key] = time.monotonic() + int(args[0]) / 1000
+                return 1
+            self._data.pop(key, None)
+            return 1
+
+    def pipeline(self, transaction: bool = True) -> "_LocalPipeline":
+        return _LocalPipeline(self)
+
+
+class _LocalPipeline:
+    """Queues commands and runs them on execute() (without MULTI's atomicity)."""
+
+    def __init__(self, redis: LocalRedis):
+        self._redis = redis
+        self._calls: List[Any] = []
+
+    def __getattr__(self, name: str):
+        return lambda *args, **kwargs: self._calls.append((getattr(self._redis, name), args, kwargs))
+
+    def execute(self) -> List[Any]:
+        return [fn(*args, **kwargs) for fn, args, kwargs in self._calls]
+
+
+class _SequenceRandom:
+    """
+    Stub RNGs keyed on (model, n-th call) only. Prompts carry timestamps and
+    generated IDs, so keying on them (as the stub does) would make every
+    benchmark run answer differently; runs here are sequential, which keeps
+    the call order, and so the answers and storage op counts, reproducible.
+    """
+
+    def __init__(self, seed: Any):
+        self.seed = seed
+        self._seen: Counter = Counter()
+
+    def for_call(self, *parts: str) -> random.Random:
+        key = f"{self.seed}:{parts[0] if parts else ''}"
+        n = self._seen[key]
+        self._seen[key] += 1
+        return random.Random(f"{key}:{n}")
+
+
+def _guideline_chunks(k: int, chunk_chars: int = 900) -> List[Any]:
+    from langchain_core.documents import Document
+
+    from benchmarks.datagen import load_fixtures
+
+    fixtures = load_fixtures()
+    sentences = [d["disaster_summary"] for d in fixtures["disasters"]]
+    sentences += [o["description"] for o in fixtures["observations"]]
+    chunks = []
+    for i in range(k):
+        text, j = "", i
+        while len(text) < chunk_chars:
+            text += sentences[j % len(sentences)] + " "
+            j += 1
+        chunks.append(Document(page_content=text.strip(), metadata={"source": "benchmark"}))
+    return chunks
+
+
+@contextmanager
+def offline_services(llm_latency_scale: float = 0.0, llm_faults: bool = False) -> Iterator[None]:
+    """
+    Replace reverse geocoding, the RAG vector store and Redis with
+    in-process stand-ins, and tune the stub LLM: its latency is scaled by
+    `llm_latency_scale` (0 leaves only our own code on the clock) and its
+    injected failures / timeouts are off unless `llm_faults`.
+    """
+    from app.agent.utils.llm_providers import StubProvider, get_provider
+
+    provider = get_provider()
+    if not isinstance(provider, StubProvider):
+        raise RuntimeError("benchmarks must run with LLM_PROVIDER=stub")
+    provider.rng = _SequenceRandom(provider.cfg["seed"])
+    latency = provider.cfg["latency_s"]
+    provider.cfg = {
+        **provider.cfg,
+        "latency_s": {**latency, "median": max(latency["median"] * llm_latency_scale, 1e-6)},
+        **({} if llm_faults else {"failure_rate": 0.0, "timeout_rate": 0.0}),
+    }
+
+    def get_location(coordinates):
+        return f"{coordinates.latitude:.4f}, {coordinates.longitude:.4f}"
+
+    def retrieve_from_collection(collection_name: str, query: str, k: int = 4, **kwargs):
+        return _guideline_chunks(k)
+
+    redis = LocalRedis()
+    with ExitStack() as stack:
+        stack.enter_context(mock.patch("app.agent.agents.agent_intake.get_location", get_location))
+        stack.enter_context(mock.patch("app.agent.agents.agent_task.build_vectorstores_from_pdfs", lambda *a, **kw: None))
+        stack.enter_context(mock.patch("app.agent.agents.agent_task.retrieve_from_collection", retrieve_from_collection))
+        stack.enter_context(mock.patch("app.agent.agents.agent_disaster.get_redis", lambda: redis))
+        stack.enter_context(mock.patch("app.core.http_cache.get_redis", lambda: redis))
+        stack.enter_context(mock.patch("app.core.cache.get_redis", lambda: redis))
+        stack.enter_context(mock.patch("app.agent.utils.volunteer.get_redis", lambda: redis))
+        yield
+
+
+class LangfuseSink:
+    """What the local stand-in for the Langfuse ingestion API received."""
+
+    def __init__(self):
+        self.requests = 0
+        self.events = 0
+        self.bytes = 0
+
+
+@contextmanager
+def langfuse_sink() -> Iterator[LangfuseSink]:
+    """
+    Point a fresh shared Langfuse client at an in-process ingestion endpoint,
+    so tracing costs what it costs with a live backend (serialisation and
+    export threads included) without leaving the machine.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from langfuse.utils.langfuse_singleton import LangfuseSingleton
+
+    sink = LangfuseSink()
+
+    class Ingestion(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            sink.requests += 1
+            sink.bytes += len(body)
+            try:
+                sink.events += len(json.loads(body).get("batch", []))
+            except ValueError:
+                pass
+            reply = b'{"successes": [], "errors": []}'
+            self.send_response(207)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(reply)))
+            self.end_headers()
+            self.wfile.write(reply)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Ingestion)
+    threading.Thread(target=server.serve_forever, name="langfuse-sink", daemon=True).start()
+    env = {
+        "LANGFUSE_HOST": f"http://127.0.0.1:{server.server_port}",
+        "LANGFUSE_PUBLIC_KEY": "pk-lf-benchmark",
+        "LANGFUSE_SECRET_KEY": "sk-lf-benchmark",
+    }
+    try:
+        with mock.patch.dict(os.environ, env):
+            LangfuseSingleton().reset()
+            yield sink
+            llm_tracing.client().flush()
+    finally:
+        LangfuseSingleton().reset()
+        server.shutdown()
+
+
+def quiet_console() -> None:
+    """
+    Raise the console output to WARNING but keep the file handler, so
+    logging still costs what it costs in production.
+    """
+    set_console_level(logging.WARNING)
+
+
+# ------------------------------ comparison ------------------------------- #
+def compare(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    latency_tolerance: float = 0.25,
+    min_latency_delta_ms: float = 2.0,
+    ops_tolerance: float = 0.0,
+    memory_tolerance: float = 0.25,
+) -> List[str]:
+    """
+    Regressions of `current` against `baseline` (both `run` reports): p95
+    latency and peak memory beyond their relative tolerance, and any
+    increase in mean storage operations beyond `ops_tolerance`.
+    """
+    regressions = []
+    for scenario, nodes in baseline["scenarios"].items():
+        for name, base in nodes.items():
+            now = current["scenarios"].get(scenario, {}).get(name)
+            if now is None:
+                continue
+            label = f"{scenario}/{name}"
+
+            delta = now["p95_ms"] - base["p95_ms"]
+            if now["p95_ms"] > base["p95_ms"] * (1 + latency_tolerance) and delta > min_latency_delta_ms:
+                regressions.append(f"{label}: p95 {base['p95_ms']:.1f} -> {now['p95_ms']:.1f} ms")
+
+            for kind in OP_KINDS:
+                before, after = base["ops"].get(kind, 0), now["ops"].get(kind, 0)
+                if after > before * (1 + ops_tolerance) and after - before >= 0.01:
+                    regressions.append(f"{label}: {kind} {before} -> {after} per call")
+
+            if "peak_kib_max" in base and "peak_kib_max" in now:
+                if now["peak_kib_max"] > base["peak_kib_max"] * (1 + memory_tolerance):
+                    regressions.append(f"{label}: peak {base['peak_kib_max']} -> {now['peak_kib_max']} KiB")
+    return regressions
@@ -0,0 +1,205 @@
+"""
+End-to-end pipeline benchmark on synthetic data.
+
+    python -m benchmarks.run --scale small
+    python -m benchmarks.run --scale large --runs 200 --output report.json
+    python -m benchmarks.run --scale small --save-baseline
+    python -m benchmarks.run --scale medium --llm-latency-scale 1 --llm-faults
+
+Scenarios:
+    pipeline  the full Manager graph per request, timed per agent node
+    agents    each agent called directly on the state the previous one
+              produced, including allocation (not wired into the graph)
+    tracing   the full graph per request with Langfuse sampling forced off
+              and on, exporting to a local ingestion endpoint: the
+              difference is the tracing overhead per pipeline run
+
+Every measured name reports p50/p95/p99 wall time, mean storage reads /
+writes / queries per call and, from a separate tracemalloc pass
+(--memory-runs), peak memory. The report is compared against
+benchmarks/baselines/<scale>.json when it exists; any regression makes the
+exit status 1. Latency baselines are machine specific: regenerate them with
+--save-baseline on the machine that runs the comparison.
+"""
+
+import os
+
+# must be set before app modules pick their backends
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("LLM_PROVIDER", "stub")
+
+import argparse
+import json
+import platform
+import random
+import sys
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict
+
+from app.agent.agents.agent_allocation import AgentAllocation
+from app.agent.agents.agent_disaster import AgentDisaster
+from app.agent.agents.agent_intake import AgentIntake
+from app.agent.agents.agent_task import AgentTask
+from app.agent.core.manager import Manager
+from app.agent.schemas.state import State
+from app.core.firebase import get_db
+from benchmarks.datagen import SCALES, Dataset, generate, synthetic_tasks
+from benchmarks.harness import Recorder, TimedManager, compare, langfuse_sink, offline_services, quiet_console
+
+BASELINE_DIR = Path("benchmarks/baselines")
+
+
+def run_pipeline(dataset: Dataset, runs: int, recorder: Recorder) -> None:
+    manager = TimedManager(recorder)
+    quiet_console()
+    for i in range(runs):
+        payload = dataset.requests[i % len(dataset.requests)]
+        with recorder.measure("pipeline"):
+            manager.run(payload)
+
+
+def run_agents(dataset: Dataset, runs: int, recorder: Recorder) -> None:
+    rng = random.Random(dataset.seed)
+    agents = [AgentIntake(), AgentDisaster(), AgentTask()]
+    allocation = AgentAllocation()
+    quiet_console()
+    for i in range(runs):
+        state = State(**dataset.requests[i % len(dataset.requests)])
+        for agent in agents:
+            with recorder.measure(type(agent).__name__):
+                state = agent(state)
+        # allocation sees the stub's tasks, or fixture-shaped ones when it made none
+        state.tasks = state.tasks or synthetic_tasks(rng)
+        with recorder.measure(type(allocation).__name__):
+            allocation(state)
+
+
+def run_tracing(dataset: Dataset, runs: int, recorder: Recorder) -> None:
+    manager = Manager()
+    quiet_console()
+    with langfuse_sink() as sink:
+        for i in range(runs):
+            payload = dataset.requests[i % len(dataset.requests)]
+            with recorder.measure("unsampled"):
+                manager.run(payload, sample=False)
+            with recorder.measure("sampled"):
+                manager.run(payload, sample=True)
+    # unsampled runs send nothing unless they fail or are slow
+    recorder.note("sampled", exported_events=round(sink.events / max(runs, 1), 1), exported_kib=round(sink.bytes / 1024 / max(runs, 1), 1))
+
+
+SCENARIOS = {"pipeline": run_pipeline, "agents": run_agents, "tracing": run_tracing}
+
+
+def _print_table(report: Dict[str, Any]) -> None:
+    header = f"{'':32} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'reads':>9} {'writes':>7} {'queries':>7} {'peak KiB':>9}"
+    for scenario, nodes in report["scenarios"].items():
+        print(f"\n[{scenario}]")
+        print(header)
+        for name, s in nodes.items():
+            ops = s["ops"]
+            print(
+                f"{name:32} {s['n']:>5} {s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f} {s['p99_ms']:>9.1f} "
+                f"{ops['reads']:>9.1f} {ops['writes']:>7.1f} {ops['queries']:>7.1f} {s.get('peak_kib_max', '-'):>9}"
+            )
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=list(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--runs", type=int, help="measured runs per scenario (default: one per generated request)")
+    parser.add_argument("--warmup", type=int, default=2, help="unmeasured runs first (imports, caches)")
+    parser.add_argument("--memory-runs", type=int, default=5, help="runs of the tracemalloc pass, 0 to skip")
+    parser.add_argument("--scenario", choices=list(SCENARIOS), action="append", help="default: all")
+    parser.add_argument("--llm-latency-scale", type=float, default=0.0, help="multiplier on the stub LLM latency")
+    parser.add_argument("--llm-faults", action="store_true", help="keep the stub's injected failures and timeouts")
+    parser.add_argument("--baseline", help="baseline report (default: benchmarks/baselines/<scale>.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="write this report as the baseline")
+    parser.add_argument("--output", help="also write the report to this file")
+    args = parser.parse_args()
+
+    if os.environ.get("PYTHONHASHSEED") != "0":
+        # set iteration order reaches the storage op counts: pin it so runs compare
+        os.environ["PYTHONHASHSEED"] = "0"
+        os.execv(sys.executable, [sys.executable, "-m", "benchmarks.run", *sys.argv[1:]])
+
+    if os.environ["STORAGE_BACKEND"] != "memory":
+        sys.exit("benchmarks must run with STORAGE_BACKEND=memory")
+
+    scale = SCALES[args.scale]
+    runs = args.runs or scale.requests
+    print(f"Generating {args.scale} dataset: {scale.model_dump()}")
+    dataset = generate(get_db(), scale, seed=args.seed)
+
+    report: Dict[str, Any] = {
+        "meta": {
+            "scale": args.scale,
+            "seed": args.seed,
+            "runs": runs,
+            "memory_runs": args.memory_runs,
+            "llm_latency_scale": args.llm_latency_scale,
+            "llm_faults": args.llm_faults,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        },
+        "scenarios": {},
+    }
+
+    with offline_services(args.llm_latency_scale, args.llm_faults):
+        for name in args.scenario or list(SCENARIOS):
+            scenario = SCENARIOS[name]
+            scenario(dataset, args.warmup, Recorder())
+
+            recorder = Recorder()
+            scenario(dataset, runs, recorder)
+            if args.memory_runs:
+                # tracemalloc slows everything down: its pass is kept out of the timings
+                memory = Recorder()
+                tracemalloc.start()
+                try:
+                    scenario(dataset, args.memory_runs, memory)
+                finally:
+                    tracemalloc.stop()
+                recorder.peak_bytes = memory.peak_bytes
+            report["scenarios"][name] = recorder.summary()
+
+    _print_table(report)
+
+    tracing = report["scenarios"].get("tracing")
+    if tracing:
+        off, on = tracing["unsampled"], tracing["sampled"]
+        print(
+            f"\nLangfuse tracing per pipeline run: +{on['mean_ms'] - off['mean_ms']:.1f} ms mean, "
+            f"+{on['p50_ms'] - off['p50_ms']:.1f} ms p50, {on.get('exported_events', 0)} events / "
+            f"{on.get('exported_kib', 0)} KiB exported"
+        )
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+    baseline_path = Path(args.baseline) if args.baseline else BASELINE_DIR / f"{args.scale}.json"
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"\nBaseline written to {baseline_path}")
+        return
+
+    if not baseline_path.exists():
+        print(f"\nNo baseline at {baseline_path}; run with --save-baseline to create one")
+        return
+
+    regressions = compare(report, json.loads(baseline_path.read_text()))
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) against {baseline_path}:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"\nNo regressions against {baseline_path}")
+
+
+if __name__ == "__main__":
+    run()
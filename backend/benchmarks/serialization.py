@@ -0,0 +1,135 @@
+"""
+Serialisation cost of the large list responses.
+
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --items 50000 --repeat 10 --output serialization.json
+
+Each list endpoint's items (built by crud from a benchmarks.datagen dataset
+and repeated up to --items) are rendered three ways: the way FastAPI does
+for a returned list (validation against the route's response_model,
+conversion to JSON-compatible data, then the response class's encode)
+with the stock JSONResponse and with core/responses.ORJSONResponse, and
+through core/responses.list_response. Reported per endpoint are CPU time
+per render (best and median of --repeat), the tracemalloc peak of one
+render and the body size; all bodies are checked to decode to the same
+JSON.
+"""
+
+import os
+
+# must be set before app modules pick their backends
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("LLM_PROVIDER", "stub")
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+
+from app.api import disaster as disaster_api, observation as observation_api, requests as requests_api, \
+    resource as resource_api, task as task_api
+from app.core.firebase import get_db
+from app.core.responses import ORJSONResponse, list_response
+from app.crud import disaster, observation, request, resource, task
+from app.schemas.disaster import DisasterResponse
+from app.schemas.observation import ObservationResponse
+from app.schemas.request import Request
+from app.schemas.resource import Resource
+from app.schemas.task import Task
+from benchmarks.datagen import SCALES, generate
+from benchmarks.harness import quiet_console
+
+# path of the route -> its router, item model and the crud call that feeds it
+ENDPOINTS: Dict[str, Tuple[Any, type, Callable[[], List[Any]]]] = {
+    "/requests": (requests_api.router, Request, request.list_all),
+    "/tasks": (task_api.router, Task, task.list_tasks),
+    "/resources/": (resource_api.router, Resource, resource.list_all),
+    "/disasters": (disaster_api.router, DisasterResponse, disaster.list_disasters),
+    "/observations": (observation_api.router, ObservationResponse, lambda: observation.list_observations(None)),
+}
+
+
+def _route(router: Any, path: str) -> APIRoute:
+    for route in router.routes:
+        if isinstance(route, APIRoute) and route.path == path and "GET" in route.methods:
+            return route
+    raise LookupError(path)
+
+
+def _fastapi_render(route: APIRoute, response_class: type, items: List[Any]) -> bytes:
+    content = asyncio.run(serialize_response(field=route.response_field, response_content=items))
+    return response_class(content).body
+
+
+def _measure(render: Callable[[], bytes], repeat: int) -> Tuple[Dict[str, Any], bytes]:
+    cpu = []
+    for _ in range(repeat):
+        started = time.process_time()
+        body = render()
+        cpu.append(time.process_time() - started)
+    tracemalloc.start()
+    try:
+        render()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        "cpu_ms_best": round(min(cpu) * 1000, 2),
+        "cpu_ms_median": round(statistics.median(cpu) * 1000, 2),
+        "peak_mib": round(peak / 2**20, 2),
+        "body_kib": round(len(body) / 1024, 1),
+    }, body
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=10_000, help="items per list response")
+    parser.add_argument("--repeat", type=int, default=5, help="timed renders per path")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="also write the report to this file")
+    args = parser.parse_args()
+
+    quiet_console()
+    generate(get_db(), SCALES["small"], seed=args.seed)
+
+    report: Dict[str, Any] = {"meta": {"items": args.items, "repeat": args.repeat}, "endpoints": {}}
+    print(f"{'':16} {'':14} {'cpu ms':>9} {'median':>9} {'peak MiB':>9} {'body KiB':>9}")
+    for path, (router, model, fetch) in ENDPOINTS.items():
+        route = _route(router, path)
+        items = fetch()
+        if not items:
+            # e.g. tasks: the small dataset has none until the pipeline runs
+            print(f"{path:16} no items in the dataset, skipped")
+            continue
+        items = (items * (args.items // len(items) + 1))[:args.items]
+
+        renders = {
+            "json": lambda: _fastapi_render(route, JSONResponse, items),
+            "orjson": lambda: _fastapi_render(route, ORJSONResponse, items),
+            "list_response": lambda: list_response(model, items).body,
+        }
+        results, expected = {}, None
+        for name, render in renders.items():
+            results[name], body = _measure(render, args.repeat)
+            if expected is None:
+                expected = json.loads(body)
+            elif json.loads(body) != expected:
+                raise SystemExit(f"{path}: {name} renders different JSON")
+
+        report["endpoints"][path] = results
+        for i, (name, r) in enumerate(results.items()):
+            print(f"{path if i == 0 else '':16} {name:14} {r['cpu_ms_best']:>9.1f} {r['cpu_ms_median']:>9.1f} {r['peak_mib']:>9.2f} {r['body_kib']:>9.1f}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    run()
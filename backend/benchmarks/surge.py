@@ -0,0 +1,477 @@
+"""
+HTTP-level surge simulation of the FastAPI + Celery stack on one box.
+
+    python -m benchmarks.surge
+    python -m benchmarks.surge --timeline benchmarks/timelines/flood.yaml --workers 4
+    python -m benchmarks.surge --transport asgi --time-scale 0.2 --output surge.json
+
+The app runs in this process, served by uvicorn on a loopback port (or
+called through httpx's ASGI transport with --transport asgi). Auth is
+replaced by a dependency override that treats the bearer token as the uid
+of a seeded user. Storage is the in-memory backend, pre-populated with a
+benchmarks.datagen dataset. The LLM is the stub provider at its configured
+latency. Celery runs on the in-memory broker with an in-process worker
+that has --workers threads.
+
+Virtual users per role follow the scripted timeline's phases, and each
+one loops: pick an action, call it, think. Reported are endpoint latency
+percentiles and Firestore reads (X-Firestore-Reads) per phase, Celery
+queue depth and running tasks over time, and time-to-task for every posted
+request. Time-to-task is measured from the POST /requests response to its
+tasks being saved. Actions can set a `max_reads` budget per call; going
+over it makes the exit status 1.
+"""
+
+import os
+
+# must be set before app modules pick their backends
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("LLM_PROVIDER", "stub")
+os.environ.setdefault("CELERY_BROKER_URL", "memory://")
+
+import argparse
+import asyncio
+import json
+import random
+import socket
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import uvicorn
+import yaml
+from celery.contrib.testing.worker import start_worker
+from celery.signals import task_postrun, task_prerun
+from fastapi import Depends, HTTPException
+
+from app.agent.agents import agent_task
+from app.api.deps import bearer_scheme, get_current_user
+from app.celery_config import celery_app
+from app.core.firebase import get_db
+from app.crud.role import get_role
+from app.crud.user import get_user
+from app.main import app
+from app.schemas.user import User
+from benchmarks.datagen import SCALES, generate, load_fixtures
+from benchmarks.harness import offline_services, percentile, quiet_console
+from scripts.seed_roles import ROLES
+
+DEFAULT_TIMELINE = Path("benchmarks/timelines/flood.yaml")
+
+_KM_PER_DEG = 111.0
+_NEEDS = ["medical", "food", "rescue", "shelter", "water", "evacuation"]
+
+
+# ------------------------------- setup ----------------------------------- #
+async def _fake_user(creds=Depends(bearer_scheme)) -> User:
+    # the bearer token is the uid of a seeded user
+    user = get_user(creds.credentials) if creds else None
+    if user is None:
+        raise HTTPException(status_code=401, detail="Unknown simulated user")
+    user.role = get_role(user.role_id)
+    return user
+
+
+def seed(scale: str, seed_value: int, affected: int) -> Dict[str, List[str]]:
+    db = get_db()
+    batch = db.batch()
+    for role_id, data in ROLES.items():
+        batch.set(db.collection("roles").document(role_id), data)
+    batch.commit()
+
+    dataset = generate(db, SCALES[scale], seed=seed_value)
+    affected_ids = [f"sim-affected-{i:05d}" for i in range(affected)]
+    for start in range(0, len(affected_ids), 500):
+        batch = db.batch()
+        for uid in affected_ids[start:start + 500]:
+            batch.set(db.collection("users").document(uid), {
+                "uid": uid,
+                "email": f"{uid}@sim.local",
+                "display_name": uid,
+                "role_id": "affected_individual",
+            })
+        batch.commit()
+
+    return {
+        "affected_individual": affected_ids,
+        "volunteer": dataset.volunteer_ids,
+        "admin": dataset.admin_ids,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve_http() -> Tuple[uvicorn.Server, str]:
+    port = _free_port()
+    # log_config=None: uvicorn's dictConfig would close the app loggers' handlers,
+    # which (unlike `uvicorn app.main:app`) already exist at this point
+    server = uvicorn.Server(uvicorn.Config(
+        app, host="127.0.0.1", port=port, log_config=None, log_level="warning", lifespan="off",
+    ))
+    threading.Thread(target=server.run, name="uvicorn", daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+# ---------------------------- observations ------------------------------- #
+class Observations:
+    """Everything the run measures, keyed for the final report."""
+
+    def __init__(self):
+        self.t0 = time.monotonic()
+        self.phase = "setup"
+        # (action, phase) -> [(seconds, status, Firestore reads)]
+        self.calls: Dict[Tuple[str, str], List[Tuple[float, int, int]]] = defaultdict(list)
+        self.posted: Dict[str, float] = {}
+        self.tasks_saved: Dict[str, float] = {}
+        self.finished: Dict[str, float] = {}
+        self.running = 0
+        self.samples: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def now(self) -> float:
+        return time.monotonic() - self.t0
+
+    def record_tasks(self, request_id: Optional[str]) -> None:
+        if request_id:
+            self.tasks_saved.setdefault(request_id, self.now())
+
+    def task_started(self) -> None:
+        with self._lock:
+            self.running += 1
+
+    def task_finished(self, request_id: Optional[str]) -> None:
+        with self._lock:
+            self.running -= 1
+        if request_id:
+            self.finished.setdefault(request_id, self.now())
+
+
+def _request_id(args) -> Optional[str]:
+    payload = args[0] if args else {}
+    return ((payload or {}).get("request") or {}).get("source_request_id")
+
+
+def instrument(obs: Observations) -> None:
+    save_tasks = agent_task.save_tasks
+
+    def recording_save_tasks(tasks, request_obj):
+        saved = save_tasks(tasks, request_obj)
+        obs.record_tasks(getattr(request_obj, "source_request_id", None))
+        return saved
+
+    agent_task.save_tasks = recording_save_tasks
+
+    @task_prerun.connect(weak=False)
+    def _prerun(task=None, **_):
+        if task is not None and task.name == "agent_flow":
+            obs.task_started()
+
+    @task_postrun.connect(weak=False)
+    def _postrun(task=None, args=None, **_):
+        if task is not None and task.name == "agent_flow":
+            obs.task_finished(_request_id(args))
+
+
+def queue_depth() -> int:
+    with celery_app.connection_for_read() as conn:
+        try:
+            return conn.default_channel.queue_declare(queue=celery_app.conf.task_default_queue, passive=True).message_count
+        except Exception:
+            # not declared yet: nothing was ever published
+            return 0
+
+
+# ---------------------------- virtual users ------------------------------ #
+def _request_body(rng: random.Random, epicenter: Dict[str, float], descriptions: List[str]) -> Dict[str, Any]:
+    spread = epicenter["spread_km"] / _KM_PER_DEG
+    need = rng.choice(_NEEDS)
+    return {
+        "disaster_id": None,
+        "type_of_need": need,
+        "description": f"{rng.choice(descriptions)} We need {need} for about {rng.randint(2, 60)} people.",
+        "media": [],
+        "location": {
+            "lat": epicenter["lat"] + rng.gauss(0, spread),
+            "lng": epicenter["lng"] + rng.gauss(0, spread),
+        },
+    }
+
+
+async def virtual_user(
+    client: httpx.AsyncClient,
+    uid: str,
+    role_cfg: Dict[str, Any],
+    timeline: Dict[str, Any],
+    obs: Observations,
+    rng: random.Random,
+    stop: asyncio.Event,
+    descriptions: List[str],
+) -> None:
+    actions = role_cfg["actions"]
+    weights = [a.get("weight", 1) for a in actions]
+    think = role_cfg["think_time_s"]
+    headers = {"Authorization": f"Bearer {uid}"}
+
+    async def pause(seconds: float) -> bool:
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=seconds)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    # spread first calls over one think time instead of a synchronized burst
+    if await pause(rng.uniform(0, think)):
+        return
+    while not stop.is_set():
+        action = rng.choices(actions, weights=weights)[0]
+        body = _request_body(rng, timeline["epicenter"], descriptions) if action["method"] == "POST" else None
+        phase = obs.phase
+        start = time.monotonic()
+        try:
+            response = await client.request(action["method"], action["path"], json=body, headers=headers)
+            status, reads = response.status_code, int(response.headers.get("X-Firestore-Reads", 0))
+        except httpx.HTTPError:
+            status, reads = 0, 0
+        obs.calls[(action["name"], phase)].append((time.monotonic() - start, status, reads))
+        if action["path"] == "/requests" and status == 201:
+            obs.posted[response.json()["id"]] = obs.now()
+
+        if await pause(rng.expovariate(1 / think)):
+            return
+
+
+async def sample(obs: Observations, interval_s: float, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        obs.samples.append({
+            "t_s": round(obs.now(), 2),
+            "phase": obs.phase,
+            "queue_depth": await asyncio.to_thread(queue_depth),
+            "running": obs.running,
+            "posted": len(obs.posted),
+            "with_tasks": len(obs.tasks_saved),
+        })
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval_s)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def simulate(
+    client: httpx.AsyncClient,
+    timeline: Dict[str, Any],
+    users: Dict[str, List[str]],
+    obs: Observations,
+    time_scale: float,
+    sample_interval_s: float,
+    drain_timeout_s: float,
+    seed_value: int,
+) -> None:
+    rng = random.Random(seed_value)
+    fixtures = load_fixtures()
+    descriptions = [o["description"] for o in fixtures["observations"]]
+    # role -> [(task, stop)]
+    active: Dict[str, List[Tuple[asyncio.Task, asyncio.Event]]] = defaultdict(list)
+
+    sampler_stop = asyncio.Event()
+    sampler = asyncio.create_task(sample(obs, sample_interval_s, sampler_stop))
+    obs.t0 = time.monotonic()
+
+    for phase in timeline["phases"]:
+        obs.phase = phase["name"]
+        print(f"[{obs.now():7.1f}s] phase {phase['name']}: {phase['users']}")
+        for role, target in phase["users"].items():
+            running = active[role]
+            while len(running) > target:
+                running.pop()[1].set()
+            while len(running) < target:
+                uid = users[role][len(running) % len(users[role])]
+                stop = asyncio.Event()
+                task = asyncio.create_task(virtual_user(
+                    client, uid, timeline["roles"][role], timeline, obs,
+                    random.Random(rng.random()), stop, descriptions,
+                ))
+                running.append((task, stop))
+        await asyncio.sleep(phase["duration_s"] * time_scale)
+
+    obs.phase = "drain"
+    all_users = [vu for running in active.values() for vu in running]
+    for _, stop in all_users:
+        stop.set()
+    await asyncio.gather(*(task for task, _ in all_users), return_exceptions=True)
+
+    print(f"[{obs.now():7.1f}s] load stopped, draining the queue (up to {drain_timeout_s:.0f}s)")
+    give_up_at = time.monotonic() + drain_timeout_s
+    while time.monotonic() < give_up_at:
+        if await asyncio.to_thread(queue_depth) == 0 and obs.running == 0:
+            break
+        await asyncio.sleep(sample_interval_s)
+
+    sampler_stop.set()
+    await sampler
+
+
+# -------------------------------- report --------------------------------- #
+def _latency(calls: List[Tuple[float, int, int]]) -> Dict[str, Any]:
+    seconds = [s for s, _, _ in calls]
+    return {
+        "n": len(calls),
+        "errors": sum(1 for _, status, _ in calls if status == 0 or status >= 400),
+        "reads_mean": round(sum(r for _, _, r in calls) / len(calls), 1),
+        "reads_max": max(r for _, _, r in calls),
+        "p50_ms": round(1000 * percentile(seconds, 50), 1),
+        "p95_ms": round(1000 * percentile(seconds, 95), 1),
+        "p99_ms": round(1000 * percentile(seconds, 99), 1),
+        "max_ms": round(1000 * max(seconds), 1),
+    }
+
+
+def build_report(obs: Observations, timeline: Dict[str, Any], meta: Dict[str, Any]) -> Dict[str, Any]:
+    endpoints: Dict[str, Dict[str, Any]] = defaultdict(dict)
+    by_action: Dict[str, List[Tuple[float, int, int]]] = defaultdict(list)
+    for (action, phase), calls in obs.calls.items():
+        by_action[action] += calls
+        endpoints[action][phase] = _latency(calls)
+    for action, calls in by_action.items():
+        endpoints[action]["all"] = _latency(calls)
+
+    time_to_task = [obs.tasks_saved[rid] - posted for rid, posted in obs.posted.items() if rid in obs.tasks_saved]
+    summary = {
+        "posted": len(obs.posted),
+        "with_tasks": len(time_to_task),
+        "finished_without_tasks": sum(1 for rid in obs.posted if rid in obs.finished and rid not in obs.tasks_saved),
+        "pending": sum(1 for rid in obs.posted if rid not in obs.finished and rid not in obs.tasks_saved),
+    }
+    if time_to_task:
+        summary.update({
+            "p50_s": round(percentile(time_to_task, 50), 2),
+            "p95_s": round(percentile(time_to_task, 95), 2),
+            "p99_s": round(percentile(time_to_task, 99), 2),
+            "max_s": round(max(time_to_task), 2),
+        })
+
+    # actions may carry a `max_reads` Firestore read budget per call
+    over_budget = []
+    for role in timeline["roles"].values():
+        for action in role["actions"]:
+            stats = endpoints.get(action["name"], {}).get("all")
+            if "max_reads" in action and stats and stats["reads_max"] > action["max_reads"]:
+                over_budget.append(f"{action['name']}: up to {stats['reads_max']} reads, budget {action['max_reads']}")
+
+    return {
+        "meta": {**meta, "timeline": timeline["name"]},
+        "endpoints": endpoints,
+        "over_read_budget": sorted(set(over_budget)),
+        "time_to_task": summary,
+        "queue": {
+            "max_depth": max((s["queue_depth"] for s in obs.samples), default=0),
+            "samples": obs.samples,
+        },
+    }
+
+
+def print_report(report: Dict[str, Any], phases: List[str]) -> None:
+    print(f"\n{'endpoint':24} {'phase':10} {'n':>6} {'err':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'reads':>7} {'max':>6}")
+    for action, by_phase in sorted(report["endpoints"].items()):
+        for phase in phases + ["all"]:
+            s = by_phase.get(phase)
+            if s:
+                print(f"{action:24} {phase:10} {s['n']:>6} {s['errors']:>5} {s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f} {s['p99_ms']:>9.1f} {s['max_ms']:>9.1f} {s['reads_mean']:>7.1f} {s['reads_max']:>6}")
+
+    print(f"\ntime to task: {json.dumps(report['time_to_task'])}")
+    if report["meta"].get("abandoned_in_queue"):
+        print(f"abandoned in the queue after the drain timeout: {report['meta']['abandoned_in_queue']}")
+    print(f"\n{'t s':>8} {'phase':10} {'queue':>6} {'running':>8} {'posted':>7} {'tasks':>6}")
+    samples = report["queue"]["samples"]
+    step = max(1, len(samples) // 30)
+    for s in samples[::step]:
+        print(f"{s['t_s']:>8.1f} {s['phase']:10} {s['queue_depth']:>6} {s['running']:>8} {s['posted']:>7} {s['with_tasks']:>6}")
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--timeline", default=str(DEFAULT_TIMELINE))
+    parser.add_argument("--scale", choices=list(SCALES), default="small", help="pre-existing dataset size")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--workers", type=int, default=celery_app.conf.worker_concurrency, help="Celery worker threads")
+    parser.add_argument("--transport", choices=["http", "asgi"], default="http")
+    parser.add_argument("--max-connections", type=int, default=200, help="client connection pool size")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="multiplier on phase durations")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="queue sampling period, seconds")
+    parser.add_argument("--drain-timeout", type=float, default=120.0, help="wait for the queue to empty after the load")
+    parser.add_argument("--llm-latency-scale", type=float, default=1.0, help="multiplier on the stub LLM latency")
+    parser.add_argument("--llm-faults", action="store_true", help="keep the stub's injected failures and timeouts")
+    parser.add_argument("--output", help="write the full report (with all queue samples) to this file")
+    args = parser.parse_args()
+
+    if os.environ["STORAGE_BACKEND"] != "memory" or not os.environ["CELERY_BROKER_URL"].startswith("memory://"):
+        sys.exit("the simulator runs with STORAGE_BACKEND=memory and CELERY_BROKER_URL=memory://")
+
+    with open(args.timeline, "r") as f:
+        timeline = yaml.safe_load(f)
+    affected = max(p["users"].get("affected_individual", 0) for p in timeline["phases"])
+
+    print(f"Seeding {args.scale} dataset and {affected} affected users")
+    users = seed(args.scale, args.seed, affected)
+
+    app.dependency_overrides[get_current_user] = _fake_user
+    obs = Observations()
+    instrument(obs)
+
+    with offline_services(args.llm_latency_scale, args.llm_faults), \
+            start_worker(celery_app, pool="threads", concurrency=args.workers, perform_ping_check=False, loglevel="WARNING"):
+        quiet_console()
+        server = None
+        if args.transport == "http":
+            server, base_url = serve_http()
+            transport = None
+        else:
+            base_url, transport = "http://sim", httpx.ASGITransport(app=app)
+
+        async def main():
+            limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+            async with httpx.AsyncClient(base_url=base_url, transport=transport, limits=limits, timeout=60) as client:
+                await simulate(
+                    client, timeline, users, obs, args.time_scale,
+                    args.sample_interval, args.drain_timeout, args.seed,
+                )
+
+        try:
+            asyncio.run(main())
+        finally:
+            if server is not None:
+                server.should_exit = True
+            # whatever did not drain in time is dropped, not run after the stand-ins are gone
+            with celery_app.connection_for_write() as conn:
+                abandoned = conn.default_channel.queue_purge(celery_app.conf.task_default_queue) or 0
+
+    report = build_report(obs, timeline, {
+        "scale": args.scale,
+        "workers": args.workers,
+        "transport": args.transport,
+        "time_scale": args.time_scale,
+        "llm_latency_scale": args.llm_latency_scale,
+        "llm_faults": args.llm_faults,
+        "abandoned_in_queue": abandoned,
+    })
+    print_report(report, [p["name"] for p in timeline["phases"]] + ["drain"])
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+    if report["over_read_budget"]:
+        print("\nFirestore read budget exceeded:")
+        for line in report["over_read_budget"]:
+            print(f"  {line}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,106 @@
+"""
+Validation and dump throughput of the API schemas.
+
+    python -m benchmarks.validation
+    python -m benchmarks.validation --rounds 20 --output validation.json
+
+The items crud returns for a benchmarks.datagen dataset are dumped to
+plain dicts and validated back into their schemas (`model_validate`, what
+crud does for every document it reads), and dumped again (`model_dump`,
+what crud and the agents do before every write or prompt), against the
+v1-style `.dict()` shim the code used before. The
+per-call cost of looking up a new task's initial status through
+`TaskStatusUpdate.schema()` (as crud.task.create_task did) is compared
+with the cached constant. Figures are items per second, best of --rounds.
+"""
+
+import os
+
+# must be set before app modules pick their backends
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("LLM_PROVIDER", "stub")
+
+import argparse
+import json
+import time
+import warnings
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from app.core.firebase import get_db
+from app.crud import disaster, observation, request, resource
+from app.crud.task import INITIAL_STATUS
+from app.schemas.disaster import DisasterResponse
+from app.schemas.observation import ObservationResponse
+from app.schemas.request import Request
+from app.schemas.resource import Resource
+from app.schemas.task import TaskStatusUpdate
+from benchmarks.datagen import SCALES, generate
+from benchmarks.harness import quiet_console
+
+# schema -> the crud call that builds its items
+SCHEMAS: Dict[type, Callable[[], List[Any]]] = {
+    Request: request.list_all,
+    Resource: resource.list_all,
+    DisasterResponse: disaster.list_disasters,
+    ObservationResponse: lambda: observation.list_observations(None),
+}
+
+
+def _rate(fn: Callable[[], Any], items: int, rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return round(items / best)
+
+
+def _legacy_status() -> str:
+    schema = TaskStatusUpdate.schema()["properties"]["status"]
+    return schema["default"] if "default" in schema else "pending"
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=list(SCALES), default="small")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="also write the report to this file")
+    args = parser.parse_args()
+
+    quiet_console()
+    generate(get_db(), SCALES[args.scale], seed=args.seed)
+    # the shims warn on every call; the warning machinery is part of their cost
+    warnings.simplefilter("ignore")
+
+    report: Dict[str, Any] = {"meta": {"scale": args.scale, "rounds": args.rounds}, "schemas": {}}
+    print(f"{'':22} {'docs':>6} {'validate/s':>12} {'model_dump/s':>13} {'.dict()/s':>12}")
+    for model, fetch in SCHEMAS.items():
+        objects = fetch()
+        docs = [o.model_dump() for o in objects]
+        n = len(docs)
+        result = {
+            "docs": n,
+            "validate_per_s": _rate(lambda: [model.model_validate(d) for d in docs], n, args.rounds),
+            "model_dump_per_s": _rate(lambda: [o.model_dump() for o in objects], n, args.rounds),
+            "legacy_dict_per_s": _rate(lambda: [o.dict() for o in objects], n, args.rounds),
+        }
+        report["schemas"][model.__name__] = result
+        print(
+            f"{model.__name__:22} {n:>6} {result['validate_per_s']:>12,} "
+            f"{result['model_dump_per_s']:>13,} {result['legacy_dict_per_s']:>12,}"
+        )
+
+    calls = 200
+    legacy = _rate(lambda: [_legacy_status() for _ in range(calls)], calls, args.rounds)
+    cached = _rate(lambda: [INITIAL_STATUS for _ in range(calls)], calls, args.rounds)
+    report["task_initial_status"] = {"schema_lookup_per_s": legacy, "constant_per_s": cached}
+    print(f"\nnew task status default: {legacy:,}/s via TaskStatusUpdate.schema(), {cached:,}/s cached")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    run()
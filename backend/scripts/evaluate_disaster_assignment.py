@@ -0,0 +1,161 @@
+"""
+Offline evaluation of the deterministic disaster-assignment pass.
+
+    python -m scripts.evaluate_disaster_assignment
+    python -m scripts.evaluate_disaster_assignment --requests reqs.json --disasters app/agent/data/disasters.json
+    python -m scripts.evaluate_disaster_assignment --auto-assign 0.8 --auto-reject 0.25
+
+Historical requests that carry a disaster_id are the labelled set. When that
+disaster already existed at the time of the request, the scorer is right
+when it assigns it and wrong when it assigns another one or rejects; when it
+did not (the disaster was created from this request or a later one), REJECT
+is the right answer and any assignment is wrong. An LLM call is saved
+whenever the scorer does not return AMBIGUOUS.
+Without --requests/--disasters the data is read from Firestore.
+"""
+
+import argparse
+import json
+from collections import Counter
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from app.agent.config.pipeline_config_loader import PipelineConfig
+from app.agent.schemas.disaster import Disaster
+from app.agent.schemas.intake import Request as AgentRequest
+from app.agent.schemas.types import AssignmentDecision
+from app.agent.utils.disaster_scoring import decide_assignment, score_disaster
+
+
+def _to_agent_request(doc: dict) -> AgentRequest:
+    location = doc.get("location") or {}
+    auto_extract = doc.get("auto_extract") or {}
+    return AgentRequest(
+        disaster_id=None,
+        original_request_text_available=True,
+        original_request_text=doc.get("description") or "",
+        original_request_voice_available=False,
+        original_request_voice="",
+        extracted_request_voice=None,
+        original_request_image_available=False,
+        original_request_image="",
+        extracted_request_image=None,
+        coordinates={"lat": location.get("lat"), "lng": location.get("lng")} if location else None,
+        location_from_coordinates=None,
+        location_from_input=None,
+        urgency=None,
+        type_of_need=None,
+        disaster_type=auto_extract.get("disaster_type"),
+        affected_people_count=None,
+    )
+
+
+def _parse_time(value) -> Optional[datetime]:
+    if value is None:
+        return None
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def load_from_files(requests_path: str, disasters_path: str) -> Tuple[List[dict], List[Disaster]]:
+    with open(requests_path, "r") as f:
+        requests = json.load(f)
+    with open(disasters_path, "r") as f:
+        raw_disasters = json.load(f)
+
+    disasters = []
+    for d in raw_disasters:
+        # fixtures spell coordinates out as latitude/longitude
+        coords = d.get("disaster_coordinates")
+        if coords and "latitude" in coords:
+            d["disaster_coordinates"] = {"lat": coords["latitude"], "lng": coords["longitude"]}
+        disasters.append(Disaster(**d))
+    return requests, disasters
+
+
+def load_from_firestore() -> Tuple[List[dict], List[Disaster]]:
+    from app.agent.utils.disaster import load_disasters
+    from app.crud import request as crud_request
+
+    requests = [r.model_dump() for r in crud_request.list_all()]
+    return requests, load_disasters()
+
+
+def evaluate(requests: List[dict], disasters: List[Disaster], cfg: dict) -> dict:
+    decisions = Counter()
+    correct = wrong = 0
+
+    for doc in requests:
+        expected = doc.get("disaster_id")
+        if not expected or not doc.get("location"):
+            continue
+
+        request = _to_agent_request(doc)
+        created_at = _parse_time(doc.get("created_at")) or datetime.now(timezone.utc)
+
+        # Only disasters that already existed when the request came in, nearest first
+        known = [
+            d for d in disasters
+            if d.created_at is None or _parse_time(d.created_at) <= created_at
+        ]
+        ranked = sorted(
+            (m for m in (score_disaster(request, d, cfg, created_at) for d in known) if m),
+            key=lambda m: m.distance_km,
+        )
+        nearest = [m.disaster for m in ranked[:cfg["candidates"]]]
+
+        result = decide_assignment(request, nearest, cfg, now=created_at)
+        decisions[result.decision] += 1
+
+        if result.decision == AssignmentDecision.ASSIGN:
+            if result.best.disaster.disaster_id == expected:
+                correct += 1
+            else:
+                wrong += 1
+        elif result.decision == AssignmentDecision.REJECT:
+            # right when the labelled disaster did not exist yet: a new one had to be created
+            if any(d.disaster_id == expected for d in known):
+                wrong += 1
+            else:
+                correct += 1
+
+    total = sum(decisions.values())
+    decided = correct + wrong
+    return {
+        "labelled_requests": total,
+        "assigned": decisions[AssignmentDecision.ASSIGN],
+        "rejected": decisions[AssignmentDecision.REJECT],
+        "sent_to_llm": decisions[AssignmentDecision.AMBIGUOUS],
+        "accuracy_on_decided": round(correct / decided, 4) if decided else None,
+        "llm_calls_saved_pct": round(100 * (total - decisions[AssignmentDecision.AMBIGUOUS]) / total, 2) if total else None,
+    }
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", help="JSON list of request documents (app.schemas.request shape)")
+    parser.add_argument("--disasters", help="JSON list of agent Disaster objects")
+    parser.add_argument("--auto-assign", type=float, help="override auto_assign_score")
+    parser.add_argument("--auto-reject", type=float, help="override auto_reject_score")
+    parser.add_argument("--max-distance", type=float, help="override max_distance_km")
+    args = parser.parse_args()
+
+    cfg = dict(PipelineConfig().get("disaster_assignment"))
+    if args.auto_assign is not None:
+        cfg["auto_assign_score"] = args.auto_assign
+    if args.auto_reject is not None:
+        cfg["auto_reject_score"] = args.auto_reject
+    if args.max_distance is not None:
+        cfg["max_distance_km"] = args.max_distance
+
+    if args.requests and args.disasters:
+        requests, disasters = load_from_files(args.requests, args.disasters)
+    else:
+        requests, disasters = load_from_firestore()
+
+    print(json.dumps(evaluate(requests, disasters, cfg), indent=2))
+
+
+if __name__ == "__main__":
+    run()
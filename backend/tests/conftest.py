@@ -0,0 +1,27 @@
+"""
+Tests run against the in-memory storage backend and in-process Redis
+stand-in, with nothing external configured.
+"""
+
+import os
+
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("LLM_PROVIDER", "stub")
+
+import pytest
+
+from app.core.firebase import get_db
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """A fresh in-memory store, with the caches and volunteer holds on a fresh LocalRedis."""
+    from benchmarks.harness import LocalRedis
+
+    redis = LocalRedis()
+    monkeypatch.setattr("app.core.cache.get_redis", lambda: redis)
+    monkeypatch.setattr("app.core.http_cache.get_redis", lambda: redis)
+    monkeypatch.setattr("app.agent.utils.volunteer.get_redis", lambda: redis)
+    get_db.cache_clear()
+    yield get_db()
+    get_db.cache_clear()
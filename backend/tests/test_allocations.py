@@ -0,0 +1,141 @@
+import time
+
+import pytest
+
+from app.agent.schemas.common import Coordinates
+from app.agent.schemas.resource import Resource
+from app.agent.schemas.task import ResourceAllocation, Task, TaskAllocation, VolunteerAllocation
+from app.agent.schemas.types import AcceptedType
+from app.agent.schemas.volunteer import Volunteer
+from app.agent.utils import allocation as allocations
+from app.agent.utils.volunteer import confirm_volunteer, hold_volunteer
+from app.crud import allocation as crud_allocation
+from app.crud import resource as crud_resource
+from app.crud import task as crud_task
+from app.schemas.allocation import AllocationStatus
+from app.schemas.task import TaskCreate, TaskStatusUpdate
+
+
+@pytest.fixture
+def task_id(db):
+    return crud_task.create_task(TaskCreate(
+        source_request_id="request", priority=1, instructions="Deliver water",
+        role_required="first_responder", resource_ids=[], disaster_id="disaster",
+    )).id
+
+
+@pytest.fixture
+def allocation_id(db, task_id):
+    db.collection(crud_resource.COLLECTION).document("water").set({
+        "uid": "donor",
+        "role_id": "volunteer",
+        "category": "water",
+        "quantity_total": 10,
+        "quantity_available": 10,
+        "status": "available",
+        "location_lat": 0.0,
+        "location_lng": 0.0,
+    })
+    allocation_id = allocations.new_allocation_id()
+    holder = allocations.allocation_holder(allocation_id)
+    reservation = crud_resource.reserve("water", 4, holder=holder, ttl_s=60)
+    _, hold_id = hold_volunteer("vol", 60)
+    location = Coordinates(lat=0.0, lng=0.0)
+    allocations.save_allocation(allocation_id, "disaster", TaskAllocation(
+        task=Task(task_id=task_id, description="Deliver water"),
+        resource_allocations=[ResourceAllocation(
+            resource=Resource(
+                resource_id="water", donor_id="donor", donor_type="volunteer", resource_type="water",
+                location=location, quantity=4, status="active",
+            ),
+            accepted=AcceptedType.PENDING,
+            reservation_id=reservation.reservation_id,
+        )],
+        volunteer_allocations=[VolunteerAllocation(
+            volunteer=Volunteer(id="vol", location=location, status="active"),
+            accepted=AcceptedType.PENDING,
+            reservation_id=hold_id,
+        )],
+        allocation_id=allocation_id,
+    ))
+    return allocation_id
+
+
+def _available(db) -> int:
+    return db.collection(crud_resource.COLLECTION).document("water").get().to_dict()["quantity_available"]
+
+
+def test_holders_are_unique_per_proposal(db):
+    assert allocations.new_allocation_id() != allocations.new_allocation_id()
+
+
+def test_accept_commits_the_holds(db, allocation_id):
+    allocation = allocations.accept_allocation(allocation_id)
+
+    assert allocation.status == AllocationStatus.ACCEPTED
+    assert [h.accepted for h in allocation.resources + allocation.volunteers] == [True, True]
+    assert crud_allocation.get(allocation_id).resources[0].accepted is True
+    # the volunteer stays held for the task
+    assert hold_volunteer("vol", 60) == (False, None)
+    assert crud_resource.expire_reservations() == 0
+    assert _available(db) == 6
+
+
+@pytest.mark.parametrize("status", ["completed", "failed"])
+def test_finishing_the_task_frees_its_volunteers(db, allocation_id, task_id, status):
+    allocations.accept_allocation(allocation_id)
+    crud_task.update_task_status(task_id, TaskStatusUpdate(status="on_route"))
+    assert hold_volunteer("vol", 60) == (False, None)
+
+    crud_task.update_task_status(task_id, TaskStatusUpdate(status=status))
+    assert hold_volunteer("vol", 60)[0]
+
+
+def test_a_confirmed_hold_still_expires(db):
+    _, hold_id = hold_volunteer("vol", 60)
+
+    assert confirm_volunteer("vol", hold_id, 0.05)
+    time.sleep(0.1)
+    assert hold_volunteer("vol", 60)[0]
+
+
+def test_reject_releases_the_holds(db, allocation_id):
+    allocation = allocations.reject_allocation(allocation_id)
+
+    assert allocation.status == AllocationStatus.REJECTED
+    assert _available(db) == 10
+    assert hold_volunteer("vol", 60)[0]
+
+
+def test_an_allocation_is_settled_once(db, allocation_id):
+    allocations.accept_allocation(allocation_id)
+
+    with pytest.raises(crud_allocation.AllocationConflict):
+        allocations.reject_allocation(allocation_id)
+    with pytest.raises(crud_allocation.AllocationConflict):
+        allocations.accept_allocation(allocation_id)
+    assert _available(db) == 6
+
+
+def test_an_interrupted_accept_can_be_retried(db, allocation_id, monkeypatch):
+    def crash(*args):
+        raise RuntimeError("worker lost")
+
+    with monkeypatch.context() as m:
+        m.setattr(allocations, "confirm_volunteer", crash)
+        with pytest.raises(RuntimeError):
+            allocations.accept_allocation(allocation_id)
+    assert crud_allocation.get(allocation_id).status == AllocationStatus.ACCEPTING
+    with pytest.raises(crud_allocation.AllocationConflict):
+        allocations.reject_allocation(allocation_id)
+
+    allocation = allocations.accept_allocation(allocation_id)
+    assert allocation.status == AllocationStatus.ACCEPTED
+    assert [h.accepted for h in allocation.resources + allocation.volunteers] == [True, True]
+    assert crud_allocation.get(allocation_id).status == AllocationStatus.ACCEPTED
+    assert _available(db) == 6
+
+
+def test_unknown_allocation_raises(db):
+    with pytest.raises(ValueError):
+        allocations.accept_allocation("missing")
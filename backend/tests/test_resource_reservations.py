@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.crud import resource as crud
+from app.schemas.resource import ReservationStatus
+
+
+@pytest.fixture
+def rid(db):
+    db.collection("users").document("donor").set({"role_id": "volunteer"})
+    db.collection(crud.COLLECTION).document("water").set({
+        "uid": "donor",
+        "role_id": "volunteer",
+        "name": "Bottled water",
+        "category": "water",
+        "quantity_total": 10,
+        "quantity_available": 10,
+        "status": "available",
+        "location_lat": 0.0,
+        "location_lng": 0.0,
+    })
+    return "water"
+
+
+def _available(db, rid: str) -> int:
+    return db.collection(crud.COLLECTION).document(rid).get().to_dict()["quantity_available"]
+
+
+def _expire(db, reservation_id: str) -> None:
+    past = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db.collection(crud.RESERVATIONS).document(reservation_id).update({"expires_at": past})
+
+
+def test_reserve_takes_units_off_the_stock(db, rid):
+    reservation = crud.reserve(rid, 4, holder="task-1")
+
+    assert reservation.status == ReservationStatus.HELD
+    assert _available(db, rid) == 6
+
+
+def test_conflicting_reserve_raises_stock_conflict(db, rid):
+    crud.reserve(rid, 7)
+
+    with pytest.raises(crud.StockConflict):
+        crud.reserve(rid, 4)
+    assert _available(db, rid) == 3
+
+
+def test_settling_twice_is_a_no_op(db, rid):
+    committed = crud.reserve(rid, 3)
+    released = crud.reserve(rid, 2)
+
+    crud.commit_reservation(committed.reservation_id)
+    assert crud.commit_reservation(committed.reservation_id).status == ReservationStatus.COMMITTED
+    crud.release_reservation(released.reservation_id)
+    assert crud.release_reservation(released.reservation_id).status == ReservationStatus.RELEASED
+
+    # the released units came back once, the committed ones stayed taken
+    assert _available(db, rid) == 7
+
+
+def test_release_after_commit_raises(db, rid):
+    reservation = crud.reserve(rid, 3)
+    crud.commit_reservation(reservation.reservation_id)
+
+    with pytest.raises(crud.StockConflict):
+        crud.release_reservation(reservation.reservation_id)
+    assert _available(db, rid) == 7
+
+
+def test_expiry_returns_the_held_units(db, rid):
+    expired = crud.reserve(rid, 4)
+    crud.reserve(rid, 1)
+    _expire(db, expired.reservation_id)
+
+    assert crud.expire_reservations() == 1
+    assert _available(db, rid) == 9
+    assert crud.expire_reservations() == 0
+
+
+def test_commit_after_expiry_raises(db, rid):
+    reservation = crud.reserve(rid, 4)
+    _expire(db, reservation.reservation_id)
+
+    with pytest.raises(crud.StockConflict):
+        crud.commit_reservation(reservation.reservation_id)
+    # the failed commit released the units
+    assert _available(db, rid) == 10
+
+
+def test_settling_an_unknown_reservation_raises(db, rid):
+    with pytest.raises(ValueError):
+        crud.commit_reservation("missing")